@@ -1,7 +1,8 @@
 from django.db import models
 from django.contrib import admin
 
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from django.db.models import Prefetch
 from django.core.exceptions import FieldDoesNotExist, ValidationError
 
 from django.contrib.admin.options import IS_POPUP_VAR
@@ -11,14 +12,78 @@ import datetime
 
 # **********Action Mixins**********
 
+class Echo:
+    # File like object that returns what is written, so csv.writer produces each row for streaming instead of buffering the file
+    def write(self, value):
+        return value
+
+def resolveManyRelation(model, path):
+    # Returns (relatedModel, queryPath) for a path of field names and reverse accessor names, e.g. mentorUser__questionresponse_set
+    # queryPath uses query names so it can be used in filters, e.g. mentorUser__questionresponse
+    queryNames = []
+    for name in path.split('__'):
+        reverseRelations = {relation.get_accessor_name(): relation for relation in model._meta.related_objects}
+
+        if name in reverseRelations:
+            relation = reverseRelations[name]
+            queryNames.append(relation.name)
+        else:
+            relation = model._meta.get_field(name)
+            queryNames.append(relation.name)
+
+        model = relation.related_model
+
+    return model, '__'.join(queryNames)
+
 class ExportCSVMixin:
+    # Number of objects loaded at a time, related objects are prefetched for each chunk
+    exportChunkSize = 1000
+
+    def exportManyRelations(self):
+        # Returns list of (field, path, relatedModel, queryPath) for each of exportFieldsManyRelations
+        # Method fields declare the relation they return with an exportRelation attribute
+        manyRelations = []
+
+        for field in getattr(self, 'exportFieldsManyRelations', []):
+            path = getattr(getattr(self.model, field), 'exportRelation', field)
+            relatedModel, queryPath = resolveManyRelation(self.model, path)
+            manyRelations.append((field, path, relatedModel, queryPath))
+
+        return manyRelations
+
+    def exportQueryset(self, queryset):
+        # Load the related objects each export field uses along with the queryset, so rows don't query for each field
+        # Foreign key fields are loaded with what their __str__ uses, declared in strSelectRelated on the related model
+        # Method fields declare what they use with exportSelectRelated and exportPrefetchRelated attributes
+        selectRelated = []
+        prefetchRelated = []
+
+        for field in self.exportFields:
+            try:
+                modelField = self.model._meta.get_field(field)
+            except FieldDoesNotExist:
+                method = getattr(self.model, field, None)
+                selectRelated += getattr(method, 'exportSelectRelated', [])
+                prefetchRelated += getattr(method, 'exportPrefetchRelated', [])
+                continue
+
+            if modelField.is_relation and modelField.concrete and not modelField.many_to_many:
+                selectRelated.append(field)
+                selectRelated += [f'{field}__{relatedField}' for relatedField in getattr(modelField.related_model, 'strSelectRelated', [])]
+
+        if selectRelated:
+            queryset = queryset.select_related(*selectRelated)
+
+        if prefetchRelated:
+            queryset = queryset.prefetch_related(*prefetchRelated)
+
+        return queryset
+
     def export_as_csv(self, request, queryset):
 
         fields = self.exportFields
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename={self.model._meta.verbose_name_plural.title()} {datetime.date.today()}.csv'
-        writer = csv.writer(response)
+        manyRelations = self.exportManyRelations()
+        queryset = self.exportQueryset(queryset)
 
         # Get field display names
         fieldHeaderNames = []
@@ -34,61 +99,67 @@ class ExportCSVMixin:
         # Get field names for many to many objects
         manyFieldHeaderDicts = []
 
-        # Go through all related objects on all objects in queryset for all fields and add unique headers to list
-        if hasattr(self, 'exportFieldsManyRelations'):
-            for field in self.exportFieldsManyRelations:
-                for obj in queryset:
-                    objManager = getattr(obj, field)
-                    try:
-                        objManager = objManager()
-                    except TypeError:
-                        pass
-                    for manyObj in objManager.all():
-                        for headerDict in manyObj.csvHeaders():
-                            if headerDict not in manyFieldHeaderDicts:
-                                manyFieldHeaderDicts.append(headerDict)
-        
+        # Get headers for all related objects with one aggregate query for each relation and add unique headers to list
+        for field, path, relatedModel, queryPath in manyRelations:
+            relatedQueryset = relatedModel.objects.filter(pk__in=queryset.values(f'{queryPath}__pk'))
+            for headerDict in relatedModel.csvHeadersForQueryset(relatedQueryset):
+                if headerDict not in manyFieldHeaderDicts:
+                    manyFieldHeaderDicts.append(headerDict)
+
         # Sort headers and add to list without dicts
         def headerOrderField(headerDict):
             return headerDict['order']
         manyFieldHeaderDicts.sort(key=headerOrderField)
         manyFieldHeaderNames = [x['header'] for x in manyFieldHeaderDicts]
 
-        # Write field names to CSV
-        writer.writerow(fieldHeaderNames+manyFieldHeaderNames)
-
-        # Get and write field data values to CSV for each object in queryset
-        for obj in queryset:
-            row = []
-            # Write database fields and method fields
-            for field in fields:
-                fieldData = getattr(obj, field)
-                if callable(fieldData):
-                    row.append(fieldData())
-                else:
-                    row.append(fieldData)
-
-            # Write many relation fields
-            if hasattr(self, 'exportFieldsManyRelations'):
-                # Get dictionary of many values
-                csvValues = {}
-                for field in self.exportFieldsManyRelations:
-                    objManager = getattr(obj, field)
-                    try:
-                        objManager = objManager()
-                    except TypeError:
-                        pass
-                    for manyObj in objManager.all():
-                        csvValues = {**csvValues, **manyObj.csvValues()}
-
-                # Add values to row
-                for field in manyFieldHeaderNames:
-                    try:
-                        row.append(csvValues[field])
-                    except KeyError:
-                        row.append('') # append blank value if no value for this column
-
-            writer.writerow(row)
+        # Prefetch related objects so values don't need queries for each object
+        for field, path, relatedModel, queryPath in manyRelations:
+            relatedObjects = relatedModel.objects.all()
+            if hasattr(relatedModel, 'csvSelectRelated'):
+                relatedObjects = relatedObjects.select_related(*relatedModel.csvSelectRelated)
+            queryset = queryset.prefetch_related(Prefetch(path, queryset=relatedObjects))
+
+        def rows():
+            # Write field names to CSV
+            yield fieldHeaderNames+manyFieldHeaderNames
+
+            # Get and write field data values to CSV for each object in queryset
+            # Loaded in chunks so the whole queryset isn't held in memory
+            for obj in queryset.iterator(chunk_size=self.exportChunkSize):
+                row = []
+                # Write database fields and method fields
+                for field in fields:
+                    fieldData = getattr(obj, field)
+                    if callable(fieldData):
+                        row.append(fieldData())
+                    else:
+                        row.append(fieldData)
+
+                # Write many relation fields
+                if manyRelations:
+                    # Get dictionary of many values
+                    csvValues = {}
+                    for field, path, relatedModel, queryPath in manyRelations:
+                        objManager = getattr(obj, field)
+                        try:
+                            objManager = objManager()
+                        except TypeError:
+                            pass
+                        for manyObj in objManager.all():
+                            csvValues = {**csvValues, **manyObj.csvValues()}
+
+                    # Add values to row
+                    for field in manyFieldHeaderNames:
+                        try:
+                            row.append(csvValues[field])
+                        except KeyError:
+                            row.append('') # append blank value if no value for this column
+
+                yield row
+
+        writer = csv.writer(Echo())
+        response = StreamingHttpResponse((writer.writerow(row) for row in rows()), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename={self.model._meta.verbose_name_plural.title()} {datetime.date.today()}.csv'
 
         return response
 
@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from django.db import transaction
+
+import uuid
+
+# Versions for values stored in the configured Django cache
+# Cached values include the current version in their key or stored value, so bumping the version makes every worker fetch the new values
+# Only used if CACHE_SHARED, a per process cache wouldn't see versions bumped by changes made in other workers
+
+def currentVersion(key):
+    """ Returns the current version stored at key, created if not in the cache. None if the cache doesn't store it """
+    version = cache.get(key)
+    if version is None:
+        # add so workers that miss at the same time use the same version
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+
+    return version
+
+def setNewVersions(keys):
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+def bumpVersion(*keys):
+    """ Replaces the versions stored at keys """
+    setNewVersions(keys)
+    # Again on commit, in case another worker cached the old values before this transaction committed
+    transaction.on_commit(lambda: setNewVersions(keys))
@@ -1,9 +1,13 @@
 from events.models import Year
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from common.referenceData import referenceData
 
 def yearsContext(request):
+    # Lazy so the cache is only read on pages that display the years
     return {
-        'years': Year.objects.all(),
+        'years': SimpleLazyObject(lambda: referenceData(Year)),
     }
 
 def environmentContext(request):
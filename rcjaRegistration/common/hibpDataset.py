@@ -0,0 +1,106 @@
+import mmap
+import os
+import struct
+import threading
+
+# Local copy of the Pwned Passwords dataset, so passwords are checked without calling the API
+# File is a header followed by fixed size records of the 20 byte SHA-1 hash and a 4 byte breach count, sorted by hash
+# Built from the text dump with the buildpwneddataset command, and memory mapped so lookups only read the pages needed by the binary search
+
+HEADER = b'PWNDSHA1'
+RECORD = struct.Struct('>20sI')
+
+class BreachedPasswordDataset:
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as file:
+            self.stat = os.fstat(file.fileno())
+            if self.stat.st_size < len(HEADER) or (self.stat.st_size - len(HEADER)) % RECORD.size != 0:
+                raise ValueError(f'{path} is not a breached password dataset')
+
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.data[:len(HEADER)] != HEADER:
+            self.data.close()
+            raise ValueError(f'{path} is not a breached password dataset')
+
+        self.recordCount = (self.stat.st_size - len(HEADER)) // RECORD.size
+
+    def isCurrent(self):
+        # The build command replaces the file, so a different inode or modified time means there is a new dataset
+        stat = os.stat(self.path)
+        return (stat.st_ino, stat.st_mtime_ns) == (self.stat.st_ino, self.stat.st_mtime_ns)
+
+    def recordHash(self, index):
+        offset = len(HEADER) + index * RECORD.size
+        return self.data[offset:offset + 20]
+
+    def breachCount(self, passwordHash):
+        # Returns the breach count for the hex SHA-1 hash, 0 if not in the dataset
+        target = bytes.fromhex(passwordHash)
+
+        low = 0
+        high = self.recordCount
+        while low < high:
+            middle = (low + high) // 2
+            if self.recordHash(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < self.recordCount and self.recordHash(low) == target:
+            return RECORD.unpack_from(self.data, len(HEADER) + low * RECORD.size)[1]
+
+        return 0
+
+# Datasets are opened once for each process and reopened when the file is replaced
+
+_datasets = {}
+_datasetsLock = threading.Lock()
+
+def getDataset(path):
+    # Raises OSError if the file doesn't exist and ValueError if it isn't a dataset
+    dataset = _datasets.get(path)
+    if dataset is None or not dataset.isCurrent():
+        with _datasetsLock:
+            dataset = _datasets.get(path)
+            if dataset is None or not dataset.isCurrent():
+                dataset = BreachedPasswordDataset(path)
+                _datasets[path] = dataset
+
+    return dataset
+
+def writeDataset(lines, output, minimumCount=1):
+    """
+    Writes records for lines of HASH:COUNT, in order of hash, to the open binary file
+    Returns number of records written, raises ValueError if a line is invalid or out of order
+    """
+    output.write(HEADER)
+
+    previousHash = b''
+    written = 0
+    for lineNumber, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            passwordHash, count = line.split(b':')
+            passwordHash = bytes.fromhex(passwordHash.decode())
+            count = int(count)
+        except ValueError:
+            raise ValueError(f'Line {lineNumber} is not a SHA-1 hash and count')
+
+        if len(passwordHash) != 20:
+            raise ValueError(f'Line {lineNumber} is not a SHA-1 hash and count')
+
+        if passwordHash <= previousHash:
+            raise ValueError(f'Line {lineNumber} is not in order of hash, use the dump ordered by hash')
+        previousHash = passwordHash
+
+        if count >= minimumCount:
+            output.write(RECORD.pack(passwordHash, min(count, 2**32 - 1)))
+            written += 1
+
+    return written
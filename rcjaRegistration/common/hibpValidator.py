@@ -9,12 +9,32 @@
 
 # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
-from django.core.exceptions import ValidationError
+from django.core.exceptions import ValidationError, ImproperlyConfigured
+from django.core.cache import cache
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 import hashlib
 import requests
+import threading
+
+from common.hibpDataset import getDataset
+
+# Shared by all validators in the process so connections to the API are kept alive between requests
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=getattr(settings, 'PWNED_VALIDATOR_POOL_SIZE', 10))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
 
 
 class PWNEDPasswordValidator(object):
@@ -23,16 +43,35 @@ class PWNEDPasswordValidator(object):
     detects the password in its data set. Note that the API is heavily rate-limited,
     so there is a timeout (PWNED_VALIDATOR_TIMEOUT).
 
+    Range responses are kept in the Django cache for PWNED_VALIDATOR_CACHE_TIMEOUT seconds,
+    so passwords with the same hash prefix don't call the API again.
+
+    Passwords can also be checked against a local dataset file (PWNED_VALIDATOR_DATASET),
+    built with the buildpwneddataset command. Sources are tried in the order of
+    PWNED_VALIDATOR_SOURCES, 'local' for the dataset and 'remote' for the API,
+    the next source is only used if a source isn't available.
+
     If self.fail_safe is True, anything besides an API-identified bad password
     will pass, including a timeout. If self.fail_safe is False, anything
     besides a good password will fail and raise a ValidationError.
     """
 
+    source_methods = {
+        'local': 'get_local_breach_count',
+        'remote': 'get_remote_breach_count',
+    }
+
     def __init__(self, min_length=8):
         self.min_length = min_length
         self.timeout = getattr(settings, 'PWNED_VALIDATOR_TIMEOUT', 2)
         self.fail_safe = getattr(settings, 'PWNED_VALIDATOR_FAIL_SAFE', True)
         self.min_breaches = getattr(settings, 'PWNED_VALIDATOR_MINIMUM_BREACHES', 1)
+        self.cache_timeout = getattr(settings, 'PWNED_VALIDATOR_CACHE_TIMEOUT', 86400)
+        self.dataset = getattr(settings, 'PWNED_VALIDATOR_DATASET', '')
+        self.sources = getattr(settings, 'PWNED_VALIDATOR_SOURCES', ['local', 'remote'])
+        for source in self.sources:
+            if source not in self.source_methods:
+                raise ImproperlyConfigured(f"Unknown PWNED_VALIDATOR_SOURCES source '{source}'")
         self.url = getattr(settings, 'PWNED_VALIDATOR_URL',
                              'https://api.pwnedpasswords.com/range/{short_hash}')
         self.error_msg = getattr(settings, 'PWNED_VALIDATOR_ERROR',
@@ -48,7 +87,7 @@ class PWNEDPasswordValidator(object):
 
     def check_valid(self, password):
         """
-        Tests that a password is valid using the API. Uses k-anonymity model in v2 API.
+        Tests that a password is valid using the local dataset or the API. Uses k-anonymity model in v2 API.
 
         If self.fail_safe is True, anything besides a bad password will
         return True. If self.fail_safe is False, anything besides a good password
@@ -58,29 +97,47 @@ class PWNEDPasswordValidator(object):
         :return: True if the password is valid. Else, False.
         """
 
-        VALID = True
-        INVALID = False
-
-        try:
-            p_hash = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
-            response = requests.get(self.get_url(p_hash[0:5]), timeout=self.timeout)
-
-            if self.get_breach_count(p_hash, response.text) >= self.min_breaches:
-                return INVALID
-            elif self.fail_safe:
-                return VALID
-            elif response.status_code in [400, 429, 500]:
-                raise ValidationError(self.error_fail_msg)
-            elif response.status_code in [200]:
-                return VALID
-        except (requests.exceptions.RequestException, IndexError, ValueError):
-            if not self.fail_safe:
-                raise ValidationError(self.error_fail_msg)
-            return VALID
-
-        if self.fail_safe:
-            return VALID
-        raise ValidationError(self.error_fail_msg)
+        p_hash = hashlib.sha1(password.encode('utf-8')).hexdigest().upper()
+
+        for source in self.sources:
+            try:
+                breach_count = getattr(self, self.source_methods[source])(p_hash)
+            except (requests.exceptions.RequestException, OSError, ValueError):
+                continue
+
+            # None if the source isn't configured
+            if breach_count is not None:
+                return breach_count < self.min_breaches
+
+        if not self.fail_safe:
+            raise ValidationError(self.error_fail_msg)
+        return True
+
+    def get_local_breach_count(self, p_hash):
+        if not self.dataset:
+            return None
+        return getDataset(self.dataset).breachCount(p_hash)
+
+    def get_remote_breach_count(self, p_hash):
+        return self.get_breach_count(p_hash, self.get_range(p_hash[0:5]))
+
+    def get_range(self, short_hash):
+        """
+        Returns the text of the range response for the hash prefix, from the cache if available.
+        Raises requests.exceptions.RequestException if the API doesn't return the range.
+        """
+        key = f'pwnedPasswords:range:{short_hash}'
+        range_text = cache.get(key)
+
+        if range_text is None:
+            response = get_session().get(self.get_url(short_hash), timeout=self.timeout)
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(f'Unexpected status {response.status_code}', response=response)
+
+            range_text = response.text
+            cache.set(key, range_text, self.cache_timeout)
+
+        return range_text
 
     def get_url(self, short_hash):
         return self.url.format(
@@ -94,8 +151,14 @@ class PWNEDPasswordValidator(object):
 
     @staticmethod
     def get_breach_count(p_hash, response_text):
-        for line in response_text.splitlines():
-            hash, count = line.split(":")
-            if p_hash[5:] == hash:
-                return int(count)
-        return 0
+        # Each line is SUFFIX:COUNT, search for the suffix at the start of a line instead of splitting every line
+        suffix = p_hash[5:] + ':'
+        index = response_text.find(suffix)
+        while index > 0 and response_text[index - 1] != '\n':
+            index = response_text.find(suffix, index + 1)
+
+        if index == -1:
+            return 0
+
+        end = response_text.find('\n', index)
+        return int(response_text[index + len(suffix):end if end != -1 else None])
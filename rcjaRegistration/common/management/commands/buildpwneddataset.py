@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+
+from common.hibpDataset import writeDataset
+
+import os
+
+class Command(BaseCommand):
+    help = "Builds the local breached password dataset used by the password validator from the Pwned Passwords SHA-1 dump ordered by hash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dump', help='Text file of HASH:COUNT lines ordered by hash')
+        parser.add_argument('--output', help='Dataset file to write, defaults to PWNED_VALIDATOR_DATASET')
+        parser.add_argument('--min-count', type=int, default=1, help='Leave out hashes seen in fewer breaches to make the file smaller')
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'PWNED_VALIDATOR_DATASET', '')
+        if not output:
+            raise CommandError('Set --output or PWNED_VALIDATOR_DATASET')
+
+        # Written to a temporary file and moved into place, so the validator never reads a partly written dataset
+        temporaryOutput = f'{output}.tmp'
+        try:
+            with open(options['dump'], 'rb') as dump, open(temporaryOutput, 'wb') as dataset:
+                written = writeDataset(dump, dataset, options['min_count'])
+        except (OSError, ValueError) as e:
+            if os.path.exists(temporaryOutput):
+                os.remove(temporaryOutput)
+            raise CommandError(str(e))
+
+        os.replace(temporaryOutput, output)
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} hashes to {output}'))
@@ -1,5 +1,7 @@
 from django.core.exceptions import ValidationError
 
+import copy
+
 # **********CUSTOM CLASSES**********
 
 class SaveDeleteMixin:
@@ -23,6 +25,8 @@ class SaveDeleteMixin:
         # Run custom post save actions
         if not skipPrePostSave:
             self.postSave()
+        # Saved values are the previous values for the next save
+        self.snapshotTrackedFields(kwargs.get('update_fields'))
 
     # *****Delete*****
 
@@ -45,6 +49,99 @@ class SaveDeleteMixin:
         if not skipPrePostDelete:
             self.postDelete()
 
+    # *****Field change tracking*****
+
+    # Fields recorded when the object is loaded from or saved to the database
+    # Save hooks compare against these with hasChanged and previousValue instead of fetching the row again
+    trackedFields = []
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshotTrackedFields()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.snapshotTrackedFields(kwargs.get('fields'))
+
+    def trackedAttnames(self):
+        # Foreign keys are tracked by id so related objects aren't fetched
+        return {field: self._meta.get_field(field).attname for field in self.trackedFields}
+
+    # Record the current values of the tracked fields, or only those in fields if given
+    def snapshotTrackedFields(self, fields=None):
+        if not self.trackedFields:
+            return
+
+        values = getattr(self, 'trackedFieldValues', None) or {}
+        deferredFields = self.get_deferred_fields()
+
+        for field, attname in self.trackedAttnames().items():
+            if fields is not None and field not in fields and attname not in fields:
+                continue
+            # Don't load deferred fields just to track them
+            if attname in deferredFields:
+                continue
+            values[field] = getattr(self, attname)
+
+        self.trackedFieldValues = values
+
+    # Returns the tracked values as last loaded or saved, or None if not in the database
+    def previousTrackedValues(self):
+        if not self.trackedFields or self.pk is None:
+            return None
+
+        if not hasattr(self, 'trackedFieldValues'):
+            self.trackedFieldValues = {}
+
+        if self.trackedFieldValues is None:
+            return None
+
+        # Not loaded from the database or deferred, fetch all missing fields at once
+        attnames = self.trackedAttnames()
+        missingFields = [field for field in self.trackedFields if field not in self.trackedFieldValues]
+        if missingFields:
+            row = type(self)._base_manager.using(self._state.db).filter(pk=self.pk).values(*[attnames[field] for field in missingFields]).first()
+
+            if row is None:
+                self.trackedFieldValues = None
+                return None
+
+            for field in missingFields:
+                self.trackedFieldValues[field] = row[attnames[field]]
+
+        return self.trackedFieldValues
+
+    # Returns the value of field as last loaded or saved, the id for foreign keys
+    # None if not in the database
+    def previousValue(self, field):
+        previousValues = self.previousTrackedValues()
+        if previousValues is None:
+            return None
+        return previousValues[field]
+
+    # True if field changed since last loaded or saved, always True if not in the database
+    def hasChanged(self, field):
+        previousValues = self.previousTrackedValues()
+        if previousValues is None:
+            return True
+        return getattr(self, self._meta.get_field(field).attname) != previousValues[field]
+
+    # Returns a copy of this object with the tracked fields set to their previous values, or None if not in the database
+    def previousInstance(self):
+        previousValues = self.previousTrackedValues()
+        if previousValues is None:
+            return None
+
+        # Setting a foreign key id clears the cached related object on the copy only
+        previous = copy.copy(self)
+        for field, attname in self.trackedAttnames().items():
+            setattr(previous, attname, previousValues[field])
+        previous.trackedFieldValues = previousValues.copy()
+
+        return previous
+
 # **********FUNCTIONS**********
 
 def checkRequiredFieldsNotNone(self, requiredFields):
@@ -1,6 +1,59 @@
+from django.conf import settings
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 
+from .cacheVersions import currentVersion, bumpVersion
+
+# Redirect state
+# Whether the selected school must update its details and whether the staff member must accept the association rules are stored in the session,
+# so normal requests don't query the school or association member
+# The stored values are versioned, the version is bumped in the configured Django cache when the school or association member is saved or deleted, see signals.py
+# If the version isn't in the cache the values are always recalculated
+
+redirectStateSessionKey = 'redirectState'
+
+def redirectStateVersionKey(modelName, pk):
+    return f'redirectState:{modelName}:{pk}'
+
+def invalidateRedirectState(modelName, pks):
+    bumpVersion(*[redirectStateVersionKey(modelName, pk) for pk in pks])
+
+def cachedRedirectState(request, name, modelName, pk, calculate):
+    # Returns the stored value if the pk and version match, otherwise calculates and stores the value
+    if not settings.CACHE_SHARED:
+        return calculate()
+
+    version = currentVersion(redirectStateVersionKey(modelName, pk))
+    redirectState = request.session.get(redirectStateSessionKey, {})
+    stored = redirectState.get(name)
+
+    if version is not None and stored is not None and stored['pk'] == pk and stored['version'] == version:
+        return stored['value']
+
+    value = calculate()
+    if version is not None:
+        redirectState[name] = {'pk': pk, 'version': version, 'value': value}
+        request.session[redirectStateSessionKey] = redirectState
+
+    return value
+
+def schoolDetailsUpdateRequired(request):
+    from schools.models import School
+
+    # A school that was just deleted doesn't match, so isn't redirected
+    def calculate():
+        return School.objects.filter(pk=request.user.currentlySelectedSchool_id, forceSchoolDetailsUpdate=True).exists()
+
+    return cachedRedirectState(request, 'schoolDetailsUpdate', 'school', request.user.currentlySelectedSchool_id, calculate)
+
+def associationRulesAcceptRequired(request):
+    from association.models import AssociationMember
+
+    def calculate():
+        return not AssociationMember.objects.filter(user=request.user, rulesAcceptedDate__isnull=False).exists()
+
+    return cachedRedirectState(request, 'associationRules', 'associationMember', request.user.pk, calculate)
+
 class RedirectMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -13,28 +66,18 @@ class RedirectMiddleware:
 
             # Check redirect conditions in this order
             redirectTo = None
-            from schools.models import School
-            from association.models import AssociationMember
-            try:
-                if request.user.forcePasswordChange:
-                    redirectTo = reverse('password_change')
-                elif request.user.forceDetailsUpdate:
-                    redirectTo = reverse('users:details')
-                elif request.user.currentlySelectedSchool and request.user.currentlySelectedSchool.forceSchoolDetailsUpdate:
-                    redirectTo = reverse('schools:details')
-                elif request.user.is_staff and request.user.adminChangelogVersionShown != request.user.ADMIN_CHANGELOG_CURRENT_VERSION:
-                    redirectTo = reverse('users:adminChangelog')
-                    request.user.adminChangelogVersionShown = request.user.ADMIN_CHANGELOG_CURRENT_VERSION
-                    request.user.save(update_fields=['adminChangelogVersionShown'])
-                elif not request.user.is_superuser and request.user.is_staff:
-                    try:
-                        if not request.user.associationmember.rulesAcceptedDate:
-                            redirectTo = reverse('association:membership')
-                    except AssociationMember.DoesNotExist:
-                        redirectTo = reverse('association:membership')
-
-            except School.DoesNotExist:
-                pass # If school just deleted don't attempt redirection
+            if request.user.forcePasswordChange:
+                redirectTo = reverse('password_change')
+            elif request.user.forceDetailsUpdate:
+                redirectTo = reverse('users:details')
+            elif request.user.currentlySelectedSchool_id and schoolDetailsUpdateRequired(request):
+                redirectTo = reverse('schools:details')
+            elif request.user.is_staff and request.user.adminChangelogVersionShown != request.user.ADMIN_CHANGELOG_CURRENT_VERSION:
+                redirectTo = reverse('users:adminChangelog')
+                request.user.adminChangelogVersionShown = request.user.ADMIN_CHANGELOG_CURRENT_VERSION
+                request.user.save(update_fields=['adminChangelogVersionShown'])
+            elif not request.user.is_superuser and request.user.is_staff and associationRulesAcceptRequired(request):
+                redirectTo = reverse('association:membership')
 
             neverRedirect = [
                 reverse('users:termsAndConditions'),
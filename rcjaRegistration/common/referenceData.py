@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .cacheVersions import currentVersion, bumpVersion
+
+# Cache of rarely changing lookup tables, read on most pages
+# Stored in the configured Django cache so it is shared by all workers
+# Each model has a cache version that is bumped when an object of that model is saved or deleted, see signals.py
+# Not for validating foreign keys that are saved, a cached object could have just been deleted
+
+def cacheVersionKey(model):
+    return f'referenceData:{model._meta.label_lower}:version'
+
+def invalidateCache(model):
+    bumpVersion(cacheVersionKey(model))
+
+def referenceData(model):
+    """ Returns list of all objects of the model in the default ordering """
+    if not settings.CACHE_SHARED:
+        return list(model.objects.all())
+
+    key = f'referenceData:{model._meta.label_lower}:{currentVersion(cacheVersionKey(model))}'
+    objects = cache.get(key)
+    if objects is None:
+        objects = list(model.objects.all())
+        cache.set(key, objects, settings.REFERENCE_DATA_CACHE_TIMEOUT)
+
+    return objects
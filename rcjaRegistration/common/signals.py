@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .referenceData import invalidateCache
+from .redirectsMiddleware import invalidateRedirectState
+
+from events.models import Year
+from regions.models import State, Region
+from teams.models import HardwarePlatform, SoftwarePlatform
+from schools.models import School
+from association.models import AssociationMember
+
+# Reference data post-save and post-delete
+# Invalidate the cached objects of the model so the next read loads the changes
+@receiver(post_save, sender=Year)
+@receiver(post_delete, sender=Year)
+@receiver(post_save, sender=State)
+@receiver(post_delete, sender=State)
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=HardwarePlatform)
+@receiver(post_delete, sender=HardwarePlatform)
+@receiver(post_save, sender=SoftwarePlatform)
+@receiver(post_delete, sender=SoftwarePlatform)
+def referenceData_changed(sender, instance, **kwargs):
+    invalidateCache(sender)
+
+# School and association member post-save and post-delete
+# Replace the redirect state version so the middleware recalculates the stored redirect state
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def school_redirectStateChanged(sender, instance, **kwargs):
+    invalidateRedirectState('school', [instance.pk])
+
+@receiver(post_save, sender=AssociationMember)
+@receiver(post_delete, sender=AssociationMember)
+def associationMember_redirectStateChanged(sender, instance, **kwargs):
+    invalidateRedirectState('associationMember', [instance.user_id])
@@ -0,0 +1,21 @@
+from django import template
+from django.utils.html import linebreaks
+from django.utils.safestring import SafeData, mark_safe
+
+import functools
+
+register = template.Library()
+
+# Formatted messages are the same on every render, so cache the output keyed by the text
+# Text that isn't already marked safe is escaped, same as |escape|linebreaks
+
+@functools.lru_cache(maxsize=1024)
+def formatLinebreaks(text, isSafe):
+    return linebreaks(text, autoescape=not isSafe)
+
+@register.filter(is_safe=True)
+def cachedLinebreaks(value):
+    if not value:
+        return ''
+
+    return mark_safe(formatLinebreaks(str(value), isinstance(value, SafeData)))
@@ -0,0 +1,44 @@
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+
+from common.cacheVersions import currentVersion, bumpVersion
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestCacheVersions(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def testCurrentVersionCreated(self):
+        self.assertIsNone(cache.get('test:version'))
+
+        version = currentVersion('test:version')
+        self.assertIsNotNone(version)
+        self.assertEqual(cache.get('test:version'), version)
+
+    def testCurrentVersionUnchanged(self):
+        self.assertEqual(currentVersion('test:version'), currentVersion('test:version'))
+
+    def testBumpVersion(self):
+        version = currentVersion('test:version')
+        otherVersion = currentVersion('test:otherVersion')
+
+        bumpVersion('test:version')
+
+        self.assertNotEqual(currentVersion('test:version'), version)
+        self.assertEqual(currentVersion('test:otherVersion'), otherVersion)
+
+    def testBumpVersionMultipleKeys(self):
+        versions = [currentVersion('test:version1'), currentVersion('test:version2')]
+
+        bumpVersion('test:version1', 'test:version2')
+
+        self.assertNotEqual(currentVersion('test:version1'), versions[0])
+        self.assertNotEqual(currentVersion('test:version2'), versions[1])
+
+    def testBumpedAgainOnCommit(self):
+        # A value cached by another worker before the commit has the version from before the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            bumpVersion('test:version')
+            versionBeforeCommit = currentVersion('test:version')
+
+        self.assertNotEqual(currentVersion('test:version'), versionBeforeCommit)
@@ -0,0 +1,223 @@
+from django.test import SimpleTestCase, override_settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError, ImproperlyConfigured
+from django.core.management import call_command, CommandError
+
+from common.hibpValidator import PWNEDPasswordValidator
+from common.hibpDataset import getDataset
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import io
+import os
+import tempfile
+import threading
+
+breachedPassword = 'password123'
+breachedHash = hashlib.sha1(breachedPassword.encode('utf-8')).hexdigest().upper()
+
+class RangeHandler(BaseHTTPRequestHandler):
+    # Stand-in for the range API, serves the breached password hash in its range
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address))
+        prefix = self.path.rsplit('/', 1)[-1]
+
+        if self.server.status != 200:
+            body = b'Error'
+        else:
+            lines = ['0018A45C4D1DEF81644B54AB7F969B88D65:1', '00D4F6E8FA6EECAD2A3AA415EEC418D38EC:2']
+            if prefix == breachedHash[:5]:
+                lines.append(f'{breachedHash[5:]}:12345')
+            lines.append('FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF:0')
+            body = '\r\n'.join(lines).encode()
+
+        self.send_response(self.server.status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestPWNEDPasswordValidator(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        cls.server.daemon_threads = True
+        cls.serverThread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.serverThread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.server.requests = []
+        self.server.status = 200
+
+    def createValidator(self, **settings):
+        url = f'http://127.0.0.1:{self.server.server_address[1]}/range/{{short_hash}}'
+        with self.settings(**{'PWNED_VALIDATOR_URL': url, 'PWNED_VALIDATOR_FAIL_SAFE': False, 'PWNED_VALIDATOR_DATASET': '', **settings}):
+            return PWNEDPasswordValidator()
+
+    def testBreachedPasswordInvalid(self):
+        with self.assertRaises(ValidationError):
+            self.createValidator().validate(breachedPassword)
+
+    def testPasswordValid(self):
+        self.createValidator().validate('a not breached passphrase')
+
+    def testMinimumBreaches(self):
+        self.assertTrue(self.createValidator(PWNED_VALIDATOR_MINIMUM_BREACHES=20000).check_valid(breachedPassword))
+
+    def testRangeCached(self):
+        validator = self.createValidator()
+        validator.check_valid(breachedPassword)
+        self.assertFalse(validator.check_valid(breachedPassword))
+
+        self.assertEqual(len(self.server.requests), 1)
+
+    def testConnectionReused(self):
+        validator = self.createValidator()
+        validator.check_valid('first password')
+        validator.check_valid('second password')
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.server.requests[0][1], self.server.requests[1][1])
+
+    def testErrorNotFailSafe(self):
+        self.server.status = 500
+
+        with self.assertRaises(ValidationError):
+            self.createValidator().check_valid(breachedPassword)
+
+    def testErrorFailSafe(self):
+        self.server.status = 429
+
+        self.assertTrue(self.createValidator(PWNED_VALIDATOR_FAIL_SAFE=True).check_valid(breachedPassword))
+
+    def testErrorNotCached(self):
+        self.server.status = 500
+        validator = self.createValidator(PWNED_VALIDATOR_FAIL_SAFE=True)
+        validator.check_valid(breachedPassword)
+
+        self.server.status = 200
+        self.assertFalse(validator.check_valid(breachedPassword))
+
+class TestGetBreachCount(SimpleTestCase):
+    rangeText = '0018A45C4D1DEF81644B54AB7F969B88D65:1\r\n00D4F6E8FA6EECAD2A3AA415EEC418D38EC:25\r\n011053FD0102E94D6AE2F8B83D76FAF94F6:3'
+
+    def testFirstLine(self):
+        self.assertEqual(PWNEDPasswordValidator.get_breach_count('ABCDE0018A45C4D1DEF81644B54AB7F969B88D65', self.rangeText), 1)
+
+    def testMiddleLine(self):
+        self.assertEqual(PWNEDPasswordValidator.get_breach_count('ABCDE00D4F6E8FA6EECAD2A3AA415EEC418D38EC', self.rangeText), 25)
+
+    def testLastLine(self):
+        self.assertEqual(PWNEDPasswordValidator.get_breach_count('ABCDE011053FD0102E94D6AE2F8B83D76FAF94F6', self.rangeText), 3)
+
+    def testNotFound(self):
+        self.assertEqual(PWNEDPasswordValidator.get_breach_count('ABCDE111111111111111111111111111111111111', self.rangeText), 0)
+
+def buildDataset(directory, hashes, name='dataset.bin'):
+    dumpPath = os.path.join(directory, 'dump.txt')
+    with open(dumpPath, 'w') as dump:
+        dump.write(''.join(f'{passwordHash}:{count}\r\n' for passwordHash, count in hashes))
+
+    datasetPath = os.path.join(directory, name)
+    call_command('buildpwneddataset', dumpPath, output=datasetPath, stdout=io.StringIO())
+    return datasetPath
+
+class TestBreachedPasswordDataset(SimpleTestCase):
+    hashes = sorted([
+        ('0' * 40, 5),
+        ('7C4A8D09CA3762AF61E59520943DC26494F8941B', 3),
+        (breachedHash, 12345),
+        ('F' * 40, 1),
+    ])
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.datasetPath = buildDataset(self.directory.name, self.hashes)
+
+    def testFound(self):
+        dataset = getDataset(self.datasetPath)
+
+        for passwordHash, count in self.hashes:
+            self.assertEqual(dataset.breachCount(passwordHash), count)
+
+    def testNotFound(self):
+        dataset = getDataset(self.datasetPath)
+
+        self.assertEqual(dataset.breachCount('0' * 39 + '1'), 0)
+        self.assertEqual(dataset.breachCount('8' * 40), 0)
+
+    def testMinCount(self):
+        dumpPath = os.path.join(self.directory.name, 'dump.txt')
+        datasetPath = os.path.join(self.directory.name, 'small.bin')
+        call_command('buildpwneddataset', dumpPath, output=datasetPath, min_count=5, stdout=io.StringIO())
+
+        self.assertEqual(getDataset(datasetPath).recordCount, 2)
+
+    def testReplacedDatasetReopened(self):
+        self.assertEqual(getDataset(self.datasetPath).breachCount('F' * 40), 1)
+
+        buildDataset(self.directory.name, [('F' * 40, 7)])
+
+        self.assertEqual(getDataset(self.datasetPath).breachCount('F' * 40), 7)
+
+    def testUnsortedDumpRejected(self):
+        with self.assertRaises(CommandError):
+            buildDataset(self.directory.name, list(reversed(self.hashes)), name='unsorted.bin')
+
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, 'unsorted.bin')))
+
+    def testNotDatasetRejected(self):
+        path = os.path.join(self.directory.name, 'dump.txt')
+
+        with self.assertRaises(ValueError):
+            getDataset(path)
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TestPWNEDPasswordValidatorSources(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.datasetPath = buildDataset(self.directory.name, [(breachedHash, 12345)])
+
+    def createValidator(self, **settings):
+        # Nothing listens on port 9, remote checks fail
+        with self.settings(**{'PWNED_VALIDATOR_URL': 'http://127.0.0.1:9/range/{short_hash}', 'PWNED_VALIDATOR_FAIL_SAFE': False, 'PWNED_VALIDATOR_TIMEOUT': 0.5, **settings}):
+            return PWNEDPasswordValidator()
+
+    def testLocalBreached(self):
+        self.assertFalse(self.createValidator(PWNED_VALIDATOR_DATASET=self.datasetPath).check_valid(breachedPassword))
+
+    def testLocalNotBreachedDoesntUseRemote(self):
+        self.assertTrue(self.createValidator(PWNED_VALIDATOR_DATASET=self.datasetPath).check_valid('a not breached passphrase'))
+
+    def testMissingDatasetFallsBackToRemote(self):
+        validator = self.createValidator(PWNED_VALIDATOR_DATASET=os.path.join(self.directory.name, 'missing.bin'))
+
+        # Remote isn't available either
+        with self.assertRaises(ValidationError):
+            validator.check_valid(breachedPassword)
+
+    def testRemoteOnly(self):
+        validator = self.createValidator(PWNED_VALIDATOR_DATASET=self.datasetPath, PWNED_VALIDATOR_SOURCES=['remote'])
+
+        with self.assertRaises(ValidationError):
+            validator.check_valid('a not breached passphrase')
+
+    def testUnknownSource(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.createValidator(PWNED_VALIDATOR_SOURCES=['local', 'other'])
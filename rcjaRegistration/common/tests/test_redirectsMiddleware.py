@@ -1,13 +1,21 @@
 from common.baseTests import createStates, createUsers, createSchools
-from django.test import TestCase
+from django.test import TestCase, RequestFactory, override_settings
+from django.conf import settings
 from django.urls import reverse
+from django.core.cache import cache
+from django.contrib.sessions.backends.db import SessionStore
 
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 
 import datetime
+import subprocess
+import sys
+import tempfile
 
 from users.models import User
 from association.models import AssociationMember
+from schools.models import School
+from common.redirectsMiddleware import RedirectMiddleware, invalidateRedirectState
 
 class Base_Tests_redirectsMiddleware:
     @classmethod
@@ -146,3 +154,149 @@ class Test_redirectsMiddleware_superuser(Base_Tests_Staff_redirectsMiddleware, T
 
         response = self.client.get(reverse('events:dashboard'))
         self.assertEqual(response.status_code, 200)
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, CACHE_SHARED=True)
+class Test_redirectsMiddleware_redirectState(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+
+    def setUp(self):
+        cache.clear()
+        self.session = SessionStore()
+        self.middleware = RedirectMiddleware(lambda request: HttpResponse())
+
+    def createRequest(self, user):
+        # User loaded fresh each request, same as the authentication middleware
+        request = RequestFactory().get(reverse('events:dashboard'))
+        request.session = self.session
+        request.user = User.objects.get(pk=user.pk)
+        return request
+
+    def getResponse(self, user):
+        return self.middleware(self.createRequest(user))
+
+    def assertRequestQueries(self, user, number):
+        request = self.createRequest(user)
+
+        with self.assertNumQueries(number):
+            self.middleware(request)
+
+    def testMentorStoredInSession(self):
+        self.assertRequestQueries(self.user_state1_school1_mentor1, 1)
+        self.assertRequestQueries(self.user_state1_school1_mentor1, 0)
+
+    def testCoordinatorStoredInSession(self):
+        self.assertRequestQueries(self.user_state1_fullcoordinator, 1)
+        self.assertRequestQueries(self.user_state1_fullcoordinator, 0)
+
+    def testSchoolSaveRecalculates(self):
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).status_code, 200)
+
+        self.school1_state1.forceSchoolDetailsUpdate = True
+        self.school1_state1.save()
+
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).url, reverse('schools:details'))
+
+    def testSchoolUpdateInvalidated(self):
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).status_code, 200)
+
+        School.objects.filter(pk=self.school1_state1.pk).update(forceSchoolDetailsUpdate=True)
+        invalidateRedirectState('school', [self.school1_state1.pk])
+
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).url, reverse('schools:details'))
+
+    def testSelectedSchoolChangeRecalculates(self):
+        self.school2_state1.forceSchoolDetailsUpdate = True
+        self.school2_state1.save()
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).status_code, 200)
+
+        User.objects.filter(pk=self.user_state1_school1_mentor1.pk).update(currentlySelectedSchool=self.school2_state1)
+
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).url, reverse('schools:details'))
+
+    def testAssociationMemberSaveRecalculates(self):
+        self.assertEqual(self.getResponse(self.user_state1_fullcoordinator).status_code, 200)
+
+        self.user_state1_fullcoordinator_association_member.rulesAcceptedDate = None
+        self.user_state1_fullcoordinator_association_member.save()
+
+        self.assertEqual(self.getResponse(self.user_state1_fullcoordinator).url, reverse('association:membership'))
+
+    def testAssociationMemberDeleteRecalculates(self):
+        self.assertEqual(self.getResponse(self.user_state1_fullcoordinator).status_code, 200)
+
+        self.user_state1_fullcoordinator_association_member.delete()
+
+        self.assertEqual(self.getResponse(self.user_state1_fullcoordinator).url, reverse('association:membership'))
+
+    def testVersionEvictedRecalculates(self):
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).status_code, 200)
+
+        School.objects.filter(pk=self.school1_state1.pk).update(forceSchoolDetailsUpdate=True)
+        cache.clear()
+
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).url, reverse('schools:details'))
+
+# Another worker process changes the school, its new version is only seen by this process through a shared cache
+
+otherWorkerScript = """
+import sys
+from django.conf import settings
+settings.configure(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': sys.argv[1]}},
+    DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+)
+
+from django.db import transaction
+from common.redirectsMiddleware import invalidateRedirectState
+with transaction.atomic():
+    invalidateRedirectState('school', [int(sys.argv[2])])
+"""
+
+class Base_Test_redirectsMiddleware_otherWorker:
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+
+    def setUp(self):
+        cache.clear()
+        self.session = SessionStore()
+        self.middleware = RedirectMiddleware(lambda request: HttpResponse())
+
+    def getResponse(self, user):
+        request = RequestFactory().get(reverse('events:dashboard'))
+        request.session = self.session
+        request.user = User.objects.get(pk=user.pk)
+        return self.middleware(request)
+
+    def saveInOtherWorker(self, school):
+        # The database is shared by all workers, the save and its new version happen in another process
+        School.objects.filter(pk=school.pk).update(forceSchoolDetailsUpdate=True)
+        subprocess.run([sys.executable, '-c', otherWorkerScript, self.cacheLocation, str(school.pk)], cwd=settings.BASE_DIR, check=True)
+
+    def testSchoolSaveInOtherWorkerRecalculates(self):
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).status_code, 200)
+
+        self.saveInOtherWorker(self.school1_state1)
+
+        self.assertEqual(self.getResponse(self.user_state1_school1_mentor1).url, reverse('schools:details'))
+
+cacheDirectory = tempfile.mkdtemp(prefix='redirectsMiddlewareTests')
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cacheDirectory}}, CACHE_SHARED=True)
+class Test_redirectsMiddleware_sharedCache(Base_Test_redirectsMiddleware_otherWorker, TestCase):
+    cacheLocation = cacheDirectory
+
+# The other worker's version is written to its own per process cache, so this process must not use the session
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, CACHE_SHARED=False)
+class Test_redirectsMiddleware_perProcessCache(Base_Test_redirectsMiddleware_otherWorker, TestCase):
+    cacheLocation = tempfile.mkdtemp(prefix='redirectsMiddlewareTestsOtherWorker')
+
+    def testNotStoredInSession(self):
+        self.getResponse(self.user_state1_school1_mentor1)
+        self.assertNotIn('redirectState', self.session)
@@ -0,0 +1,93 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.http import HttpRequest
+
+from common.referenceData import referenceData
+from common.globalContexts import yearsContext
+from events.models import Year
+from regions.models import State, Region
+from regions.utils import getRegionsLookup
+from teams.models import HardwarePlatform
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, CACHE_SHARED=True)
+class TestReferenceData(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+
+    def setUp(self):
+        cache.clear()
+
+    def testSameAsQuery(self):
+        self.assertEqual(referenceData(State), list(State.objects.all()))
+
+    def testCached(self):
+        referenceData(Year)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(referenceData(Year), [self.year])
+
+    def testInvalidatedOnSave(self):
+        referenceData(HardwarePlatform)
+
+        hardwarePlatform = HardwarePlatform.objects.create(name='HW 2')
+
+        self.assertIn(hardwarePlatform, referenceData(HardwarePlatform))
+
+    def testInvalidatedOnDelete(self):
+        region = Region.objects.create(name='Region 4')
+        referenceData(Region)
+
+        regionID = region.pk
+        region.delete()
+
+        self.assertNotIn(regionID, [region.pk for region in referenceData(Region)])
+
+    def testOtherModelsNotInvalidated(self):
+        referenceData(Year)
+
+        Region.objects.create(name='Region 4')
+
+        with self.assertNumQueries(0):
+            referenceData(Year)
+
+    def testYearsContextLazy(self):
+        with self.assertNumQueries(0):
+            context = yearsContext(HttpRequest())
+
+        self.assertEqual(list(context['years']), [self.year])
+
+    def testRegionsLookupCached(self):
+        getRegionsLookup()
+
+        with self.assertNumQueries(0):
+            lookup = getRegionsLookup()
+
+        self.assertEqual([x.id for x in lookup], ['', self.state1.id, self.state2.id])
+        self.assertEqual(lookup[1].regions, [self.region1, self.region2_state1])
+
+    def testRegionsLookupUserRegistrationChanged(self):
+        getRegionsLookup()
+
+        self.state2.typeUserRegistration = False
+        self.state2.save()
+
+        self.assertNotIn(self.state2.id, [x.id for x in getRegionsLookup()])
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, CACHE_SHARED=False)
+class TestReferenceDataPerProcessCache(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def testChangeInOtherWorkerSeen(self):
+        hardwarePlatform = HardwarePlatform.objects.create(name='HW 2')
+        referenceData(HardwarePlatform)
+
+        # Update doesn't invalidate this process's cache, like a save handled by another worker
+        HardwarePlatform.objects.filter(pk=hardwarePlatform.pk).update(name='HW Renamed')
+
+        self.assertIn('HW Renamed', [hardwarePlatform.name for hardwarePlatform in referenceData(HardwarePlatform)])
@@ -0,0 +1,126 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents
+from django.test import TestCase
+
+from events.models import Event
+from schools.models import SchoolAdministrator
+from teams.models import Team, Student
+
+# Create your tests here.
+
+def createTeam(self):
+    return Team.objects.create(
+        event=self.state1_openCompetition,
+        division=self.division3,
+        mentorUser=self.user_state1_school1_mentor1,
+        school=self.school1_state1,
+        name='Team 1',
+    )
+
+class Test_fieldChangeTracking(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        cls.team = createTeam(cls)
+
+    def testNewInstanceChanged(self):
+        team = Team(event=self.state1_openCompetition, division=self.division3, mentorUser=self.user_state1_school1_mentor1, name='New')
+
+        self.assertTrue(team.hasChanged('school'))
+        self.assertIsNone(team.previousValue('school'))
+        self.assertIsNone(team.previousInstance())
+
+    def testLoadedNotChanged(self):
+        team = Team.objects.get(pk=self.team.pk)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(team.hasChanged('school'))
+            self.assertEqual(team.previousValue('school'), self.school1_state1.pk)
+
+    def testChangedAfterSet(self):
+        team = Team.objects.get(pk=self.team.pk)
+        team.school = self.school2_state1
+
+        with self.assertNumQueries(0):
+            self.assertTrue(team.hasChanged('school'))
+            self.assertEqual(team.previousValue('school'), self.school1_state1.pk)
+
+    def testSnapshotUpdatedOnSave(self):
+        team = Team.objects.get(pk=self.team.pk)
+        team.school = self.school2_state1
+        team.mentorUser = self.user_state1_school2_mentor3
+        team.save()
+
+        self.assertFalse(team.hasChanged('school'))
+        self.assertEqual(team.previousValue('school'), self.school2_state1.pk)
+
+    def testSnapshotUpdatedOnRefresh(self):
+        team = Team.objects.get(pk=self.team.pk)
+        Team.objects.filter(pk=self.team.pk).update(school=self.school2_state1)
+        team.refresh_from_db()
+
+        self.assertFalse(team.hasChanged('school'))
+        self.assertEqual(team.previousValue('school'), self.school2_state1.pk)
+
+    def testDeferredFieldFetchedOnce(self):
+        team = Team.objects.only('name').get(pk=self.team.pk)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(team.previousValue('school'), self.school1_state1.pk)
+            self.assertEqual(team.previousValue('campus'), None)
+
+    def testPreviousInstance(self):
+        team = Team.objects.get(pk=self.team.pk)
+        team.school = self.school2_state1
+
+        previous = team.previousInstance()
+
+        self.assertEqual(previous.school, self.school1_state1)
+        self.assertEqual(team.school, self.school2_state1)
+
+class Test_saveHooksNoRefetch(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        cls.team = createTeam(cls)
+        cls.student = Student.objects.create(team=cls.team, firstName='First', lastName='Last', yearLevel=5, gender='other')
+
+    def testStudentPreSaveNoQueries(self):
+        student = Student.objects.get(pk=self.student.pk)
+
+        with self.assertNumQueries(0):
+            student.preSave()
+
+        self.assertFalse(student.teamValueChanged)
+
+    def testTeamPreSaveNoQueries(self):
+        team = Team.objects.get(pk=self.team.pk)
+
+        with self.assertNumQueries(0):
+            team.preSave()
+
+        self.assertFalse(team.schoolValuesChanged)
+
+    def testEventBillingDetailsChanged(self):
+        event = Event.objects.get(pk=self.state1_openCompetition.pk)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(event.checkBillingDetailsChanged())
+
+        event.competition_defaultEntryFee = 100
+
+        self.assertTrue(event.checkBillingDetailsChanged())
+
+    def testSchoolAdministratorPreviousValues(self):
+        administrator = SchoolAdministrator.objects.get(user=self.user_state1_school1_mentor1, school=self.school1_state1)
+        administrator.school = self.school2_state1
+
+        administrator.preSave()
+
+        self.assertEqual(administrator.previousSchool, self.school1_state1)
+        self.assertEqual(administrator.previousUser, self.user_state1_school1_mentor1)
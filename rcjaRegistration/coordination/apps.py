@@ -5,3 +5,7 @@ class CoordinationConfig(AppConfig):
     name = 'coordination'
     def ready(self):
         import coordination.signals
+
+        # Work out coordinator permissions for all models once all models are loaded
+        from coordination.permissions.registry import permissionLevelRegistry
+        permissionLevelRegistry.build()
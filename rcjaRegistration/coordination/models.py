@@ -65,11 +65,28 @@ class Coordinator(SaveDeleteMixin, models.Model):
         return self.state
 
     # *****Save & Delete Methods*****
+
+    # Incremented when any coordinator is saved or deleted, so that permission tables cached on user objects are reloaded
+    permissionsVersion = 0
+
+    @classmethod
+    def invalidatePermissionTables(cls):
+        cls.permissionsVersion += 1
+
+    trackedFields = ['user', 'state', 'permissionLevel']
+
     def preSave(self):
-        if self.pk:
-            self.previousUser = Coordinator.objects.get(pk=self.pk).user
+        previous = self.previousInstance()
+        if previous is not None:
+            self.previousUser = previous.user
+        self.permissionsChanged = any(self.hasChanged(field) for field in self.trackedFields)
     
     def postSave(self):
+        # Skip if only details such as the position changed, the user's permissions are unchanged
+        if not self.permissionsChanged:
+            return
+
+        Coordinator.invalidatePermissionTables()
         self.user.updateUserPermissions()
 
         if hasattr(self, 'previousUser',) and self.user != self.previousUser:
@@ -0,0 +1,100 @@
+from django.apps import apps
+
+from coordination.models import Coordinator
+
+# Coordinator permissions for every model, worked out once at app ready instead of on every admin request
+# Models define the permissions each coordinator level has with stateCoordinatorPermissions and optionally globalCoordinatorPermissions
+
+def permissionLevels():
+    return [level for level, levelName in Coordinator.permissionLevelOptions]
+
+def reversePermissions(levelPermissions, permissions):
+    # Levels that have any of permissions, in the order of Coordinator.permissionLevelOptions
+    # A level is repeated for each of permissions it has, same as getFilteringPermissionLevels has always returned
+    levels = []
+    for level in permissionLevels():
+        for permission in permissions:
+            if permission in levelPermissions[level]:
+                levels.append(level)
+    return levels
+
+class ModelPermissionLevels:
+    # Permission tables for one model
+    def __init__(self, model):
+        self.model = model
+
+        # Permissions granted to each level
+        self.statePermissions = {level: list(model.stateCoordinatorPermissions(level)) for level in permissionLevels()}
+
+        # Global coordinators have the state permissions if globalCoordinatorPermissions isn't defined
+        if hasattr(model, 'globalCoordinatorPermissions'):
+            self.globalPermissions = {level: list(model.globalCoordinatorPermissions(level)) for level in permissionLevels()}
+        else:
+            self.globalPermissions = self.statePermissions
+
+        # Levels for a tuple of permissions, filled in as permission combinations are looked up
+        self.reverseLookups = {}
+
+    def filteringPermissionLevels(self, permissions):
+        # Returns (statePermissionLevels, globalPermissionLevels) that have any of permissions
+        key = tuple(permissions)
+
+        if key not in self.reverseLookups:
+            self.reverseLookups[key] = (
+                reversePermissions(self.statePermissions, permissions),
+                reversePermissions(self.globalPermissions, permissions),
+            )
+
+        return self.reverseLookups[key]
+
+    def codenames(self, level, globalCoordinator):
+        # Django permission codenames for a coordinator of this level
+        levelPermissions = self.globalPermissions if globalCoordinator else self.statePermissions
+        return [f'{permission}_{self.model._meta.object_name.lower()}' for permission in levelPermissions[level]]
+
+class PermissionLevelRegistry:
+    # Permission tables for all models that have coordinator permissions
+    def __init__(self):
+        self.models = {}
+        self.levelCodenames = {}
+
+    def build(self):
+        self.models = {}
+
+        for model in apps.get_models():
+            if hasattr(model, 'stateCoordinatorPermissions'):
+                modelPermissionLevels = ModelPermissionLevels(model)
+
+                # The permission combinations used by the admin, so these are ready before the first request
+                modelPermissionLevels.filteringPermissionLevels(['view', 'change'])
+                modelPermissionLevels.filteringPermissionLevels(['add', 'change'])
+
+                self.models[model] = modelPermissionLevels
+
+        # Codenames across all models for each level, for state coordinators (False) and global coordinators (True)
+        self.levelCodenames = {}
+        for level in permissionLevels():
+            for globalCoordinator in (False, True):
+                codenames = set()
+                for modelPermissionLevels in self.models.values():
+                    codenames.update(modelPermissionLevels.codenames(level, globalCoordinator))
+                self.levelCodenames[(level, globalCoordinator)] = codenames
+
+    def get(self, model):
+        return self.models.get(model)
+
+    def codenames(self, level, globalCoordinator):
+        return self.levelCodenames.get((level, globalCoordinator), set())
+
+    # Inspect the permissions matrix, returns {model label: {level: {'state': [...], 'global': [...]}}}
+    def permissionMatrix(self):
+        return {
+            model._meta.label: {
+                level: {
+                    'state': modelPermissionLevels.statePermissions[level],
+                    'global': modelPermissionLevels.globalPermissions[level],
+                } for level in permissionLevels()
+            } for model, modelPermissionLevels in self.models.items()
+        }
+
+permissionLevelRegistry = PermissionLevelRegistry()
@@ -1,8 +1,34 @@
-from django.db.models import Q
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth import get_permission_codename
 
 from coordination.models import Coordinator
+from coordination.permissions.registry import permissionLevelRegistry, ModelPermissionLevels
+
+class CoordinatorPermissionTable:
+    # The user's coordinator permission levels loaded with one query, indexed by state pk with None for global coordinators
+    def __init__(self, user):
+        self.version = Coordinator.permissionsVersion
+        self.levelsByState = {}
+
+        for statePK, permissionLevel in user.coordinator_set.values_list('state', 'permissionLevel'):
+            self.levelsByState.setdefault(statePK, set()).add(permissionLevel)
+
+    def globalLevels(self):
+        return self.levelsByState.get(None, set())
+
+    def stateLevels(self, state):
+        return self.levelsByState.get(state.pk if state is not None else None, set())
+
+def coordinatorPermissionTable(user):
+    # Memoized on the user object, which lasts for the request, so permission checks after the first don't query the database
+    # Reloaded if any coordinator has been saved or deleted since it was loaded
+    table = getattr(user, '_coordinatorPermissionTable', None)
+
+    if table is None or table.version != Coordinator.permissionsVersion:
+        table = CoordinatorPermissionTable(user)
+        user._coordinatorPermissionTable = table
+
+    return table
 
 def coordinatorFilterQueryset(queryset, user, statePermissionLevels, globalPermissionLevels, statePermissionsFilterLookup, globalPermissionsFilterLookup):
     # Check user and is authenticated
@@ -92,10 +118,12 @@ def checkCoordinatorPermission(request, model, obj, permission):
     if not request.user.has_perm(f'{model._meta.app_label}.{codename}'):
         return False
 
+    permissionTable = coordinatorPermissionTable(request.user)
+
     # Check global coordinator permissions
-    for coordinator in request.user.coordinator_set.filter(state=None):
+    for permissionLevel in permissionTable.globalLevels():
         statePermissions = model.stateCoordinatorPermissions # Default to state permissions if globalCoordinatorPermissions not defined
-        if permission in getattr(model, 'globalCoordinatorPermissions', statePermissions)(coordinator.permissionLevel):
+        if permission in getattr(model, 'globalCoordinatorPermissions', statePermissions)(permissionLevel):
             return True
 
     # Check for global objects
@@ -114,8 +142,8 @@ def checkCoordinatorPermission(request, model, obj, permission):
     # State coordinator check
 
     # Check state coordinator permissions
-    for coordinator in request.user.coordinator_set.filter(state=obj.getState()):
-        if permission in model.stateCoordinatorPermissions(coordinator.permissionLevel):
+    for permissionLevel in permissionTable.stateLevels(obj.getState()):
+        if permission in model.stateCoordinatorPermissions(permissionLevel):
             return True
 
     # If nothing granting access, return False
@@ -151,28 +179,17 @@ def checkCoordinatorPermissionLevel(request, obj, permisisonLevels):
 
     # Check coordinator object
     # Check for both global coordinator (state=None) and state coordinator (state=obj.getState())
-    return request.user.coordinator_set.filter(Q(state=None) | Q(state=obj.getState()), permissionLevel__in=permisisonLevels).exists()
+    permissionTable = coordinatorPermissionTable(request.user)
+    userLevels = permissionTable.globalLevels() | permissionTable.stateLevels(obj.getState())
+    return not userLevels.isdisjoint(permisisonLevels)
 
 def getFilteringPermissionLevels(objectModel, permissions, permissionLevelOverride=None):
-    def reversePermissionsBase(permissionModel, objectModel, permissionsLookupName, permissions):
-        levels = []
-        for level in permissionModel.permissionLevelOptions:
-            for permission in permissions:
-                if permission in getattr(objectModel, permissionsLookupName)(level[0]):
-                    levels.append(level[0])
-        return levels
-
-    def reverseStatePermisisons(objectModel, permissions):
-        return reversePermissionsBase(Coordinator, objectModel, 'stateCoordinatorPermissions', permissions)
-
-    def reverseGlobalPermisisons(objectModel, permissions):
-        if not hasattr(objectModel, 'globalCoordinatorPermissions'):
-            return reverseStatePermisisons(objectModel, permissions)
-        
-        return reversePermissionsBase(Coordinator, objectModel, 'globalCoordinatorPermissions', permissions)
-
     # Need to use ternary to check for None and not just anything that evaluates to false, such as an empty list
-    statePermissionLevels = permissionLevelOverride if permissionLevelOverride is not None else reverseStatePermisisons(objectModel, permissions)
-    globalPermissionLevels = permissionLevelOverride if permissionLevelOverride is not None else reverseGlobalPermisisons(objectModel, permissions)
+    if permissionLevelOverride is not None:
+        return permissionLevelOverride, permissionLevelOverride
+
+    # Use the tables worked out at app ready
+    # Classes that aren't registered models, such as models used only in tests, are worked out now
+    modelPermissionLevels = permissionLevelRegistry.get(objectModel) or ModelPermissionLevels(objectModel)
 
-    return statePermissionLevels, globalPermissionLevels
+    return modelPermissionLevels.filteringPermissionLevels(permissions)
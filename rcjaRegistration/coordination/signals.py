@@ -7,4 +7,5 @@ from .models import Coordinator
 # This signal is important for security as it updates the user's permissions after the deletion of a coordinator object
 @receiver(post_delete, sender=Coordinator)
 def Coordinator_post_delete(sender, instance, **kwargs):
+    Coordinator.invalidatePermissionTables()
     instance.user.updateUserPermissions()
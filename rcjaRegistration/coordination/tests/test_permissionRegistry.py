@@ -0,0 +1,44 @@
+from django.test import TestCase
+from django.apps import apps
+
+from coordination.models import Coordinator
+from coordination.permissions import getFilteringPermissionLevels
+from coordination.permissions.registry import permissionLevelRegistry, reversePermissions
+from association.models import AssociationMember
+from teams.models import Team
+
+class TestPermissionLevelRegistry(TestCase):
+    def testAllModelsWithPermissionsRegistered(self):
+        for model in apps.get_models():
+            self.assertEqual(hasattr(model, 'stateCoordinatorPermissions'), permissionLevelRegistry.get(model) is not None, model)
+
+    def testFilteringPermissionLevelsMatchModelPermissions(self):
+        for model in permissionLevelRegistry.models:
+            statePermissions = {level: model.stateCoordinatorPermissions(level) for level, name in Coordinator.permissionLevelOptions}
+            globalPermissions = {level: getattr(model, 'globalCoordinatorPermissions', model.stateCoordinatorPermissions)(level) for level, name in Coordinator.permissionLevelOptions}
+
+            for permissions in (['view', 'change'], ['add', 'change']):
+                statePermissionLevels, globalPermissionLevels = getFilteringPermissionLevels(model, permissions)
+                self.assertEqual(reversePermissions(statePermissions, permissions), statePermissionLevels, model)
+                self.assertEqual(reversePermissions(globalPermissions, permissions), globalPermissionLevels, model)
+
+    def testAdminLookupsPrecomputed(self):
+        modelPermissionLevels = permissionLevelRegistry.get(Team)
+        self.assertIn(('view', 'change'), modelPermissionLevels.reverseLookups)
+        self.assertIn(('add', 'change'), modelPermissionLevels.reverseLookups)
+
+    def testOverride(self):
+        self.assertEqual((['full'], ['full']), getFilteringPermissionLevels(Team, ['view'], ['full']))
+        self.assertEqual(([], []), getFilteringPermissionLevels(Team, ['view'], []))
+
+    def testStateAndGlobalCodenames(self):
+        self.assertIn('view_associationmember', permissionLevelRegistry.codenames('associationmanager', False))
+        self.assertNotIn('change_associationmember', permissionLevelRegistry.codenames('associationmanager', False))
+        self.assertIn('change_associationmember', permissionLevelRegistry.codenames('associationmanager', True))
+        self.assertIn('change_team', permissionLevelRegistry.codenames('full', False))
+
+    def testPermissionMatrix(self):
+        matrix = permissionLevelRegistry.permissionMatrix()
+
+        self.assertEqual(AssociationMember.stateCoordinatorPermissions('viewall'), matrix['association.AssociationMember']['viewall']['state'])
+        self.assertEqual(AssociationMember.globalCoordinatorPermissions('full'), matrix['association.AssociationMember']['full']['global'])
@@ -364,6 +364,57 @@ class Test_checkCoordinatorPermissionLevel(TestCase):
 
         self.assertTrue(checkCoordinatorPermissionLevel(self.request, self.stateObj, ['full']))
 
+class Test_coordinatorPermissionTable(TestCase):
+    def setUp(self):
+        commonSetUp(self)
+
+        @classmethod
+        def statePerms(cls, level):
+            return ['change'] if level == 'full' else ['view']
+
+        ModelTestState.stateCoordinatorPermissions = statePerms
+
+    @patch('django.contrib.auth.models.PermissionsMixin.has_perm', return_value=True)
+    def testCoordinatorsLoadedOncePerUser(self, mock_has_perms):
+        self.request.user = User.objects.get(pk=self.user_state1_fullcoordinator.pk)
+        checkCoordinatorPermission(self.request, ModelTestState, self.stateObj, 'change')
+
+        with self.assertNumQueries(0):
+            self.assertTrue(checkCoordinatorPermission(self.request, ModelTestState, self.stateObj, 'change'))
+            self.assertFalse(checkCoordinatorPermission(self.request, ModelTestState, ModelTestState(self.state2), 'change'))
+            self.assertTrue(checkCoordinatorPermissionLevel(self.request, self.stateObj, ['full']))
+            self.assertFalse(self.request.user.isGobalCoordinator(['full']))
+
+    @patch('django.contrib.auth.models.PermissionsMixin.has_perm', return_value=True)
+    def testInvalidatedOnCoordinatorSave(self, mock_has_perms):
+        self.request.user = User.objects.get(pk=self.user_state1_fullcoordinator.pk)
+        self.assertFalse(checkCoordinatorPermission(self.request, ModelTestState, ModelTestState(self.state2), 'change'))
+
+        Coordinator.objects.create(user=self.user_state1_fullcoordinator, state=self.state2, permissionLevel='full', position='Thing')
+
+        self.assertTrue(checkCoordinatorPermission(self.request, ModelTestState, ModelTestState(self.state2), 'change'))
+
+    @patch('django.contrib.auth.models.PermissionsMixin.has_perm', return_value=True)
+    def testInvalidatedOnCoordinatorChange(self, mock_has_perms):
+        self.request.user = User.objects.get(pk=self.user_state1_fullcoordinator.pk)
+        self.assertTrue(checkCoordinatorPermission(self.request, ModelTestState, self.stateObj, 'change'))
+
+        coordinator = Coordinator.objects.get(user=self.user_state1_fullcoordinator, state=self.state1)
+        coordinator.permissionLevel = 'viewall'
+        coordinator.save()
+
+        self.assertFalse(checkCoordinatorPermission(self.request, ModelTestState, self.stateObj, 'change'))
+        self.assertTrue(checkCoordinatorPermission(self.request, ModelTestState, self.stateObj, 'view'))
+
+    @patch('django.contrib.auth.models.PermissionsMixin.has_perm', return_value=True)
+    def testInvalidatedOnCoordinatorDelete(self, mock_has_perms):
+        self.request.user = User.objects.get(pk=self.user_state1_fullcoordinator.pk)
+        self.assertTrue(checkCoordinatorPermission(self.request, ModelTestState, self.stateObj, 'change'))
+
+        Coordinator.objects.filter(user=self.user_state1_fullcoordinator).delete()
+
+        self.assertFalse(checkCoordinatorPermission(self.request, ModelTestState, self.stateObj, 'change'))
+
 class Test_getFilteringPermissionLevels(TestCase):
     def testStatePermissionsOneLevel(self):
         @classmethod
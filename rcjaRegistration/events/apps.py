@@ -3,3 +3,5 @@ from django.apps import AppConfig
 
 class EventsConfig(AppConfig):
     name = 'events'
+    def ready(self):
+        import events.signals
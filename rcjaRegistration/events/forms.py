@@ -3,6 +3,7 @@ from django import forms
 from events.models import Division, Year
 from schools.models import Campus
 from events.models import AvailableDivision
+from common.referenceData import referenceData
 
 class BaseEventAttendanceFormInitMixin:
     # Override init to filter division and campus, set school and event
@@ -13,8 +14,9 @@ class BaseEventAttendanceFormInitMixin:
 
         # Filter divisions to maximium not exceeded
         validDivisions = []
+        registrationCounts = event.registrationCounts(user)
         for availableDivision in AvailableDivision.objects.filter(event=event, division__in = self.fields['division'].queryset.values_list('pk', flat=True)):
-            if not (availableDivision.maxDivisionRegistrationsForSchoolReached(user) or availableDivision.maxDivisionRegistrationsTotalReached()):
+            if not (availableDivision.maxDivisionRegistrationsForSchoolReached(user, registrationCounts) or availableDivision.maxDivisionRegistrationsTotalReached(registrationCounts)):
                 validDivisions.append(availableDivision.division.id)
         
         # Add current division if existing team - in case override added by coordinator through admin
@@ -50,10 +52,21 @@ def getSummaryForm(request):
         states = [(state.pk, state.name) for state in request.user.adminViewableStates()]
         states.insert(0, ('', '---------'))
         
-        years = [(year.year, year.year) for year in Year.objects.all()]
+        years = [(year.year, year.year) for year in referenceData(Year)]
 
         state = forms.TypedChoiceField(choices=states, coerce=int)
         year = forms.TypedChoiceField(choices=years, coerce=int)
 
     return SummaryRequestForm(request.GET)
 
+def getSummaryComparisonForm(request):
+    # Use constructor function as user from request is required for permissions
+    class SummaryComparisonRequestForm(forms.Form):
+        states = [(state.pk, state.name) for state in request.user.adminViewableStates()]
+        years = [(year.year, year.year) for year in referenceData(Year)]
+
+        states = forms.TypedMultipleChoiceField(choices=states, coerce=int)
+        years = forms.TypedMultipleChoiceField(choices=years, coerce=int)
+
+    return SummaryComparisonRequestForm(request.GET)
+
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from events.models import Event
+
+class Command(BaseCommand):
+    help = "Stores sanitized event details HTML for events saved before it was computed on save"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute the sanitized HTML for every event, not only events missing it')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of events updated per query')
+
+    def handle(self, *args, **options):
+        events = Event.objects.exclude(eventDetails='')
+        if not options['all']:
+            events = events.filter(eventDetailsHTML='')
+
+        batchSize = options['batch_size']
+        updated = 0
+        batch = []
+
+        for event in events.only('pk', 'eventDetails', 'eventDetailsHTML').iterator(chunk_size=batchSize):
+            event.eventDetailsHTML = Event.cleanEventDetails(event.eventDetails)
+            batch.append(event)
+
+            if len(batch) >= batchSize:
+                Event.objects.bulk_update(batch, ['eventDetailsHTML'])
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            Event.objects.bulk_update(batch, ['eventDetailsHTML'])
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated sanitized event details for {updated} events'))
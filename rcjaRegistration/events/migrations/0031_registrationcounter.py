@@ -0,0 +1,49 @@
+# Generated by Django 5.2.16 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populateRegistrationCounters(apps, schema_editor):
+    BaseEventAttendance = apps.get_model('events', 'BaseEventAttendance')
+    RegistrationCounter = apps.get_model('events', 'RegistrationCounter')
+
+    counters = []
+    # School registrations
+    for row in BaseEventAttendance.objects.exclude(school=None).order_by().values('event', 'division', 'school').annotate(number=Count('pk')):
+        counters.append(RegistrationCounter(event_id=row['event'], division_id=row['division'], school_id=row['school'], count=row['number']))
+    # Independent registrations
+    for row in BaseEventAttendance.objects.filter(school=None).order_by().values('event', 'division', 'mentorUser').annotate(number=Count('pk')):
+        counters.append(RegistrationCounter(event_id=row['event'], division_id=row['division'], mentorUser_id=row['mentorUser'], count=row['number']))
+
+    RegistrationCounter.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0030_baseeventattendance_csv_imported'),
+        ('schools', '0009_remove_school_abbreviation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Count')),
+                ('division', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='events.division', verbose_name='Division')),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='events.event', verbose_name='Event')),
+                ('mentorUser', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Mentor')),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='schools.school', verbose_name='School')),
+            ],
+            options={
+                'verbose_name': 'Registration counter',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('mentorUser', None)), fields=('event', 'division', 'school'), name='registrationcounter_event_division_school'), models.UniqueConstraint(condition=models.Q(('school', None)), fields=('event', 'division', 'mentorUser'), name='registrationcounter_event_division_mentor')],
+            },
+        ),
+        migrations.RunPython(populateRegistrationCounters, migrations.RunPython.noop),
+    ]
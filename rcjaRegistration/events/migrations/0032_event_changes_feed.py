@@ -0,0 +1,36 @@
+# Generated by Django 5.2.16 on 2026-10-18 10:34
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0031_registrationcounter'),
+        ('regions', '0007_remove_state_typeregistration_state_typecompetition_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eventID', models.PositiveIntegerField(verbose_name='Event ID')),
+                ('deletedDateTime', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Deleted date')),
+            ],
+            options={
+                'verbose_name': 'Deleted event',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['updatedDateTime', 'id'], name='event_updated_id'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedevent',
+            index=models.Index(fields=['deletedDateTime', 'eventID'], name='deletedevent_deleted_id'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.16 on 2026-10-18 10:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0032_event_changes_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='eventDetailsHTML',
+            field=models.TextField(blank=True, editable=False, verbose_name='Sanitized event details'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.16 on 2026-10-18 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def setShownOnWebsite(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+
+    # Published events may have been shown in a year no longer displayed, so include all of them
+    Event.objects.filter(status='published').update(shownOnWebsite=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0033_event_eventdetailshtml'),
+        ('regions', '0007_remove_state_typeregistration_state_typecompetition_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletedevent',
+            name='globalEvent',
+            field=models.BooleanField(default=False, verbose_name='Global event'),
+        ),
+        migrations.AddField(
+            model_name='deletedevent',
+            name='state',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='regions.state', verbose_name='State'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='shownOnWebsite',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Shown on website'),
+        ),
+        migrations.RunPython(setShownOnWebsite, migrations.RunPython.noop),
+    ]
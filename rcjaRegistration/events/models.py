@@ -1,12 +1,14 @@
 from django.db import models
-from django.db.models import F, Q
+from django.db.models import F, Q, Sum
 from common.models import SaveDeleteMixin, checkRequiredFieldsNotNone
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.urls import reverse
+from django.utils import timezone
 
 import bleach
 import datetime
+from collections import Counter
 
 from django.utils.html import format_html, mark_safe
 from django.template.defaultfilters import filesizeformat
@@ -16,6 +18,7 @@ from rcjaRegistration.storageBackends import PublicMediaStorage
 from django.templatetags.static import static
 
 from invoices.models import Invoice, InvoiceGlobalSettings
+from invoices.recalculation import recalculateInvoiceTotals
 from schools.models import SchoolAdministrator
 
 # **********MODELS**********
@@ -126,6 +129,9 @@ class Division(models.Model):
 
     # *****Get Methods*****
 
+    # Related fields used in __str__, loaded with admin CSV exports
+    strSelectRelated = ['state']
+
     def __str__(self):
         if self.state:
             return f'{self.name} ({self.state})'
@@ -251,6 +257,8 @@ class Event(SaveDeleteMixin, models.Model):
     statusChoices = (('draft', 'Draft'), ('published', 'Published'))
     status = models.CharField('Status', max_length=15, choices=statusChoices, default='draft', help_text="Event must be published to be visible and for people to register. Can't unpublish once people have registered.")
     cmsEventId = models.CharField('CMS Event ID', max_length=15, blank=False, null=True, editable=False, help_text='The ID of this event in the RCJ CMS')
+    # Set once the event has been shown on the website, so the public API changes feed only returns tombstones for events clients could have seen
+    shownOnWebsite = models.BooleanField('Shown on website', default=False, editable=False)
 
     # Banner image
     eventBannerImage = UUIDImageField('Banner image', storage=PublicMediaStorage(), upload_prefix='EventBannerImage', original_filename_field='eventBannerImageOriginalFilename', null=True, blank=True)
@@ -289,6 +297,7 @@ class Event(SaveDeleteMixin, models.Model):
     directEnquiriesTo = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name='Direct enquiries to', on_delete=models.PROTECT, help_text="This person's name and email will appear on the event page")
     venue = models.ForeignKey(Venue, verbose_name='Venue', on_delete=models.PROTECT, null=True, blank=True)
     eventDetails = models.TextField('Event details', blank=True)
+    eventDetailsHTML = models.TextField('Sanitized event details', blank=True, editable=False) # Event details cleaned by bleach on save, so it isn't run each time the details are displayed
     additionalInvoiceMessage = models.TextField('Additional invoice message', blank=True, help_text='This appears below the state based invoice message on the invoice.')
 
     # Available divisions
@@ -301,6 +310,10 @@ class Event(SaveDeleteMixin, models.Model):
         constraints = [
             models.CheckConstraint(check=models.Q(eventType='workshop') | models.Q(eventType='competition'), name='eventType_check'),
         ]
+        indexes = [
+            # Public API changes feed
+            models.Index(fields=['updatedDateTime', 'id'], name='event_updated_id'),
+        ]
         ordering = ['-startDate']
 
     def clean(self):
@@ -403,37 +416,52 @@ class Event(SaveDeleteMixin, models.Model):
 
         # Set surcharge amount to global settings value
         if self.pk is None:
-            try:
-                self.eventSurchargeAmount = InvoiceGlobalSettings.objects.get().surchargeAmount
-            except InvoiceGlobalSettings.DoesNotExist:
-                pass # Already set to 0 by default
+            invoiceSettings = InvoiceGlobalSettings.getCached()
+            if invoiceSettings:
+                self.eventSurchargeAmount = invoiceSettings.surchargeAmount
+            # Otherwise already set to 0 by default
+
+        # Sanitize event details
+        if self.hasChanged('eventDetails') or (self.eventDetails and not self.eventDetailsHTML):
+            self.eventDetailsHTML = Event.cleanEventDetails(self.eventDetails)
 
         self.billingDetailsChanged = self.checkBillingDetailsChanged()
 
         self.eventConvertedToPaid = self.checkEventConvertedToPaid()
 
+        # Public API changes feed
+        if not self.shownOnWebsite and self.status == 'published' and self.year.displayEventsOnWebsite:
+            self.shownOnWebsite = True
+
+        # Moved to another state or changed global event, the previous state needs a tombstone
+        self.publicStateChanged = self.shownOnWebsite and self.previousTrackedValues() is not None and (self.hasChanged('state') or self.hasChanged('globalEvent'))
+
+    # Fields that change invoice amounts
+    billingFields = [
+        'entryFeeIncludesGST',
+        'competition_defaultEntryFee',
+        'competition_billingType',
+        'competition_specialRateNumber',
+        'competition_specialRateFee',
+        'workshopTeacherEntryFee',
+        'workshopStudentEntryFee',
+    ]
+
+    # eventType also tracked because paidEvent depends on it
+    trackedFields = billingFields + ['eventType', 'eventDetails', 'state', 'globalEvent']
+
     def checkBillingDetailsChanged(self):
-        try:
-            previousEvent = Event.objects.get(pk=self.pk)
-        except Event.DoesNotExist:
-            # Return false on new event because no invoices can exist yet
+        # Return false on new event because no invoices can exist yet
+        if self.previousTrackedValues() is None:
             return False
 
-        return (
-            self.entryFeeIncludesGST != previousEvent.entryFeeIncludesGST or
-            self.competition_defaultEntryFee != previousEvent.competition_defaultEntryFee or
-            self.competition_billingType != previousEvent.competition_billingType or
-            self.competition_specialRateNumber != previousEvent.competition_specialRateNumber or
-            self.competition_specialRateFee != previousEvent.competition_specialRateFee or
-            self.workshopTeacherEntryFee != previousEvent.workshopTeacherEntryFee or
-            self.workshopStudentEntryFee != previousEvent.workshopStudentEntryFee
-        )
+        return any(self.hasChanged(field) for field in self.billingFields)
 
     def checkEventConvertedToPaid(self):
-        try:
-            previousEvent = Event.objects.get(pk=self.pk)
-        except Event.DoesNotExist:
-            # Return false on new event because no invoices can exist yet
+        previousEvent = self.previousInstance()
+
+        # Return false on new event because no invoices can exist yet
+        if previousEvent is None:
             return False
 
         return not previousEvent.paidEvent() and self.paidEvent()
@@ -441,29 +469,33 @@ class Event(SaveDeleteMixin, models.Model):
     def postSave(self):
         if self.billingDetailsChanged: # Set in presave so can see the previous value before database operation
             for invoice in self.invoice_set.all():
-                invoice.calculateAndSaveAllTotals()
+                recalculateInvoiceTotals(invoice)
 
         if self.eventConvertedToPaid:
             for baseEvemtAttendance in self.baseeventattendance_set.all():
                 baseEvemtAttendance.createUpdateInvoices()
 
+        if self.publicStateChanged:
+            DeletedEvent.objects.create(eventID=self.pk, state_id=self.previousValue('state'), globalEvent=self.previousValue('globalEvent'))
+
     # *****Methods*****
 
     # *****Get Methods*****
 
+    # Mark events as changed in the public API changes feed, for changes to related objects shown with the events
+    @staticmethod
+    def markChanged(events):
+        events.update(updatedDateTime=timezone.now())
+
     def surchargeName(self):
         # For serializer
-        try:
-            return InvoiceGlobalSettings.objects.get().surchargeName
-        except InvoiceGlobalSettings.DoesNotExist:
-            return ''
+        invoiceSettings = InvoiceGlobalSettings.getCached()
+        return invoiceSettings.surchargeName if invoiceSettings else ''
 
     def surchargeEventDescription(self):
         # For serializer
-        try:
-            return InvoiceGlobalSettings.objects.get().surchargeEventDescription
-        except InvoiceGlobalSettings.DoesNotExist:
-            return ''
+        invoiceSettings = InvoiceGlobalSettings.getCached()
+        return invoiceSettings.surchargeEventDescription if invoiceSettings else ''
         
     def hasAllDates(self):
         return (
@@ -522,11 +554,28 @@ class Event(SaveDeleteMixin, models.Model):
                 'mentorUser': user
             }
 
-    def maxEventRegistrationsForSchoolReached(self, user):
-        return self.event_maxRegistrationsPerSchool is not None and self.baseeventattendance_set.filter(**self.getBaseEventAttendanceFilterDict(user)).count() >= self.event_maxRegistrationsPerSchool
+    # Registration limits
+    # Pass counts from registrationCounts to check several limits without querying the counters again
+
+    def registrationCounts(self, user=None):
+        return EventRegistrationCounts(self, user)
+
+    def maxEventRegistrationsForSchoolReached(self, user, counts=None):
+        if self.event_maxRegistrationsPerSchool is None:
+            return False
+        counts = counts or self.registrationCounts(user)
+        return counts.forSchool >= self.event_maxRegistrationsPerSchool
+
+    def maxEventRegistrationsTotalReached(self, counts=None):
+        if self.event_maxRegistrationsForEvent is None:
+            return False
+        counts = counts or self.registrationCounts()
+        return counts.total >= self.event_maxRegistrationsForEvent
 
-    def maxEventRegistrationsTotalReached(self):
-        return self.event_maxRegistrationsForEvent is not None and self.baseeventattendance_set.count() >= self.event_maxRegistrationsForEvent
+    def lockRegistrations(self):
+        # Lock the event row until the end of the current transaction
+        # Registrations for the event are checked against the limits and created one at a time while the lock is held
+        list(Event.objects.select_for_update().filter(pk=self.pk).values_list('pk', flat=True))
 
     def directEnquiriesToName(self):
         return self.directEnquiriesTo.fullname_or_email()
@@ -550,8 +599,17 @@ class Event(SaveDeleteMixin, models.Model):
     def registrationName(self):
         return 'workshop attendee' if self.boolWorkshop() else 'team'
 
+    @staticmethod
+    def cleanEventDetails(eventDetails):
+        return bleach.clean(eventDetails)
+
     def bleachedEventDetails(self):
-        return mark_safe(bleach.clean(self.eventDetails))
+        # Cleaned on save, fall back to cleaning here for events saved before the stored value was added
+        # Run the backfilleventdetails command to set the stored value on existing events
+        if self.eventDetails and not self.eventDetailsHTML:
+            return mark_safe(Event.cleanEventDetails(self.eventDetails))
+
+        return mark_safe(self.eventDetailsHTML)
 
     def registrationsAdminURL(self):
         if self.boolWorkshop():
@@ -578,6 +636,9 @@ class Event(SaveDeleteMixin, models.Model):
         return filesizeformat(self.eventBannerImage.size)
     bannerImageFilesize.short_description = 'Size'
 
+    # Related fields used in __str__, loaded with admin CSV exports
+    strSelectRelated = ['year', 'state']
+
     def __str__(self):
         if not (self.globalEvent or self.state.typeGlobal):
             return f'{self.name} {self.year} ({self.state.abbreviation})'
@@ -652,21 +713,31 @@ class AvailableDivision(SaveDeleteMixin, models.Model):
 
     def postSave(self):
         for invoice in self.event.invoice_set.all():
-            invoice.calculateAndSaveAllTotals()
+            recalculateInvoiceTotals(invoice)
+
+        Event.markChanged(Event.objects.filter(pk=self.event_id))
 
     def postDelete(self):
         for invoice in self.event.invoice_set.all():
-            invoice.calculateAndSaveAllTotals()
+            recalculateInvoiceTotals(invoice)
+
+        Event.markChanged(Event.objects.filter(pk=self.event_id))
 
     # *****Methods*****
 
     # *****Get Methods*****
 
-    def maxDivisionRegistrationsForSchoolReached(self, user):
-        return self.division_maxRegistrationsPerSchool is not None and self.division.baseeventattendance_set.filter(**self.event.getBaseEventAttendanceFilterDict(user)).count() >= self.division_maxRegistrationsPerSchool
+    def maxDivisionRegistrationsForSchoolReached(self, user, counts=None):
+        if self.division_maxRegistrationsPerSchool is None:
+            return False
+        counts = counts or self.event.registrationCounts(user)
+        return counts.divisionForSchool[self.division_id] >= self.division_maxRegistrationsPerSchool
 
-    def maxDivisionRegistrationsTotalReached(self):
-        return self.division_maxRegistrationsForDivision is not None and self.division.baseeventattendance_set.filter(event=self.event).count() >= self.division_maxRegistrationsForDivision
+    def maxDivisionRegistrationsTotalReached(self, counts=None):
+        if self.division_maxRegistrationsForDivision is None:
+            return False
+        counts = counts or self.event.registrationCounts()
+        return counts.divisionTotals[self.division_id] >= self.division_maxRegistrationsForDivision
 
     def __str__(self):
         return str(self.division)
@@ -726,7 +797,7 @@ class BaseEventAttendance(SaveDeleteMixin, models.Model):
         # Check not None because set after clean in frontend forms
         if getattr(self, 'mentorUser', None) and getattr(self, 'school', None):
             # Check not the current values in case mentor removed as admin of school after the event
-            if not self.pk or self.mentorUser != BaseEventAttendance.objects.get(pk=self.pk).mentorUser or self.school != BaseEventAttendance.objects.get(pk=self.pk).school:
+            if not self.pk or self.hasChanged('mentorUser') or self.hasChanged('school'):
                 if not SchoolAdministrator.objects.filter(user=self.mentorUser, school=self.school).exists():
                     errors.append(ValidationError(f"{self.mentorUser.get_full_name()} is not an administrator of {self.school}"))
 
@@ -773,7 +844,10 @@ class BaseEventAttendance(SaveDeleteMixin, models.Model):
                 )
 
             if not created:
-                invoice.calculateAndSaveAllTotals()
+                recalculateInvoiceTotals(invoice)
+
+    schoolValueFields = ['school', 'mentorUser', 'campus', 'invoiceOverride']
+    trackedFields = schoolValueFields + ['event', 'division']
 
     def preSave(self):
         self.setPreviousSchoolValues()
@@ -784,36 +858,43 @@ class BaseEventAttendance(SaveDeleteMixin, models.Model):
             self.previousObject.createUpdateInvoices()
             
             if self.previousObject.invoiceOverride:
-                self.previousObject.invoiceOverride.calculateAndSaveAllTotals()
+                recalculateInvoiceTotals(self.previousObject.invoiceOverride)
 
         if self.invoiceOverride:
-            self.invoiceOverride.calculateAndSaveAllTotals()
+            recalculateInvoiceTotals(self.invoiceOverride)
 
+        self.updateRegistrationCounters()
+
+    # Registration counters are decremented on delete by the post_delete signal, so cascade deletes are counted too
     def postDelete(self):
         self.createUpdateInvoices()
 
     # *****Methods*****
 
-    # Check if school, mentorUser or campus changed
+    # Check if school, mentorUser, campus or invoiceOverride changed
     def checkSchoolValuesChanged(self):
-        return (
-            self.school != self.previousObject.school or
-            self.mentorUser != self.previousObject.mentorUser or
-            self.campus != self.previousObject.campus or
-            self.invoiceOverride != self.previousObject.invoiceOverride
-        )
+        return any(self.hasChanged(field) for field in self.schoolValueFields)
 
     # Get previous school, mentorUser and campus if changed and set fields on object with old values
     def setPreviousSchoolValues(self):
         self.schoolValuesChanged = False
-        try:
-            self.previousObject = BaseEventAttendance.objects.get(pk=self.pk)
+        self.previousObject = self.previousInstance()
+
+        if self.previousObject is not None and self.checkSchoolValuesChanged():
+            self.schoolValuesChanged = True
+
+    # Move this registration to the counter for the new event, division and school if any changed
+    def updateRegistrationCounters(self):
+        key = RegistrationCounter.keyForAttendance(self)
 
-            if self.checkSchoolValuesChanged():
-                self.schoolValuesChanged = True
+        if self.previousObject is None:
+            RegistrationCounter.adjust(key, 1)
+            return
 
-        except BaseEventAttendance.DoesNotExist:
-            pass
+        previousKey = RegistrationCounter.keyForAttendance(self.previousObject)
+        if previousKey != key:
+            RegistrationCounter.adjust(previousKey, -1)
+            RegistrationCounter.adjust(key, 1)
 
     # *****Get Methods*****
 
@@ -838,31 +919,36 @@ class BaseEventAttendance(SaveDeleteMixin, models.Model):
             return self.school.state
         return self.mentorUser.homeState
     homeState.short_description = 'Home state'
+    homeState.exportSelectRelated = ['school__state', 'mentorUser__homeState']
 
     def homeRegion(self):
         if self.school:
             return self.school.region
         return self.mentorUser.homeRegion
     homeRegion.short_description = 'Home region'
+    homeRegion.exportSelectRelated = ['school__region', 'mentorUser__homeRegion']
 
     def schoolPostcode(self):
         if self.school:
             return self.school.postcode
         return None
     schoolPostcode.short_description = 'School postcode'
+    schoolPostcode.exportSelectRelated = ['school']
 
     def mentorUserName(self):
         return self.mentorUser.fullname_or_email()
     mentorUserName.short_description = 'Mentor'
     mentorUserName.admin_order_field = 'mentorUser'
+    mentorUserName.exportSelectRelated = ['mentorUser']
 
     def mentorUserEmail(self):
         return self.mentorUser.email
     mentorUserEmail.short_description = 'Mentor email'
     mentorUserEmail.admin_order_field = 'mentorUser__email'
+    mentorUserEmail.exportSelectRelated = ['mentorUser']
 
     def mentorUserPK(self):
-        return self.mentorUser.pk
+        return self.mentorUser_id
     mentorUserPK.short_description = 'Mentor PK'
 
     # Returns true if campus based invoicing enabled for this school for this event
@@ -877,6 +963,7 @@ class BaseEventAttendance(SaveDeleteMixin, models.Model):
     # Makes the question responses queryset for the mentor available here for CSV export
     def mentor_questionresponse_set(self):
         return self.mentorUser.questionresponse_set
+    mentor_questionresponse_set.exportRelation = 'mentorUser__questionresponse_set'
 
     # File upload
 
@@ -886,3 +973,96 @@ class BaseEventAttendance(SaveDeleteMixin, models.Model):
     # *****CSV export methods*****
 
     # *****Email methods*****
+
+class DeletedEvent(models.Model):
+    # Record of a deleted event, returned as a tombstone in the public API changes feed
+    # Also created when a shown event moves to another state, with the previous state
+    eventID = models.PositiveIntegerField('Event ID')
+    deletedDateTime = models.DateTimeField('Deleted date', default=timezone.now)
+
+    # State and global event of the event when deleted, so the tombstone is only returned for that state
+    state = models.ForeignKey('regions.State', verbose_name='State', on_delete=models.CASCADE, null=True)
+    globalEvent = models.BooleanField('Global event', default=False)
+
+    # *****Meta and clean*****
+    class Meta:
+        verbose_name = 'Deleted event'
+        indexes = [
+            models.Index(fields=['deletedDateTime', 'eventID'], name='deletedevent_deleted_id'),
+        ]
+
+    def __str__(self):
+        return f'Event {self.eventID}'
+
+class RegistrationCounter(models.Model):
+    # Number of teams/ workshop attendees for each event, division and school, or mentor for independent registrations
+    # Kept up to date when attendances are saved and deleted, so registration limits are checked without counting attendances
+    event = models.ForeignKey(Event, verbose_name='Event', on_delete=models.CASCADE)
+    division = models.ForeignKey(Division, verbose_name='Division', on_delete=models.CASCADE)
+    school = models.ForeignKey('schools.School', verbose_name='School', on_delete=models.CASCADE, null=True, blank=True)
+    # Only set for independent registrations
+    mentorUser = models.ForeignKey(settings.AUTH_USER_MODEL, verbose_name='Mentor', on_delete=models.CASCADE, null=True, blank=True)
+
+    count = models.PositiveIntegerField('Count', default=0)
+
+    # *****Meta and clean*****
+    class Meta:
+        verbose_name = 'Registration counter'
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'division', 'school'], condition=Q(mentorUser=None), name='registrationcounter_event_division_school'),
+            models.UniqueConstraint(fields=['event', 'division', 'mentorUser'], condition=Q(school=None), name='registrationcounter_event_division_mentor'),
+        ]
+
+    # *****Methods*****
+
+    @staticmethod
+    def keyForAttendance(attendance):
+        return {
+            'event_id': attendance.event_id,
+            'division_id': attendance.division_id,
+            'school_id': attendance.school_id,
+            'mentorUser_id': None if attendance.school_id is not None else attendance.mentorUser_id,
+        }
+
+    @classmethod
+    def adjust(cls, key, amount):
+        # Update the count in the database so concurrent changes aren't lost
+        if amount > 0:
+            counter, created = cls.objects.get_or_create(**key)
+            cls.objects.filter(pk=counter.pk).update(count=F('count') + amount)
+        else:
+            cls.objects.filter(**key, count__gte=-amount).update(count=F('count') + amount)
+
+    @classmethod
+    def moveSchool(cls, fromSchool, toSchool):
+        # Add the counts of one school to another, used when schools are merged
+        for counter in cls.objects.filter(school=fromSchool):
+            cls.adjust(cls.keyForAttendance(counter) | {'school_id': toSchool.pk}, counter.count)
+            counter.delete()
+
+    def __str__(self):
+        return f'{self.event} {self.division}: {self.count}'
+
+class EventRegistrationCounts:
+    # Registration counts for an event, read from the counters in one query
+    # Counts for school are for the user's currently selected school, or the user's independent registrations if no school selected
+    def __init__(self, event, user=None):
+        self.total = 0
+        self.forSchool = 0
+        self.divisionTotals = Counter()
+        self.divisionForSchool = Counter()
+
+        aggregates = {'total': Sum('count')}
+        if user is not None:
+            if user.currentlySelectedSchool_id is not None:
+                schoolFilter = Q(school=user.currentlySelectedSchool_id)
+            else:
+                schoolFilter = Q(school=None, mentorUser=user)
+            aggregates['forSchool'] = Sum('count', filter=schoolFilter)
+
+        for row in RegistrationCounter.objects.filter(event=event).order_by().values('division').annotate(**aggregates):
+            self.divisionTotals[row['division']] = row['total'] or 0
+            self.divisionForSchool[row['division']] = row.get('forSchool') or 0
+
+        self.total = sum(self.divisionTotals.values())
+        self.forSchool = sum(self.divisionForSchool.values())
@@ -0,0 +1,42 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import BaseEventAttendance, RegistrationCounter, Event, DeletedEvent, Division, Venue, Year
+from users.models import User
+
+# BaseEventAttendance post-delete
+# Decrement the registration counter, also runs when attendances are deleted by cascade or queryset delete
+@receiver(post_delete, sender=BaseEventAttendance)
+def BaseEventAttendance_post_delete(sender, instance, **kwargs):
+    RegistrationCounter.adjust(RegistrationCounter.keyForAttendance(instance), -1)
+
+# Event post-delete
+# Tombstone for the public API changes feed, only needed if clients could have seen the event
+@receiver(post_delete, sender=Event)
+def Event_post_delete(sender, instance, **kwargs):
+    if instance.shownOnWebsite:
+        DeletedEvent.objects.create(eventID=instance.pk, state_id=instance.state_id, globalEvent=instance.globalEvent)
+
+# Division, Venue, Year and User post-save
+# Shown with events in the public API, so the events are included in the changes feed
+@receiver(post_save, sender=Division)
+def Division_post_save(sender, instance, **kwargs):
+    Event.markChanged(Event.objects.filter(availabledivision__division=instance))
+
+@receiver(post_save, sender=Venue)
+def Venue_post_save(sender, instance, **kwargs):
+    Event.markChanged(Event.objects.filter(venue=instance))
+
+@receiver(post_save, sender=Year)
+def Year_post_save(sender, instance, **kwargs):
+    if instance.displayEventsOnWebsite:
+        Event.objects.filter(year=instance, status='published', shownOnWebsite=False).update(shownOnWebsite=True)
+    Event.markChanged(Event.objects.filter(year=instance))
+
+# The user is shown as the event contact, only if their name or email could have changed
+@receiver(post_save, sender=User)
+def User_post_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'first_name', 'last_name', 'email'} & set(update_fields):
+        return
+
+    Event.markChanged(Event.objects.filter(directEnquiriesTo=instance))
@@ -0,0 +1,171 @@
+from django.db.models import Count
+
+from collections import Counter, defaultdict
+
+from .models import Event, BaseEventAttendance
+from teams.models import Student
+from workshops.models import WorkshopAttendee
+
+# Activity summary report
+# Counts for all events are worked out with a few grouped count queries, instead of queries for every team and attendee
+
+genders = ['female', 'male', 'other']
+
+def genderKey(gender):
+    # Anything other than male or female is counted as other
+    return gender if gender in ['male', 'female'] else 'other'
+
+def genderSummary(counts):
+    total = sum(counts[gender] for gender in genders)
+
+    if total > 0:
+        percents = {gender: round(counts[gender]/total*100) for gender in genders}
+    else:
+        percents = {gender: 0 for gender in genders}
+
+    return f"{percents['female']}%F, {percents['male']}%M, {percents['other']}% other"
+
+def eventDate(event):
+    if event.startDate == event.endDate:
+        if event.startDate is not None:
+            return event.startDate.strftime('%d/%m/%Y')
+        return None
+
+    return f"{event.startDate.strftime('%d/%m/%Y')} - {event.endDate.strftime('%d/%m/%Y')}"
+
+def attendanceCounts(eventPKs):
+    # Returns (teams, students, workshopAttendees)
+    # teams: {eventPK: number}, every attendance of a competition is a team
+    # students: {eventPK: Counter of gender}
+    # workshopAttendees: {eventPK: Counter of attendee type and gender}
+
+    teams = dict(BaseEventAttendance.objects.filter(event__in=eventPKs).order_by().values_list('event').annotate(number=Count('pk')))
+
+    students = defaultdict(Counter)
+    for eventPK, gender, number in Student.objects.filter(team__event__in=eventPKs).order_by().values_list('team__event', 'gender').annotate(number=Count('pk')):
+        students[eventPK][genderKey(gender)] += number
+
+    workshopAttendees = defaultdict(Counter)
+    for eventPK, attendeeType, gender, number in WorkshopAttendee.objects.filter(event__in=eventPKs).order_by().values_list('event', 'attendeeType', 'gender').annotate(number=Count('pk')):
+        workshopAttendees[eventPK]['student' if attendeeType == 'student' else 'teacher'] += number
+        workshopAttendees[eventPK][genderKey(gender)] += number
+
+    return teams, students, workshopAttendees
+
+def eventSummaries(events):
+    """ Create list of event dictionaries with participant counts for events """
+    events = list(events.select_related('state', 'year', 'venue'))
+    teams, students, workshopAttendees = attendanceCounts([event.pk for event in events])
+
+    summaries = []
+    for event in events:
+        eventDict = {
+            'event': event,
+            'name': event.name,
+            'eventType': event.eventType,
+            'state': event.state,
+            'year': event.year,
+            'date': eventDate(event),
+            'location': event.venue.name if event.venue is not None else "None",
+        }
+
+        if event.eventType == "competition":
+            counts = students[event.pk]
+            eventDict['teams'] = teams.get(event.pk, 0)
+            eventDict['students'] = sum(counts[gender] for gender in genders)
+            eventDict['teachers'] = 0
+
+            eventDict["participants_one"] = f"Teams: {eventDict['teams']}"
+            eventDict["participants_two"] = f"Students: {eventDict['students']}"
+        else: # Workshop
+            counts = workshopAttendees[event.pk]
+            eventDict['teams'] = 0
+            eventDict['students'] = counts['student']
+            eventDict['teachers'] = counts['teacher']
+
+            eventDict["participants_one"] = f"Students: {eventDict['students']}"
+            eventDict["participants_two"] = f"Teachers: {eventDict['teachers']}"
+
+        for gender in genders:
+            eventDict[gender] = counts[gender]
+        eventDict["participants_three"] = genderSummary(counts)
+
+        summaries.append(eventDict)
+
+    return summaries
+
+def getEventsForSummary(state, year):
+    """ Create list of event dictionaries of all events in state and year """
+    return eventSummaries(Event.objects.filter(state=state, year=year).order_by('startDate', 'endDate'))
+
+def getComparisonSummary(states, years):
+    """ Create list of totals for each state and year, from the same counts as the event summary """
+    rows = {}
+    for state in sorted(states, key=lambda state: state.name):
+        for year in sorted(years, key=lambda year: year.year):
+            rows[(state.pk, year.pk)] = {
+                'state': state,
+                'year': year,
+                'competitions': 0,
+                'teams': 0,
+                'competitionStudents': 0,
+                'workshops': 0,
+                'workshopStudents': 0,
+                'teachers': 0,
+                **{gender: 0 for gender in genders},
+            }
+
+    for eventDict in eventSummaries(Event.objects.filter(state__in=states, year__in=years)):
+        row = rows[(eventDict['state'].pk, eventDict['year'].pk)]
+
+        if eventDict['eventType'] == 'competition':
+            row['competitions'] += 1
+            row['teams'] += eventDict['teams']
+            row['competitionStudents'] += eventDict['students']
+        else:
+            row['workshops'] += 1
+            row['workshopStudents'] += eventDict['students']
+            row['teachers'] += eventDict['teachers']
+
+        for gender in genders:
+            row[gender] += eventDict[gender]
+
+    for row in rows.values():
+        row['genderSummary'] = genderSummary(row)
+
+    return list(rows.values())
+
+# CSV
+
+eventCSVHeaders = ['Event', 'Type', 'Date', 'Location', 'Teams', 'Students', 'Teachers', 'Female', 'Male', 'Other']
+
+def eventCSVRow(eventDict):
+    return [
+        eventDict['name'],
+        eventDict['eventType'],
+        eventDict['date'],
+        eventDict['location'],
+        eventDict['teams'],
+        eventDict['students'],
+        eventDict['teachers'],
+        eventDict['female'],
+        eventDict['male'],
+        eventDict['other'],
+    ]
+
+comparisonCSVHeaders = ['State', 'Year', 'Competitions', 'Teams', 'Competition students', 'Workshops', 'Workshop students', 'Teachers', 'Female', 'Male', 'Other']
+
+def comparisonCSVRow(row):
+    return [
+        row['state'].name,
+        row['year'].year,
+        row['competitions'],
+        row['teams'],
+        row['competitionStudents'],
+        row['workshops'],
+        row['workshopStudents'],
+        row['teachers'],
+        row['female'],
+        row['male'],
+        row['other'],
+    ]
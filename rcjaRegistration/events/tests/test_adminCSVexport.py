@@ -1,5 +1,5 @@
 from common.baseTests import createStates, createUsers, createEvents
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 from django.urls import reverse
 from django.test import TestCase
 
@@ -19,6 +19,8 @@ class TestAdminCSVExport_Event(TestCase):
 
     def test_export_as_csv_correctHeaders(self):
         response = self.client.post(reverse('admin:events_event_changelist'), {'action': 'export_as_csv', '_selected_action': [self.state1_openCompetition.pk]})
+        # Streamed content can only be read once, so read it into a response assertContains can check repeatedly
+        response = HttpResponse(response.getvalue())
         self.assertContains(response, 'Name')
         self.assertContains(response, 'Event start date')
 
@@ -0,0 +1,87 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents
+from django.test import TestCase
+from django.core.management import call_command
+from django.template import Template, Context
+from django.utils.safestring import mark_safe
+from unittest.mock import patch
+
+from events.models import Event
+
+import io
+
+class TestEventDetailsHTML(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+
+    def setUp(self):
+        self.event = Event.objects.get(pk=self.state1_openCompetition.pk)
+
+    def testCleanedOnSave(self):
+        self.event.eventDetails = "<b>Hello</b> <script>alert(1)</script>"
+        self.event.save()
+
+        self.assertEqual(Event.objects.get(pk=self.event.pk).eventDetailsHTML, "<b>Hello</b> &lt;script&gt;alert(1)&lt;/script&gt;")
+
+    def testNotCleanedOnRender(self):
+        self.event.eventDetails = "<b>Hello</b>"
+        self.event.save()
+        event = Event.objects.get(pk=self.event.pk)
+
+        with patch('bleach.clean') as clean:
+            self.assertEqual(event.bleachedEventDetails(), "<b>Hello</b>")
+            clean.assert_not_called()
+
+    def testUnchangedDetailsNotCleanedOnSave(self):
+        self.event.eventDetails = "<b>Hello</b>"
+        self.event.save()
+        event = Event.objects.get(pk=self.event.pk)
+        event.name = 'Renamed'
+
+        with patch('events.models.Event.cleanEventDetails') as clean:
+            event.save()
+            clean.assert_not_called()
+
+    def testFallbackBeforeBackfill(self):
+        Event.objects.filter(pk=self.event.pk).update(eventDetails="<b>Hello</b> <h1>Heading</h1>", eventDetailsHTML='')
+        event = Event.objects.get(pk=self.event.pk)
+
+        self.assertEqual(event.bleachedEventDetails(), "<b>Hello</b> &lt;h1&gt;Heading&lt;/h1&gt;")
+
+    def testBackfillCommand(self):
+        Event.objects.filter(pk=self.event.pk).update(eventDetails="<b>Hello</b> <h1>Heading</h1>", eventDetailsHTML='')
+        Event.objects.filter(pk=self.state2_openCompetition.pk).update(eventDetails="<i>Other</i>", eventDetailsHTML='stale')
+
+        out = io.StringIO()
+        call_command('backfilleventdetails', stdout=out)
+
+        self.assertEqual(Event.objects.get(pk=self.event.pk).eventDetailsHTML, "<b>Hello</b> &lt;h1&gt;Heading&lt;/h1&gt;")
+        self.assertEqual(Event.objects.get(pk=self.state2_openCompetition.pk).eventDetailsHTML, 'stale')
+        self.assertIn('1 events', out.getvalue())
+
+    def testBackfillCommandAll(self):
+        Event.objects.filter(pk=self.state2_openCompetition.pk).update(eventDetails="<i>Other</i>", eventDetailsHTML='stale')
+
+        call_command('backfilleventdetails', '--all', '--batch-size', '1', stdout=io.StringIO())
+
+        self.assertEqual(Event.objects.get(pk=self.state2_openCompetition.pk).eventDetailsHTML, "<i>Other</i>")
+
+class TestCachedLinebreaks(TestCase):
+    def render(self, value):
+        return Template("{% load textFormatting %}{{ value|cachedLinebreaks }}").render(Context({'value': value}))
+
+    def testMatchesEscapeLinebreaks(self):
+        value = "Line 1 <b>\nLine 2\n\nParagraph & more"
+        expected = Template("{{ value|escape|linebreaks }}").render(Context({'value': value}))
+
+        self.assertEqual(self.render(value), expected)
+
+    def testSafeNotEscaped(self):
+        self.assertEqual(self.render(mark_safe("<b>Hello</b>\nWorld")), "<p><b>Hello</b><br>World</p>")
+
+    def testEmpty(self):
+        self.assertEqual(self.render(None), '')
+        self.assertEqual(self.render(''), '')
@@ -0,0 +1,180 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents, createTeams, createWorkshopAttendees
+from django.test import TestCase
+from django.db import transaction
+from django.db.models import Count
+
+from events.models import BaseEventAttendance, RegistrationCounter
+from events.views import lockedRegistrationLimitErrors
+from teams.models import Team
+from users.models import User
+
+class TestRegistrationCounters(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeams(cls)
+        createWorkshopAttendees(cls)
+
+    def createTeam(self, **kwargs):
+        fields = {
+            'event': self.state1_openCompetition,
+            'division': self.division3,
+            'mentorUser': self.user_state1_school1_mentor1,
+            'school': self.school1_state1,
+            'name': 'New team',
+        }
+        fields.update(kwargs)
+        return Team.objects.create(**fields)
+
+    def counterValue(self, event, division, school=None, mentorUser=None):
+        counter = RegistrationCounter.objects.filter(event=event, division=division, school=school, mentorUser=mentorUser).first()
+        return counter.count if counter else 0
+
+    def assertCountersMatchAttendances(self):
+        expected = {}
+        for row in BaseEventAttendance.objects.order_by().values('event', 'division', 'school', 'mentorUser').annotate(number=Count('pk')):
+            key = (row['event'], row['division'], row['school'], None if row['school'] else row['mentorUser'])
+            expected[key] = expected.get(key, 0) + row['number']
+
+        counters = {(counter.event_id, counter.division_id, counter.school_id, counter.mentorUser_id): counter.count for counter in RegistrationCounter.objects.exclude(count=0)}
+        self.assertEqual(counters, expected)
+
+    def testCreate(self):
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division3, school=self.school1_state1), 2)
+        self.assertCountersMatchAttendances()
+
+    def testIndependentCountedByMentor(self):
+        self.createTeam(school=None, mentorUser=self.user_state1_independent_mentor5)
+
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division3, mentorUser=self.user_state1_independent_mentor5), 1)
+        self.assertCountersMatchAttendances()
+
+    def testDelete(self):
+        self.state1_event1_team1.delete()
+
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division3, school=self.school1_state1), 1)
+        self.assertCountersMatchAttendances()
+
+    def testQuerysetDelete(self):
+        Team.objects.filter(event=self.state1_openCompetition).delete()
+
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division3, school=self.school1_state1), 0)
+        self.assertCountersMatchAttendances()
+
+    def testChangeDivision(self):
+        team = Team.objects.get(pk=self.state1_event1_team1.pk)
+        team.division = self.division4
+        team.save()
+
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division3, school=self.school1_state1), 1)
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division4, school=self.school1_state1), 1)
+        self.assertCountersMatchAttendances()
+
+    def testChangeToIndependent(self):
+        team = Team.objects.get(pk=self.state1_event1_team1.pk)
+        team.school = None
+        team.save()
+
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division3, mentorUser=self.user_state1_school1_mentor1), 1)
+        self.assertCountersMatchAttendances()
+
+    def testUnrelatedChange(self):
+        team = Team.objects.get(pk=self.state1_event1_team1.pk)
+        team.name = 'Renamed'
+        team.save()
+
+        self.assertCountersMatchAttendances()
+
+    def testMoveSchool(self):
+        self.createTeam(school=self.school2_state1, mentorUser=self.user_state1_school2_mentor3)
+
+        RegistrationCounter.moveSchool(self.school2_state1, self.school1_state1)
+
+        self.assertEqual(self.counterValue(self.state1_openCompetition, self.division3, school=self.school1_state1), 3)
+        self.assertFalse(RegistrationCounter.objects.filter(school=self.school2_state1).exists())
+
+    def testNotDecrementedBelowZero(self):
+        RegistrationCounter.objects.all().delete()
+
+        self.state1_event1_team1.delete()
+
+        self.assertFalse(RegistrationCounter.objects.exists())
+
+class TestRegistrationLimits(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeams(cls)
+
+    def setUp(self):
+        self.user = User.objects.get(pk=self.user_state1_school1_mentor1.pk)
+        self.event = self.state1_openCompetition
+        self.availableDivision = self.availableDivision3_state1_openCompetition
+
+    def testEventLimitForSchool(self):
+        self.event.event_maxRegistrationsPerSchool = 2
+        self.assertTrue(self.event.maxEventRegistrationsForSchoolReached(self.user))
+
+        self.event.event_maxRegistrationsPerSchool = 3
+        self.assertFalse(self.event.maxEventRegistrationsForSchoolReached(self.user))
+
+    def testEventLimitTotal(self):
+        self.event.event_maxRegistrationsForEvent = 2
+        self.assertTrue(self.event.maxEventRegistrationsTotalReached())
+
+    def testDivisionLimits(self):
+        self.availableDivision.division_maxRegistrationsPerSchool = 2
+        self.availableDivision.division_maxRegistrationsForDivision = 3
+
+        self.assertTrue(self.availableDivision.maxDivisionRegistrationsForSchoolReached(self.user))
+        self.assertFalse(self.availableDivision.maxDivisionRegistrationsTotalReached())
+
+    def testOtherSchoolNotCounted(self):
+        self.event.event_maxRegistrationsPerSchool = 1
+        user = User.objects.get(pk=self.user_state1_school2_mentor3.pk)
+
+        self.assertFalse(self.event.maxEventRegistrationsForSchoolReached(user))
+
+    def testAllLimitsOneQuery(self):
+        self.event.event_maxRegistrationsPerSchool = 5
+        self.event.event_maxRegistrationsForEvent = 5
+        self.availableDivision.division_maxRegistrationsPerSchool = 5
+        self.availableDivision.division_maxRegistrationsForDivision = 5
+
+        with self.assertNumQueries(1):
+            counts = self.event.registrationCounts(self.user)
+            self.event.maxEventRegistrationsForSchoolReached(self.user, counts)
+            self.event.maxEventRegistrationsTotalReached(counts)
+            self.availableDivision.maxDivisionRegistrationsForSchoolReached(self.user, counts)
+            self.availableDivision.maxDivisionRegistrationsTotalReached(counts)
+
+    def testLockedCheckSeesRegistrationsCreatedAfterFormLoaded(self):
+        self.event.event_maxRegistrationsPerSchool = 3
+        self.event.save()
+        self.assertFalse(self.event.maxEventRegistrationsForSchoolReached(self.user))
+
+        # Another registration created after the form was checked
+        Team.objects.create(event=self.event, division=self.division3, mentorUser=self.user, school=self.school1_state1, name='Concurrent')
+
+        with transaction.atomic():
+            errors = lockedRegistrationLimitErrors(self.event, self.user, self.division3.pk, newRegistration=True)
+
+        self.assertEqual(errors, ['Max teams for school for this event reached. Contact the organiser if you want to register more teams for this event.'])
+
+    def testLockedCheckDivisionOnly(self):
+        self.event.event_maxRegistrationsPerSchool = 2
+        self.event.save()
+        self.availableDivision.division_maxRegistrationsForDivision = 2
+        self.availableDivision.save()
+
+        # Editing a team into the division doesn't check the event limits
+        with transaction.atomic():
+            errors = lockedRegistrationLimitErrors(self.event, self.user, self.division3.pk, newRegistration=False)
+
+        self.assertEqual(errors, ['Division 3: Max teams for this event division reached. Contact the organiser if you want to register more teams in this division.'])
@@ -0,0 +1,137 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents, createTeams, createWorkshopAttendees
+from django.test import TestCase
+from django.http import HttpRequest
+from django.urls import reverse
+
+from events import summary
+from teams.models import Student
+
+def createStudents(self):
+    for team, genders in [(self.state1_event1_team1, ['male', 'female', 'female']), (self.state1_event1_team2, ['other'])]:
+        for gender in genders:
+            Student.objects.create(team=team, firstName='First', lastName='Last', yearLevel=5, gender=gender)
+
+class TestSummaryCounts(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeams(cls)
+        createWorkshopAttendees(cls)
+        createStudents(cls)
+
+    def getEvent(self, events, event):
+        return next(eventDict for eventDict in events if eventDict['event'] == event)
+
+    def testCompetitionCounts(self):
+        events = summary.getEventsForSummary(self.state1, self.year)
+        eventDict = self.getEvent(events, self.state1_openCompetition)
+
+        self.assertEqual(eventDict['teams'], 2)
+        self.assertEqual(eventDict['students'], 4)
+        self.assertEqual(eventDict['participants_three'], '50%F, 25%M, 25% other')
+        self.assertEqual(eventDict['location'], 'Venue 1')
+
+    def testWorkshopCounts(self):
+        events = summary.getEventsForSummary(self.state1, self.year)
+        eventDict = self.getEvent(events, self.state1_openWorkshop)
+
+        self.assertEqual(eventDict['students'], 2)
+        self.assertEqual(eventDict['teachers'], 0)
+        # Unrecognised gender counted as other
+        self.assertEqual(eventDict['participants_three'], '0%F, 50%M, 50% other')
+
+    def testNoParticipants(self):
+        events = summary.getEventsForSummary(self.state1, self.year)
+        eventDict = self.getEvent(events, self.state1_pastCompetition)
+
+        self.assertEqual(eventDict['teams'], 0)
+        self.assertEqual(eventDict['participants_three'], '0%F, 0%M, 0% other')
+
+    def testConstantQueries(self):
+        # Events and one grouped count each for teams, students and workshop attendees
+        with self.assertNumQueries(4):
+            summary.getEventsForSummary(self.state1, self.year)
+
+        for i in range(10):
+            Student.objects.create(team=self.state1_event1_team2, firstName='First', lastName='Last', yearLevel=5, gender='male')
+
+        with self.assertNumQueries(4):
+            summary.getEventsForSummary(self.state1, self.year)
+
+    def testComparison(self):
+        rows = summary.getComparisonSummary([self.state2, self.state1], [self.year])
+
+        self.assertEqual([row['state'] for row in rows], [self.state1, self.state2])
+        self.assertEqual(rows[0]['teams'], 2)
+        self.assertEqual(rows[0]['competitionStudents'], 4)
+        self.assertEqual(rows[0]['workshopStudents'], 2)
+        self.assertEqual(rows[1]['teams'], 1)
+        self.assertEqual(rows[1]['workshopStudents'], 1)
+
+    def testComparisonConstantQueries(self):
+        with self.assertNumQueries(4):
+            summary.getComparisonSummary([self.state1, self.state2], [self.year])
+
+class TestSummaryViews(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeams(cls)
+        createStudents(cls)
+
+    def setUp(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_super1, password=self.password)
+
+    def testReportCSV(self):
+        response = self.client.get(reverse('events:summaryReport'), {'state': self.state1.pk, 'year': self.year.year, 'csv': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content = response.content.decode()
+        self.assertIn(','.join(summary.eventCSVHeaders), content)
+        self.assertIn('State 1 Open Competition,competition,', content)
+
+    def testReportCSVLink(self):
+        response = self.client.get(reverse('events:summaryReport'), {'state': self.state1.pk, 'year': self.year.year})
+
+        self.assertContains(response, 'Download CSV')
+
+    def testComparisonPage(self):
+        response = self.client.get(reverse('events:summaryComparison'), {'states': [self.state1.pk, self.state2.pk], 'years': [self.year.year]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rows']), 2)
+        self.assertContains(response, 'State 2')
+
+    def testComparisonCSV(self):
+        response = self.client.get(reverse('events:summaryComparison'), {'states': [self.state1.pk, self.state2.pk], 'years': [self.year.year], 'csv': 1})
+
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn(','.join(summary.comparisonCSVHeaders), content)
+        self.assertIn(f'State 1,{self.year.year},', content)
+
+    def testComparisonNoSelection(self):
+        response = self.client.get(reverse('events:summaryComparison'))
+
+        self.assertContains(response, 'Select States and Years for Activity Summary Comparison')
+
+    def testComparisonNotStaffDenied(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_school1_mentor1, password=self.password)
+
+        response = self.client.get(reverse('events:summaryComparison'))
+        self.assertEqual(response.status_code, 403)
+
+    def testComparisonCoordinatorLimitedToStates(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_fullcoordinator, password=self.password)
+
+        response = self.client.get(reverse('events:summaryComparison'), {'states': [self.state1.pk, self.state2.pk], 'years': [self.year.year]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['rows'], [])
+        self.assertFalse(response.context['form'].is_valid())
@@ -24,5 +24,6 @@ urlpatterns = [
     path('events/<int:eventID>', views.details, name='details'),
     path('events/<int:eventID>/cms', views.cms, name='cms'),
     path('error/underConstruction',views.loggedInUnderConstruction,name='loggedInConstruction'),
-    path('events/summaryReport', views.summaryReport, name='summaryReport')
+    path('events/summaryReport', views.summaryReport, name='summaryReport'),
+    path('events/summaryReport/comparison', views.summaryComparison, name='summaryComparison'),
 ]
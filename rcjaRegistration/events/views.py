@@ -5,19 +5,22 @@ from django.contrib.auth.decorators import login_required
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ValidationError, PermissionDenied
-from django.db.models import F, Q
+from django.db.models import Q
+from django.db.models.functions import Round
 from django.conf import settings
 from coordination.permissions import checkCoordinatorPermission
 
+import csv
 import datetime
 import jwt
 
 from .models import Event, BaseEventAttendance, Year
 from regions.models import State
-from teams.models import Team, Student
+from teams.models import Team
 from schools.models import Campus
 from workshops.models import WorkshopAttendee
-from .forms import getSummaryForm
+from .forms import getSummaryForm, getSummaryComparisonForm
+from . import summary
 
 # Need to check if schooladministrator is None
 
@@ -84,7 +87,12 @@ def dashboard(request):
     from invoices.models import Invoice
     invoices = Invoice.invoicesForUser(request.user)
 
-    outstandingInvoices = sum([1 for invoice in invoices if invoice.amountDueInclGST() > 0.05]) # Rounded because consistent with what user sees and not used in subsequent calculations
+    # Totals not calculated yet, such as after a failed recalculation, are calculated first so the invoice is counted
+    for invoice in invoices.filter(cache_invoiceAmountInclGST_unrounded=None):
+        invoice.calculateAndSaveAllTotals()
+
+    # Rounded because consistent with what user sees and not used in subsequent calculations
+    outstandingInvoices = invoices.withAmountDue().alias(_amountDueRounded=Round('_amountDueUnrounded', 2)).filter(_amountDueRounded__gt=0.05).count()
 
     # Association join prompt
     showAssociationPrompt = not request.user.associationPromptShown
@@ -127,15 +135,24 @@ def eventDetailsPermissions(request, event, filterDict):
 
     return False
 
-def getDivisionsMaxReachedWarnings(event, user):
+def getDivisionMaxReachedWarnings(availableDivision, user, counts):
+    event = availableDivision.event
+    warnings = []
+
+    if availableDivision.maxDivisionRegistrationsForSchoolReached(user, counts):
+        warnings.append(f"{availableDivision.division}: Max {event.registrationName()}s for school for this event division reached. Contact the organiser if you want to register more {event.registrationName()}s in this division.")
+
+    if availableDivision.maxDivisionRegistrationsTotalReached(counts):
+        warnings.append(f"{availableDivision.division}: Max {event.registrationName()}s for this event division reached. Contact the organiser if you want to register more {event.registrationName()}s in this division.")
+
+    return warnings
+
+def getDivisionsMaxReachedWarnings(event, user, counts=None):
     # Get list of divisions that reached max number of teams
+    counts = counts or event.registrationCounts(user)
     divisionsMaxReachedWarnings = []
-    for availableDivision in event.availabledivision_set.prefetch_related('division').all():
-        if availableDivision.maxDivisionRegistrationsForSchoolReached(user):
-            divisionsMaxReachedWarnings.append(f"{availableDivision.division}: Max {event.registrationName()}s for school for this event division reached. Contact the organiser if you want to register more {event.registrationName()}s in this division.")
-
-        if availableDivision.maxDivisionRegistrationsTotalReached():
-            divisionsMaxReachedWarnings.append(f"{availableDivision.division}: Max {event.registrationName()}s for this event division reached. Contact the organiser if you want to register more {event.registrationName()}s in this division.")
+    for availableDivision in event.availabledivision_set.select_related('event', 'division'):
+        divisionsMaxReachedWarnings += getDivisionMaxReachedWarnings(availableDivision, user, counts)
 
     return divisionsMaxReachedWarnings
 
@@ -194,6 +211,9 @@ def details(request, eventID):
     else:
         totalRegistrations = event.baseeventattendance_set.exclude(team__withdrawn=True).count()
 
+    # Counts for all the registration limit checks
+    registrationCounts = event.registrationCounts(request.user)
+
     context = {
         'event': event,
         'availableDivisions': event.availabledivision_set.prefetch_related('division'),
@@ -203,9 +223,9 @@ def details(request, eventID):
         'showCampusColumn': BaseEventAttendance.objects.filter(**filterDict).exclude(campus=None).exists(),
         'billingTypeLabel': billingTypeLabel,
         'hasAdminPermissions': coordinatorEventDetailsPermissions(request, event),
-        'maxEventRegistrationsForSchoolReached': event.maxEventRegistrationsForSchoolReached(request.user),
-        'maxEventRegistrationsTotalReached': event.maxEventRegistrationsTotalReached(),
-        'divisionsMaxReachedWarnings': getDivisionsMaxReachedWarnings(event, request.user),
+        'maxEventRegistrationsForSchoolReached': event.maxEventRegistrationsForSchoolReached(request.user, registrationCounts),
+        'maxEventRegistrationsTotalReached': event.maxEventRegistrationsTotalReached(registrationCounts),
+        'divisionsMaxReachedWarnings': getDivisionsMaxReachedWarnings(event, request.user, registrationCounts),
         'duplicateTeamsAvailable': availableToCopyTeams.exists(),
         'totalRegistrations': totalRegistrations,
     }
@@ -263,12 +283,41 @@ def createPermissionForEvent(event, eventType):
     if not event.published():
         raise PermissionDenied("Event is not published")
 
+def getEventLimitsReachedErrors(event, user, counts):
+    errors = []
+
+    if event.maxEventRegistrationsForSchoolReached(user, counts):
+        errors.append(f"Max {event.registrationName()}s for school for this event reached. Contact the organiser if you want to register more {event.registrationName()}s for this event.")
+
+    if event.maxEventRegistrationsTotalReached(counts):
+        errors.append(f"Max {event.registrationName()}s for this event reached. Contact the organiser if you want to register more {event.registrationName()}s for this event.")
+
+    return errors
+
 def checkEventLimitsReached(request, event):
-    if event.maxEventRegistrationsForSchoolReached(request.user):
-        raise PermissionDenied(f"Max {event.registrationName()}s for school for this event reached. Contact the organiser if you want to register more {event.registrationName()}s for this event.")
+    errors = getEventLimitsReachedErrors(event, request.user, event.registrationCounts(request.user))
+    if errors:
+        raise PermissionDenied(errors[0])
+
+def eventLimitsReached(event, user):
+    return bool(getEventLimitsReachedErrors(event, user, event.registrationCounts(user)))
+
+def lockedRegistrationLimitErrors(event, user, division, newRegistration):
+    # Must be called in a transaction, before the team/ attendee is saved
+    # Locks registrations for the event until the end of the transaction and checks the limits again with the latest counts,
+    # because other registrations may have been created since the form was loaded
+    event.lockRegistrations()
+    counts = event.registrationCounts(user)
+
+    errors = []
+    if newRegistration:
+        errors += getEventLimitsReachedErrors(event, user, counts)
 
-    if event.maxEventRegistrationsTotalReached():
-        raise PermissionDenied(f"Max {event.registrationName()}s for this event reached. Contact the organiser if you want to register more {event.registrationName()}s for this event.")
+    availableDivision = event.availabledivision_set.select_related('event', 'division').filter(division=division).first()
+    if availableDivision is not None:
+        errors += getDivisionMaxReachedWarnings(availableDivision, user, counts)
+
+    return errors
 
 class CreateEditBaseEventAttendance(LoginRequiredMixin, View):
     def common(self, request, event, eventAttendance):
@@ -302,104 +351,24 @@ class CreateEditBaseEventAttendance(LoginRequiredMixin, View):
         eventAttendance.delete()
         return HttpResponse(status=204)
 
-def getEventsForSummary(state, year):
-    """ Create list of event dictionaries of all events in state and year """
-    eventList = Event.objects.filter(state = state, year = year).order_by('startDate', 'endDate')
-
-    # Find information for events
-    events = []
-    for event in eventList:
-        eventDict = {}
-        eventDict["name"] = event.name
-
-        if event.startDate==event.endDate:
-            if event.startDate is not None:
-                eventDict["date"] = event.startDate.strftime('%d/%m/%Y')
-            else:
-                eventDict["date"] = None
-        else:
-            eventDict["date"] = f"{event.startDate.strftime('%d/%m/%Y')} - {event.endDate.strftime('%d/%m/%Y')}"
-
-        if event.eventType == "competition":
-            # Initialise counting variables
-            teamNumber = 0
-            studentNumber = 0
-            maleNumber = 0
-            femaleNumber = 0
-            otherNumber = 0
-
-            # Count all teams
-            attendances = BaseEventAttendance.objects.filter(event=event)
-            for attendance in attendances:
-                teamNumber += 1
-                students = Student.objects.filter(team=attendance.childObject())
-                for student in students:
-                    studentNumber += 1
-                    if student.gender == "male":
-                        maleNumber += 1
-                    elif student.gender == "female":
-                        femaleNumber += 1
-                    else:
-                        otherNumber += 1
-
-            # Create output
-            if studentNumber > 0:
-                mPercent = round(maleNumber/studentNumber*100)
-                fPercent = round(femaleNumber/studentNumber*100)
-                oPercent = round(otherNumber/studentNumber*100)
-            else:
-                mPercent, fPercent, oPercent = [0,0,0]
-            eventDict["participants_one"] = f"Teams: {teamNumber}"
-            eventDict["participants_two"] = f"Students: {studentNumber}"
-            eventDict["participants_three"] = f"{fPercent}%F, {mPercent}%M, {oPercent}% other"
-        else: # Workshop
-            # Initialise counting variables
-            studentNumber = 0
-            teacherNumber = 0
-            maleNumber = 0
-            femaleNumber = 0
-            otherNumber = 0
-
-            # Count all students
-            attendances = BaseEventAttendance.objects.filter(event=event)
-            for attendance in attendances:
-                attendance = attendance.childObject()
-                if attendance.attendeeType == "student":
-                    studentNumber += 1
-                else:
-                    teacherNumber += 1
-                if attendance.gender == "male":
-                    maleNumber += 1
-                elif attendance.gender == "female":
-                    femaleNumber += 1
-                else:
-                    otherNumber += 1
-
-            # Create output
-            if studentNumber + teacherNumber > 0:
-                mPercent = round(maleNumber/(studentNumber+teacherNumber)*100)
-                fPercent = round(femaleNumber/(studentNumber+teacherNumber)*100)
-                oPercent = round(otherNumber/(studentNumber+teacherNumber)*100)
-            else:
-                mPercent, fPercent, oPercent = [0,0,0]
-            eventDict["participants_one"] = f"Students: {studentNumber}"
-            eventDict["participants_two"] = f"Teachers: {teacherNumber}"
-            eventDict["participants_three"] = f"{fPercent}%F, {mPercent}%M, {oPercent}% other"
-
-        if event.venue != None:
-            eventDict["location"] = event.venue.name
-        else:
-            eventDict["location"] = "None"
-
-        events.append(eventDict)
-
-    return events
+def summaryCSVResponse(filename, headers, rows):
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
 
-@login_required
-def summaryReport(request):
+    writer = csv.writer(response)
+    writer.writerow(headers)
+    writer.writerows(rows)
+
+    return response
+
+def checkSummaryReportPermissions(request):
     if not request.user.is_staff:
         raise PermissionDenied("You do not have permission to view this page")
 
+@login_required
+def summaryReport(request):
+    checkSummaryReportPermissions(request)
+
     if request.method != 'GET':
         return HttpResponseNotAllowed(['GET'])
 
@@ -407,7 +376,10 @@ def summaryReport(request):
     if form.is_valid():
         selected_state = State.objects.get(id = form.cleaned_data["state"])
         selected_year = Year.objects.get(year = form.cleaned_data["year"])
-        events = getEventsForSummary(selected_state, selected_year)
+        events = summary.getEventsForSummary(selected_state, selected_year)
+
+        if 'csv' in request.GET:
+            return summaryCSVResponse(f"{selected_state.name} Activity Summary Report {selected_year.year}", summary.eventCSVHeaders, [summary.eventCSVRow(event) for event in events])
     else:
         events = []
         selected_state = None
@@ -420,3 +392,27 @@ def summaryReport(request):
         'year': selected_year,
     }
     return render(request, 'events/summaryReport.html', context)
+
+@login_required
+def summaryComparison(request):
+    checkSummaryReportPermissions(request)
+
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    form = getSummaryComparisonForm(request)
+    if form.is_valid():
+        selectedStates = list(State.objects.filter(id__in=form.cleaned_data["states"]))
+        selectedYears = list(Year.objects.filter(year__in=form.cleaned_data["years"]))
+        rows = summary.getComparisonSummary(selectedStates, selectedYears)
+
+        if 'csv' in request.GET:
+            return summaryCSVResponse("Activity Summary Comparison", summary.comparisonCSVHeaders, [summary.comparisonCSVRow(row) for row in rows])
+    else:
+        rows = []
+
+    context = {
+        "rows": rows,
+        "form": form,
+    }
+    return render(request, 'events/summaryComparison.html', context)
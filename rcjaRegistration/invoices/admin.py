@@ -6,7 +6,7 @@ from django.contrib import messages
 from django.contrib.admin.models import LogEntry, CHANGE
 from django.contrib.contenttypes.models import ContentType
 from common.filters import FilteredRelatedOnlyFieldListFilter
-from django.db.models import Sum, F, Q, Case, When
+from django.db.models import Q
 
 import datetime
 
@@ -146,12 +146,7 @@ class InvoiceAdmin(AdminPermissions, admin.ModelAdmin, ExportCSVMixin):
         qs = super().get_queryset(request)
 
         qs = qs.prefetch_related('school', 'invoiceToUser')
-        qs = qs.annotate(_sumPayments=Sum('invoicepayment__amountPaid'))
-        qs = qs.annotate(_amountDueFilter=F('cache_invoiceAmountInclGST_unrounded') - F('_sumPayments'))
-        qs = qs.annotate(_amountDueUnrounded=Case(
-            When(_sumPayments__isnull=False, then=F('cache_invoiceAmountInclGST_unrounded') - F('_sumPayments')),
-            default=F('cache_invoiceAmountInclGST_unrounded')
-        ))
+        qs = qs.withAmountDue()
 
         return qs
 
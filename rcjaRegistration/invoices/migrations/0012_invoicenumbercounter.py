@@ -0,0 +1,39 @@
+# Generated by Django 5.2.16 on 2026-10-18 10:19
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def createInvoiceNumberCounter(apps, schema_editor):
+    Invoice = apps.get_model('invoices', 'Invoice')
+    InvoiceGlobalSettings = apps.get_model('invoices', 'InvoiceGlobalSettings')
+    InvoiceNumberCounter = apps.get_model('invoices', 'InvoiceNumberCounter')
+
+    # Continue from existing invoices, otherwise start from the first invoice number in the invoice settings
+    lastNumber = Invoice.objects.aggregate(Max('invoiceNumber'))['invoiceNumber__max']
+    if lastNumber is None:
+        invoiceSettings = InvoiceGlobalSettings.objects.first()
+        lastNumber = (invoiceSettings.firstInvoiceNumber if invoiceSettings else 1) - 1
+
+    InvoiceNumberCounter.objects.create(pk=1, lastNumber=lastNumber)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0011_alter_invoiceglobalsettings_surchargeamount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceNumberCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lastNumber', models.PositiveIntegerField(default=0, verbose_name='Last invoice number')),
+            ],
+            options={
+                'verbose_name': 'Invoice number counter',
+            },
+        ),
+        migrations.RunPython(createInvoiceNumberCounter, migrations.RunPython.noop),
+    ]
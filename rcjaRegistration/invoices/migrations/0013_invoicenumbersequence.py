@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+def createInvoiceNumberSequence(apps, schema_editor):
+    # Only PostgreSQL allocates invoice numbers from a sequence, other databases keep using the counter row
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    InvoiceNumberCounter = apps.get_model('invoices', 'InvoiceNumberCounter')
+    counter = InvoiceNumberCounter.objects.filter(pk=1).first()
+
+    schema_editor.execute('CREATE SEQUENCE invoices_invoicenumber_seq MINVALUE 0 START WITH 0')
+    schema_editor.execute('SELECT setval(%s, %s)', ['invoices_invoicenumber_seq', counter.lastNumber if counter else 0])
+
+
+def deleteInvoiceNumberSequence(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    InvoiceNumberCounter = apps.get_model('invoices', 'InvoiceNumberCounter')
+
+    # Keep the counter row up to date so numbers continue from the sequence
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT last_value FROM invoices_invoicenumber_seq')
+        lastNumber = cursor.fetchone()[0]
+
+    InvoiceNumberCounter.objects.update_or_create(pk=1, defaults={'lastNumber': lastNumber})
+    schema_editor.execute('DROP SEQUENCE invoices_invoicenumber_seq')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0012_invoicenumbercounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(createInvoiceNumberSequence, deleteInvoiceNumberSequence),
+    ]
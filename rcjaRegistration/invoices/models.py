@@ -1,12 +1,17 @@
-from django.db import models
-from django.db.models import F, Q
+from django.db import models, transaction, connection
+from django.db.models import F, Q, Count, Sum, Max, Case, When, OuterRef, Subquery
 from common.models import SaveDeleteMixin
+from common.cacheVersions import currentVersion, bumpVersion
+from invoices.recalculation import recalculateInvoiceTotals
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 
+from collections import defaultdict
+
 # **********MODELS**********
 
-class InvoiceGlobalSettings(models.Model):
+class InvoiceGlobalSettings(SaveDeleteMixin, models.Model):
     # Creation and update time
     creationDateTime = models.DateTimeField('Creation date',auto_now_add=True)
     updatedDateTime = models.DateTimeField('Last modified date',auto_now=True)
@@ -33,13 +38,139 @@ class InvoiceGlobalSettings(models.Model):
 
     # *****Save & Delete Methods*****
 
+    def postSave(self):
+        InvoiceGlobalSettings.invalidateCache()
+
+        # First invoice number only applies until an invoice is created
+        if not Invoice.objects.exists():
+            InvoiceNumberCounter.setLastNumber(self.firstInvoiceNumber - 1)
+
+    def postDelete(self):
+        InvoiceGlobalSettings.invalidateCache()
+
     # *****Methods*****
 
+    # Settings are read for every invoice and event, so are kept in the configured Django cache
+    # The cache key includes a version that is bumped on save and delete, so every worker sharing the cache sees the change
+
+    cacheVersionKey = 'invoiceGlobalSettings:version'
+
+    @classmethod
+    def invalidateCache(cls):
+        bumpVersion(cls.cacheVersionKey)
+
+    # Returns the settings object, or None if not created
+    @classmethod
+    def getCached(cls):
+        if not settings.CACHE_SHARED:
+            return cls.objects.first()
+
+        # Stored in a tuple so that no settings object is also cached
+        key = f'invoiceGlobalSettings:{currentVersion(cls.cacheVersionKey)}'
+        cachedSettings = cache.get(key)
+        if cachedSettings is None:
+            cachedSettings = (cls.objects.first(),)
+            cache.set(key, cachedSettings, settings.INVOICE_SETTINGS_CACHE_TIMEOUT)
+
+        return cachedSettings[0]
+
     # *****Get Methods*****
 
     def __str__(self):
         return 'Invoice settings'
 
+class InvoiceNumberCounter(models.Model):
+    # Last invoice number allocated
+    # On PostgreSQL numbers come from a sequence, which isn't held by the transaction creating the invoice,
+    # so concurrent invoice creation doesn't wait. Numbers allocated by a transaction that is rolled back are skipped
+    # Other databases use this single row, incremented and read in one statement, which locks it until the end of the transaction
+    lastNumber = models.PositiveIntegerField('Last invoice number', default=0)
+
+    counterPK = 1
+    sequenceName = 'invoices_invoicenumber_seq'
+
+    # *****Meta and clean*****
+    class Meta:
+        verbose_name = 'Invoice number counter'
+
+    # *****Methods*****
+
+    @classmethod
+    def usesSequence(cls):
+        return connection.vendor == 'postgresql'
+
+    @classmethod
+    def initialLastNumber(cls):
+        # Continue from existing invoices, otherwise start from the first invoice number in the invoice settings
+        latest = Invoice.objects.aggregate(Max('invoiceNumber'))['invoiceNumber__max']
+        if latest is not None:
+            return latest
+
+        invoiceSettings = InvoiceGlobalSettings.getCached()
+        return (invoiceSettings.firstInvoiceNumber if invoiceSettings else 1) - 1
+
+    @classmethod
+    def setLastNumber(cls, lastNumber):
+        if cls.usesSequence():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT setval(%s, %s)', [cls.sequenceName, lastNumber])
+        else:
+            cls.objects.update_or_create(pk=cls.counterPK, defaults={'lastNumber': lastNumber})
+
+    @classmethod
+    def increment(cls, count):
+        # Returns the new last number, or None if the counter row doesn't exist
+        quoteName = connection.ops.quote_name
+        table = quoteName(cls._meta.db_table)
+        column = quoteName(cls._meta.get_field('lastNumber').column)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {table} SET {column} = {column} + %s WHERE {quoteName("id")} = %s RETURNING {column}', [count, cls.counterPK])
+            row = cursor.fetchone()
+
+        return row[0] if row else None
+
+    # Allocate count invoice numbers, returns list of the numbers in increasing order
+    # Consecutive unless other invoices are created at the same time on PostgreSQL
+    @classmethod
+    def allocate(cls, count=1):
+        if cls.usesSequence():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT nextval(%s) FROM generate_series(1, %s)', [cls.sequenceName, count])
+                return sorted(row[0] for row in cursor.fetchall())
+
+        # No savepoint, the increment is a single statement
+        with transaction.atomic(savepoint=False):
+            lastNumber = cls.increment(count)
+
+            if lastNumber is None:
+                # Only if the row was removed, the migration creates it
+                cls.objects.get_or_create(pk=cls.counterPK, defaults={'lastNumber': cls.initialLastNumber()})
+                lastNumber = cls.increment(count)
+
+        return list(range(lastNumber - count + 1, lastNumber + 1))
+
+    def __str__(self):
+        return f'Last invoice number: {self.lastNumber}'
+
+class InvoiceQuerySet(models.QuerySet):
+    # Amount paid and amount due calculated in the database instead of a payments query for each invoice
+    # Payments are summed in a subquery so joins in the rest of the queryset can't count a payment more than once
+    def withAmountDue(self):
+        sumPayments = InvoicePayment.objects.filter(invoice=OuterRef('pk')).order_by().values('invoice').annotate(total=Sum('amountPaid')).values('total')
+
+        return self.annotate(
+            # None if no payments
+            _sumPayments=Subquery(sumPayments, output_field=models.FloatField()),
+        ).annotate(
+            # None if no payments, used by the admin amount due filter
+            _amountDueFilter=F('cache_invoiceAmountInclGST_unrounded') - F('_sumPayments'),
+            _amountDueUnrounded=Case(
+                When(_sumPayments__isnull=False, then=F('cache_invoiceAmountInclGST_unrounded') - F('_sumPayments')),
+                default=F('cache_invoiceAmountInclGST_unrounded'),
+            ),
+        )
+
 class Invoice(SaveDeleteMixin, models.Model):
     # Foreign keys
     event = models.ForeignKey('events.Event', verbose_name = 'Event', on_delete=models.CASCADE, editable=False)
@@ -65,6 +196,8 @@ class Invoice(SaveDeleteMixin, models.Model):
     cache_invoiceAmountExclGST_unrounded = models.FloatField('cache_invoiceAmountExclGST_unrounded', blank=True, null=True, editable=False)
     cache_invoiceAmountInclGST_unrounded = models.FloatField('cache_invoiceAmountInclGST_unrounded', blank=True, null=True, editable=False)
 
+    objects = InvoiceQuerySet.as_manager()
+
     # *****Meta and clean*****
     class Meta:
         verbose_name = 'Invoice'
@@ -107,15 +240,8 @@ class Invoice(SaveDeleteMixin, models.Model):
 
     def preSave(self):
         # Set invoice number
-        if self.invoiceNumber is None:
-            try:
-                self.invoiceNumber = Invoice.objects.latest('invoiceNumber').invoiceNumber + 1
-            except Invoice.DoesNotExist:
-                try:
-                    self.invoiceNumber = InvoiceGlobalSettings.objects.get().firstInvoiceNumber
-                except InvoiceGlobalSettings.DoesNotExist:
-                    self.invoiceNumber = 1
-        
+        Invoice.assignInvoiceNumbers([self])
+
         # Set invoiced date to payment due date if None, when mentor views invoice date will get brought forward to current date if before paymend due date
         if self.invoicedDate is None:
             self.invoicedDate = self.event.paymentDueDate
@@ -126,28 +252,46 @@ class Invoice(SaveDeleteMixin, models.Model):
     def postDelete(self):
         # In case campus invoicing enabled and an invoice is deleted, recalculate totals on remaining
         for invoice in Invoice.objects.filter(school=self.school, event=self.event):
-            invoice.calculateAndSaveAllTotals()
+            recalculateInvoiceTotals(invoice)
 
     # *****Methods*****
 
+    # Set invoice numbers on invoices that don't have one yet, allocated together so creating many invoices only takes one query
+    @classmethod
+    def assignInvoiceNumbers(cls, invoices):
+        invoices = [invoice for invoice in invoices if invoice.invoiceNumber is None]
+        if not invoices:
+            return
+
+        for invoice, invoiceNumber in zip(invoices, InvoiceNumberCounter.allocate(len(invoices))):
+            invoice.invoiceNumber = invoiceNumber
+
     # *****Get Methods*****
 
     def invoiceToUserName(self):
         return self.invoiceToUser.fullname_or_email()
     invoiceToUserName.short_description = 'Mentor'
     invoiceToUserName.admin_order_field = 'invoiceToUser'
+    invoiceToUserName.exportSelectRelated = ['invoiceToUser']
 
     def invoiceToUserEmail(self):
         return self.invoiceToUser.email
     invoiceToUserEmail.short_description = 'Mentor email'
     invoiceToUserEmail.admin_order_field = 'invoiceToUser__email'
+    invoiceToUserEmail.exportSelectRelated = ['invoiceToUser']
 
     @classmethod
     def invoicesForUser(cls, user):
         return Invoice.objects.filter(Q(invoiceToUser=user) | Q(school__schooladministrator__user=user)).distinct()
 
     def hiddenInvoice(self):
-        return self.invoiceAmountInclGST_unrounded() < 0.05 and not self.invoicepayment_set.exists()
+        return self.invoiceAmountInclGST_unrounded() < 0.05 and not self.hasPayments()
+
+    def hasPayments(self):
+        try:
+            return self._sumPayments is not None
+        except AttributeError:
+            return self.invoicepayment_set.exists()
 
     def get_absolute_url(self):
         from django.urls import reverse
@@ -182,7 +326,7 @@ class Invoice(SaveDeleteMixin, models.Model):
 
     # Filter for all items covered by this ivoice
     def allItemsFilterFields(self, ignoreCampus=False):
-        if self.campusInvoicingEnabled() and not ignoreCampus:
+        if not ignoreCampus and self.campusInvoicingEnabled():
             # Filter by school and campus
             return {
                 'event': self.event,
@@ -230,24 +374,42 @@ class Invoice(SaveDeleteMixin, models.Model):
 
         return specialRateTeams
 
+    # Primary keys of the special rate teams for this school/ mentor, evaluated once so not re-run as a subquery
+    def specialRateTeamPKs(self):
+        return list(self.specialRateTeamsForSchool().values_list('pk', flat=True))
+
     # Special rate teams for this invoice
     def specialRateTeams(self):
         # Filter teams for this invoice to those that receive special rate
-        return self.allTeams().filter(pk__in=self.specialRateTeamsForSchool().values_list('pk', flat=True))
+        return self.allTeams().filter(pk__in=self.specialRateTeamPKs())
 
     # Standard rate teams for this invoice - teams that don't receive the special rate
     def standardRateTeams(self):
         # Filter teams for this invoice to exclude those that receive special rate
-        return self.allTeams().exclude(pk__in=self.specialRateTeamsForSchool().values_list('pk', flat=True))
+        return self.allTeams().exclude(pk__in=self.specialRateTeamPKs())
 
     # Need methods to calculate teams or students that get special rate and teams that don't
     # Maybe just make special rate require teams
 
     # Invoice items
 
-    def standardRateDivisions(self):
-        from events.models import Division
-        return Division.objects.filter(baseeventattendance__in=self.standardRateTeams()).distinct()
+    # Dictionary of available divisions for this event keyed by division id
+    def availableDivisionsLookup(self):
+        return {availableDivision.division_id: availableDivision for availableDivision in self.event.availabledivision_set.all()}
+
+    # Number of teams and students in each division, in a single grouped query
+    def divisionTeamTotals(self, teams):
+        return teams.values('division', 'division__name').annotate(
+            numberTeams=Count('pk', distinct=True),
+            numberStudents=Count('student'),
+        ).order_by('division__category__name', 'division__name')
+
+    # Number of teacher and student attendees in each division, in a single grouped query
+    def divisionWorkshopAttendeeTotals(self, attendees):
+        return attendees.values('division', 'division__name').annotate(
+            numberTeachers=Count('pk', filter=Q(attendeeType='teacher')),
+            numberStudents=Count('pk', filter=Q(attendeeType='student')),
+        ).order_by('division__category__name', 'division__name')
 
     def invoiceItem(self, name, description, quantity, rawUnitCost, unit=None, excludeFromSurcharge=False):
         # Calculate totals
@@ -277,10 +439,11 @@ class Invoice(SaveDeleteMixin, models.Model):
 
     def surchargeInvoiceItem(self, quantity):
         # Get surcharge name and description
-        try:
-            surchargeName = InvoiceGlobalSettings.objects.get().surchargeName
-            surchargeInvoiceDescription = InvoiceGlobalSettings.objects.get().surchargeInvoiceDescription
-        except InvoiceGlobalSettings.DoesNotExist:
+        invoiceSettings = InvoiceGlobalSettings.getCached()
+        if invoiceSettings:
+            surchargeName = invoiceSettings.surchargeName
+            surchargeInvoiceDescription = invoiceSettings.surchargeInvoiceDescription
+        else:
             surchargeName = 'Surcharge'
             surchargeInvoiceDescription = ''
 
@@ -301,47 +464,38 @@ class Invoice(SaveDeleteMixin, models.Model):
             'totalInclGST': totalInclGST,
         }
 
-    def workshopInvoiceItem(self, attendees, division, nameSuffix, unitCost, override):
+    def workshopInvoiceItem(self, divisionName, attendeeType, quantity, override, description=""):
         namePrefix = "Other attendees - " if override else ""
-        name = f'{namePrefix}{division.name} - {nameSuffix}'
-        description = ", ".join(map(lambda attendee: attendee.strNameAndSchool(), attendees)) if override else ""
-        return self.invoiceItem(name, description, attendees.count(), unitCost)
-    
+        name = f'{namePrefix}{divisionName} - {attendeeType}'
+        unitCost = self.event.workshopTeacherEntryFee if attendeeType == 'teacher' else self.event.workshopStudentEntryFee
+        return self.invoiceItem(name, description, quantity, unitCost)
+
     def workshopInvoiceItems(self, attendees, override=False):
         invoiceItems = []
 
-        # Get details
-        teacherUnitCost = self.event.workshopTeacherEntryFee
-        studentUnitCost = self.event.workshopStudentEntryFee
+        # Get attendee names for the description if override
+        attendeeNames = defaultdict(list)
+        if override:
+            for attendee in attendees.select_related('school', 'mentorUser'):
+                attendeeNames[(attendee.division_id, attendee.attendeeType)].append(attendee.strNameAndSchool())
 
-        # Get divisions
-        from events.models import Division
-        divisions = Division.objects.filter(baseeventattendance__in=attendees).distinct()
+            # No need to count if there are no override attendees
+            if not attendeeNames:
+                return invoiceItems
 
         # Create invoice items
-        for division in divisions:
+        for divisionTotal in self.divisionWorkshopAttendeeTotals(attendees):
             # Split teacher and student
+            for attendeeType, quantity in [('teacher', divisionTotal['numberTeachers']), ('student', divisionTotal['numberStudents'])]:
+                if quantity > 0:
+                    description = ", ".join(attendeeNames[(divisionTotal['division'], attendeeType)])
+                    invoiceItems.append(self.workshopInvoiceItem(divisionTotal['division__name'], attendeeType, quantity, override, description))
 
-            # Teachers
-            teacherAttedees = attendees.filter(division=division, attendeeType='teacher')
-            if teacherAttedees.count() > 0:
-                invoiceItems.append(self.workshopInvoiceItem(teacherAttedees, division, 'teacher', teacherUnitCost, override))
-
-            # Students
-            studentAttedees = attendees.filter(division=division, attendeeType='student')
-            if studentAttedees.count() > 0:
-                invoiceItems.append(self.workshopInvoiceItem(studentAttedees, division, 'student', studentUnitCost, override))
-        
         return invoiceItems
 
-    def competitionDivisionInvoiceItem(self, teams, division, namePrefix = "", description = ""):
-        from events.models import AvailableDivision
-        from teams.models import Student
+    def competitionDivisionInvoiceItem(self, divisionTotal, availableDivisions, namePrefix = "", description = ""):
         # Get available division
-        try:
-            availableDivision = self.event.availabledivision_set.get(division=division)
-        except AvailableDivision.DoesNotExist:
-            availableDivision = None
+        availableDivision = availableDivisions.get(divisionTotal['division'])
 
         # Get unit cost, use availableDivision value if present, otherwise use value from event
         unitCost = self.event.competition_defaultEntryFee
@@ -353,19 +507,21 @@ class Invoice(SaveDeleteMixin, models.Model):
         # Get quantity
         quantity = 0
         if unit == 'team':
-            quantity = teams.count()
+            quantity = divisionTotal['numberTeams']
 
         elif unit == 'student':
-            quantity = Student.objects.filter(team__in=teams).count()
-            
-        return self.invoiceItem(f"{namePrefix}{division.name}", description, quantity, unitCost, unit)
+            quantity = divisionTotal['numberStudents']
 
-    def competitionInvoiceItems(self):
+        return self.invoiceItem(f"{namePrefix}{divisionTotal['division__name']}", description, quantity, unitCost, unit)
 
+    def competitionInvoiceItems(self, availableDivisions):
         invoiceItems = []
 
+        teams = self.allTeams()
+        specialRateTeamPKs = self.specialRateTeamPKs()
+
         # Special rate entries
-        numberSpecialRateTeams = self.specialRateTeams().count()
+        numberSpecialRateTeams = teams.filter(pk__in=specialRateTeamPKs).count() if specialRateTeamPKs else 0
         if numberSpecialRateTeams:
 
             # Get values
@@ -379,27 +535,31 @@ class Invoice(SaveDeleteMixin, models.Model):
             invoiceItems.append(self.invoiceItem(name, description, quantity, unitCost, 'team'))
 
         # Standard rate entries
-        for division in self.standardRateDivisions():
-            teams = self.standardRateTeams().filter(division=division)
-        
-            invoiceItems.append(self.competitionDivisionInvoiceItem(teams, division))
+        for divisionTotal in self.divisionTeamTotals(teams.exclude(pk__in=specialRateTeamPKs)):
+            invoiceItems.append(self.competitionDivisionInvoiceItem(divisionTotal, availableDivisions))
 
         return invoiceItems
 
-    def overrideInvoiceItems(self):
+    def overrideInvoiceItems(self, availableDivisions=None):
         from teams.models import Team
-        from events.models import Division
         from workshops.models import WorkshopAttendee
 
         invoiceItems = []
 
         teams = Team.objects.filter(invoiceOverride=self)
-        divisions = Division.objects.filter(baseeventattendance__in=teams).distinct()
 
-        for division in divisions:
-            divisionTeams = teams.filter(division=division)
-            teamNames = ", ".join(map(lambda team: team.strNameAndSchool(), divisionTeams))
-            invoiceItems.append(self.competitionDivisionInvoiceItem(divisionTeams, division, namePrefix="Other teams - ", description=teamNames))
+        # Get team names for the description
+        teamNames = defaultdict(list)
+        for team in teams.select_related('school', 'mentorUser'):
+            teamNames[team.division_id].append(team.strNameAndSchool())
+
+        if teamNames:
+            if availableDivisions is None:
+                availableDivisions = self.availableDivisionsLookup()
+
+            for divisionTotal in self.divisionTeamTotals(teams):
+                description = ", ".join(teamNames[divisionTotal['division']])
+                invoiceItems.append(self.competitionDivisionInvoiceItem(divisionTotal, availableDivisions, namePrefix="Other teams - ", description=description))
 
         attendees = WorkshopAttendee.objects.filter(invoiceOverride=self)
         invoiceItems += self.workshopInvoiceItems(attendees, override=True)
@@ -409,6 +569,7 @@ class Invoice(SaveDeleteMixin, models.Model):
     def invoiceItems(self):
         from workshops.models import WorkshopAttendee
         invoiceItems = []
+        availableDivisions = None
 
         if self.event.eventType == 'workshop':
             # All workshop attendees for this invoice        
@@ -416,9 +577,10 @@ class Invoice(SaveDeleteMixin, models.Model):
             invoiceItems += self.workshopInvoiceItems(attendees)
 
         elif self.event.eventType == 'competition':
-            invoiceItems += self.competitionInvoiceItems()
+            availableDivisions = self.availableDivisionsLookup()
+            invoiceItems += self.competitionInvoiceItems(availableDivisions)
 
-        invoiceItems += self.overrideInvoiceItems()
+        invoiceItems += self.overrideInvoiceItems(availableDivisions)
 
         # Add surcharge if not $0
         surchargeQuantity = sum([item['surchargeQuantity'] for item in invoiceItems])
@@ -428,11 +590,14 @@ class Invoice(SaveDeleteMixin, models.Model):
         return invoiceItems
 
     # Calculate and save cached totals
+    # Invoice items are built once and all totals derived from the same result
     def calculateAndSaveAllTotals(self):
-        self.cache_amountGST_unrounded = self.calculate_amountGST_unrounded()
-        self.cache_totalQuantity = self.calculate_totalQuantity()
-        self.cache_invoiceAmountExclGST_unrounded = self.calculate_invoiceAmountExclGST_unrounded()
-        self.cache_invoiceAmountInclGST_unrounded = self.calculate_invoiceAmountInclGST_unrounded()
+        invoiceItems = self.invoiceItems()
+
+        self.cache_amountGST_unrounded = self.calculate_amountGST_unrounded(invoiceItems)
+        self.cache_totalQuantity = self.calculate_totalQuantity(invoiceItems)
+        self.cache_invoiceAmountExclGST_unrounded = self.calculate_invoiceAmountExclGST_unrounded(invoiceItems)
+        self.cache_invoiceAmountInclGST_unrounded = self.calculate_invoiceAmountInclGST_unrounded(invoiceItems)
 
         self.save(skipPrePostSave=True, update_fields=[
             'cache_amountGST_unrounded',
@@ -454,8 +619,10 @@ class Invoice(SaveDeleteMixin, models.Model):
     amountPaid.short_description = 'Amount paid'
     amountPaid.admin_order_field = '_sumPayments'
 
-    def calculate_amountGST_unrounded(self):
-        return sum([item['gst'] for item in self.invoiceItems()])
+    def calculate_amountGST_unrounded(self, invoiceItems=None):
+        if invoiceItems is None:
+            invoiceItems = self.invoiceItems()
+        return sum([item['gst'] for item in invoiceItems])
 
     def amountGST_unrounded(self):
         if self.cache_amountGST_unrounded is None:
@@ -466,8 +633,10 @@ class Invoice(SaveDeleteMixin, models.Model):
         return round(self.amountGST_unrounded(), 2)
     amountGST.short_description = 'GST'
 
-    def calculate_totalQuantity(self):
-        return sum([item['quantity'] for item in self.invoiceItems()])
+    def calculate_totalQuantity(self, invoiceItems=None):
+        if invoiceItems is None:
+            invoiceItems = self.invoiceItems()
+        return sum([item['quantity'] for item in invoiceItems])
 
     def totalQuantity(self):
         if self.cache_totalQuantity is None:
@@ -476,8 +645,10 @@ class Invoice(SaveDeleteMixin, models.Model):
 
     # Invoice amount
 
-    def calculate_invoiceAmountExclGST_unrounded(self):
-        return sum([item['totalExclGST'] for item in self.invoiceItems()])
+    def calculate_invoiceAmountExclGST_unrounded(self, invoiceItems=None):
+        if invoiceItems is None:
+            invoiceItems = self.invoiceItems()
+        return sum([item['totalExclGST'] for item in invoiceItems])
 
     def invoiceAmountExclGST_unrounded(self):
         if self.cache_invoiceAmountExclGST_unrounded is None:
@@ -488,8 +659,10 @@ class Invoice(SaveDeleteMixin, models.Model):
         return round(self.invoiceAmountExclGST_unrounded(), 2)
     invoiceAmountExclGST.short_description = 'Invoice amount (ex GST)'
 
-    def calculate_invoiceAmountInclGST_unrounded(self):
-        return sum([item['totalInclGST'] for item in self.invoiceItems()])
+    def calculate_invoiceAmountInclGST_unrounded(self, invoiceItems=None):
+        if invoiceItems is None:
+            invoiceItems = self.invoiceItems()
+        return sum([item['totalInclGST'] for item in invoiceItems])
 
     def invoiceAmountInclGST_unrounded(self):
         if self.cache_invoiceAmountInclGST_unrounded is None:
@@ -523,6 +696,9 @@ class Invoice(SaveDeleteMixin, models.Model):
     def paypalAvailable(self):
         return bool(self.event.state.paypalEmail) and self.amountDueInclGST_unrounded() >= 0.05 # 0.05 to avoid tiny sum edge caes
 
+    # Related fields used in __str__, loaded with admin CSV exports
+    strSelectRelated = ['school', 'campus', 'invoiceToUser']
+
     def __str__(self):
         if self.campus:
             return f'Invoice {self.invoiceNumber}: {self.school}, {self.campus}'
@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction, connection, close_old_connections
+
+import atexit
+import logging
+import queue
+import threading
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Saving a team, student or workshop attendee changes the totals of the invoices it is billed to.
+# Instead of recalculating the same invoice after every save, invoices are collected for the current transaction
+# and each one is recalculated once when the transaction commits.
+#
+# INVOICE_RECALCULATION_MODE setting:
+#   'deferred' - recalculate once on commit of the current transaction (default)
+#   'background' - recalculate once on commit in a local background thread, so the request doesn't wait
+#   'immediate' - recalculate every time, as soon as requested
+
+def recalculationMode():
+    return getattr(settings, 'INVOICE_RECALCULATION_MODE', 'deferred')
+
+def recalculateInvoices(invoicePKs):
+    from invoices.models import Invoice
+
+    # Fetch fresh copies so the totals reflect the committed state of each invoice
+    for invoice in Invoice.objects.filter(pk__in=invoicePKs).select_related('event', 'school', 'campus', 'invoiceToUser'):
+        invoice.calculateAndSaveAllTotals()
+
+class PendingInvoiceRecalculations:
+    # Callback that recalculates the invoices waiting for a transaction to commit
+    # One is registered per transaction, invoices saved later in the same transaction are added to it
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.invoicePKs = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        invoicePKs, self.invoicePKs = self.invoicePKs, set()
+
+        if not invoicePKs:
+            return
+
+        if self.mode == 'background':
+            backgroundWorker.enqueue(invoicePKs)
+        else:
+            recalculateInvoices(invoicePKs)
+
+class PendingRecalculationsLocal(threading.local):
+    # Registered callback for each connection alias in this thread
+    # Only weakly referenced, Django drops the callbacks of a rolled back transaction or savepoint,
+    # so a dead reference means nothing is registered and a new callback is needed
+
+    def __init__(self):
+        self.callbacks = {}
+
+pendingRecalculations = PendingRecalculationsLocal()
+
+def addPendingRecalculation(invoice, mode, using):
+    reference = pendingRecalculations.callbacks.get(using)
+    callback = reference() if reference is not None else None
+
+    if callback is None or callback.done or callback.mode != mode:
+        callback = PendingInvoiceRecalculations(mode)
+        transaction.on_commit(callback, using=using)
+        pendingRecalculations.callbacks[using] = weakref.ref(callback)
+
+    callback.invoicePKs.add(invoice.pk)
+
+def recalculateInvoiceTotals(invoice):
+    mode = recalculationMode()
+
+    if mode == 'immediate':
+        invoice.calculateAndSaveAllTotals()
+        return
+
+    using = invoice._state.db or DEFAULT_DB_ALIAS
+
+    # No transaction so nothing to coalesce with, recalculate now
+    if not transaction.get_connection(using).in_atomic_block:
+        if mode == 'background':
+            backgroundWorker.enqueue([invoice.pk])
+        else:
+            invoice.calculateAndSaveAllTotals()
+        return
+
+    addPendingRecalculation(invoice, mode, using)
+
+class BackgroundRecalculationWorker:
+    # Single local thread that recalculates invoices handed to it after commit
+    # Invoices queued while a recalculation is running are coalesced into the next batch
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def enqueue(self, invoicePKs):
+        self.queue.put(set(invoicePKs))
+        self.start()
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='invoiceRecalculation', daemon=True)
+                self.thread.start()
+
+    def nextBatch(self, block=True):
+        invoicePKs = self.queue.get(block=block)
+        numberQueued = 1
+
+        # Take everything else already waiting so each invoice is only recalculated once
+        while True:
+            try:
+                invoicePKs |= self.queue.get_nowait()
+                numberQueued += 1
+            except queue.Empty:
+                return invoicePKs, numberQueued
+
+    def process(self, invoicePKs, numberQueued):
+        # Not in a request, so connections that are broken or past CONN_MAX_AGE are closed here instead
+        close_old_connections()
+        try:
+            recalculateInvoices(invoicePKs)
+        except Exception:
+            logger.exception('Background invoice recalculation failed')
+        finally:
+            close_old_connections()
+            for i in range(numberQueued):
+                self.queue.task_done()
+
+    def run(self):
+        try:
+            while True:
+                self.process(*self.nextBatch())
+        finally:
+            connection.close()
+
+    # Block until all queued invoices have been recalculated
+    def waitUntilIdle(self):
+        self.queue.join()
+
+    # Recalculate anything still queued on interpreter exit, so totals aren't left out of date
+    def drain(self):
+        while True:
+            try:
+                self.process(*self.nextBatch(block=False))
+            except queue.Empty:
+                return
+
+backgroundWorker = BackgroundRecalculationWorker()
+atexit.register(backgroundWorker.drain)
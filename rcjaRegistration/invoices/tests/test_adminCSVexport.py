@@ -2,8 +2,13 @@ from common.baseTests import createStates, createUsers, createSchools, createEve
 from django.http import HttpRequest
 from django.urls import reverse
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from invoices.models import Invoice
+from invoices.models import Invoice, InvoicePayment
+from teams.models import Team
+
+import datetime
 
 class TestAdminCSVExport_Invoice(TestCase):
     @classmethod
@@ -30,3 +35,33 @@ class TestAdminCSVExport_Invoice(TestCase):
     def test_export_as_csv_correctValues(self):
         response = self.client.post(reverse('admin:invoices_invoice_changelist'), {'action': 'export_as_csv', '_selected_action': [self.invoice.pk]})
         self.assertContains(response, 'State 1 Open Competition')
+
+class TestAdminCSVExportNumQueries_Invoice(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeams(cls)
+
+    def setUp(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_super1, password=self.password)
+
+    def exportNumQueries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin:invoices_invoice_changelist'), {'action': 'export_as_csv', '_selected_action': list(Invoice.objects.values_list('pk', flat=True))})
+            content = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(len(content.splitlines()), Invoice.objects.count() + 1)
+        return len(queries)
+
+    def testNumQueriesConstantAsInvoicesIncrease(self):
+        initialNumQueries = self.exportNumQueries()
+
+        # Independent invoice, invoice for another school and a payment
+        Team.objects.create(event=self.state1_openCompetition, division=self.division3, mentorUser=self.user_state1_independent_mentor5, name='Independent Team')
+        Team.objects.create(event=self.state1_openCompetition, division=self.division3, mentorUser=self.user_state1_school2_mentor3, school=self.school2_state1, name='School 2 Team')
+        InvoicePayment.objects.create(invoice=Invoice.objects.first(), amountPaid=10, datePaid=datetime.date.today())
+
+        self.assertEqual(self.exportNumQueries(), initialNumQueries)
@@ -24,8 +24,11 @@ class Invoice_Base:
     @classmethod
     def additionalSetup(cls):
         createEvents(cls)
-        createInvoices(cls)
-        createTeams(cls)
+
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createInvoices(cls)
+            createTeams(cls)
 
 class Test_Invoice_NotStaff(Invoice_Base, Base_Test_NotStaff, TestCase):
     pass
@@ -0,0 +1,123 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents, createTeams
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.http import HttpRequest
+from django.urls import reverse
+
+from invoices.models import Invoice, InvoicePayment
+from schools.models import SchoolAdministrator
+
+import datetime
+
+class TestWithAmountDue(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createTeams(cls)
+
+        cls.invoice1 = Invoice.objects.get(event=cls.state1_openCompetition, school=cls.school1_state1)
+        cls.invoice2 = Invoice.objects.get(event=cls.state2_openCompetition, school=cls.school1_state1)
+
+    def pay(self, invoice, amount):
+        InvoicePayment.objects.create(invoice=invoice, amountPaid=amount, datePaid=datetime.date.today())
+
+    def testMatchesModelMethods(self):
+        self.pay(self.invoice1, 30)
+        self.pay(self.invoice1, 10)
+
+        for invoice in Invoice.objects.withAmountDue():
+            fresh = Invoice.objects.get(pk=invoice.pk)
+            self.assertEqual(invoice.amountPaid(), fresh.amountPaid())
+            self.assertEqual(invoice.amountDueInclGST(), fresh.amountDueInclGST())
+            self.assertEqual(invoice.hiddenInvoice(), fresh.hiddenInvoice())
+
+    def testNoPayments(self):
+        invoice = Invoice.objects.withAmountDue().get(pk=self.invoice1.pk)
+
+        self.assertIsNone(invoice._sumPayments)
+        self.assertEqual(invoice._amountDueUnrounded, 100)
+
+    def testPaymentsNotDuplicatedByJoins(self):
+        # Second administrator of the school would duplicate payment rows if summed over a join
+        SchoolAdministrator.objects.create(school=self.school1_state1, user=self.user_state1_school2_mentor3)
+        self.pay(self.invoice1, 40)
+
+        invoice = Invoice.invoicesForUser(self.user_state1_school1_mentor1).withAmountDue().get(pk=self.invoice1.pk)
+
+        self.assertEqual(invoice.amountPaid(), 40)
+        self.assertEqual(invoice._amountDueUnrounded, 60)
+
+    def testNoPaymentQueriesPerInvoice(self):
+        self.pay(self.invoice1, 40)
+        invoices = list(Invoice.objects.withAmountDue())
+
+        with self.assertNumQueries(0):
+            for invoice in invoices:
+                invoice.amountDueInclGST()
+                invoice.hiddenInvoice()
+
+class TestDashboardOutstandingInvoices(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createTeams(cls)
+
+        cls.invoice1 = Invoice.objects.get(event=cls.state1_openCompetition, school=cls.school1_state1)
+
+    def setUp(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_school1_mentor1, password=self.password)
+
+    def getDashboard(self):
+        return self.client.get(reverse('events:dashboard'))
+
+    def testOutstandingCount(self):
+        response = self.getDashboard()
+        self.assertEqual(response.context['outstandingInvoices'], 2)
+
+    def testPaidNotOutstanding(self):
+        InvoicePayment.objects.create(invoice=self.invoice1, amountPaid=100, datePaid=datetime.date.today())
+
+        response = self.getDashboard()
+        self.assertEqual(response.context['outstandingInvoices'], 1)
+
+    def testPartiallyPaidOutstanding(self):
+        InvoicePayment.objects.create(invoice=self.invoice1, amountPaid=50, datePaid=datetime.date.today())
+
+        response = self.getDashboard()
+        self.assertEqual(response.context['outstandingInvoices'], 2)
+
+    def testTotalsNotCalculatedOutstanding(self):
+        Invoice.objects.filter(pk=self.invoice1.pk).update(cache_invoiceAmountInclGST_unrounded=None)
+
+        response = self.getDashboard()
+        self.assertEqual(response.context['outstandingInvoices'], 2)
+
+        self.invoice1.refresh_from_db()
+        self.assertIsNotNone(self.invoice1.cache_invoiceAmountInclGST_unrounded)
+
+    def testConstantQueries(self):
+        # Warm up so one off queries such as the session are the same for both requests
+        self.getDashboard()
+
+        with CaptureQueriesContext(connection) as initialQueries:
+            self.getDashboard()
+
+        for event in [self.state1_pastCompetition, self.state1_closedCompetition1, self.state1_closedCompetition2]:
+            invoice = Invoice.objects.create(event=event, school=self.school1_state1, invoiceToUser=self.user_state1_school1_mentor1)
+            InvoicePayment.objects.create(invoice=invoice, amountPaid=10, datePaid=datetime.date.today())
+
+        with self.assertNumQueries(len(initialQueries)):
+            self.getDashboard()
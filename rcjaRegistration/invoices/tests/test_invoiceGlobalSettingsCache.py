@@ -0,0 +1,124 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+
+from invoices.models import InvoiceGlobalSettings, Invoice
+
+locmemCache = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'invoiceGlobalSettingsTests',
+    }
+}
+
+def createInvoiceSettings():
+    return InvoiceGlobalSettings.objects.create(
+        invoiceFromName='From Name',
+        invoiceFromDetails='Details',
+        invoiceFooterMessage='Footer',
+        surchargeAmount=1,
+        surchargeName='Test surcharge',
+        surchargeInvoiceDescription='Invoice description',
+        surchargeEventDescription='Event description',
+    )
+
+@override_settings(CACHES=locmemCache, CACHE_SHARED=True)
+class TestInvoiceGlobalSettingsCache(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def testNoSettingsReturnsNone(self):
+        self.assertIsNone(InvoiceGlobalSettings.getCached())
+
+    def testNoSettingsCached(self):
+        InvoiceGlobalSettings.getCached()
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(InvoiceGlobalSettings.getCached())
+
+    def testReadOnce(self):
+        createInvoiceSettings()
+
+        with self.assertNumQueries(1):
+            for i in range(5):
+                self.assertEqual(InvoiceGlobalSettings.getCached().surchargeName, 'Test surcharge')
+
+    def testCreateInvalidatesNone(self):
+        self.assertIsNone(InvoiceGlobalSettings.getCached())
+
+        createInvoiceSettings()
+
+        self.assertEqual(InvoiceGlobalSettings.getCached().surchargeName, 'Test surcharge')
+
+    def testSaveInvalidates(self):
+        invoiceSettings = createInvoiceSettings()
+        InvoiceGlobalSettings.getCached()
+
+        invoiceSettings.surchargeName = 'New name'
+        invoiceSettings.save()
+
+        self.assertEqual(InvoiceGlobalSettings.getCached().surchargeName, 'New name')
+
+    def testDeleteInvalidates(self):
+        invoiceSettings = createInvoiceSettings()
+        InvoiceGlobalSettings.getCached()
+
+        invoiceSettings.delete()
+
+        self.assertIsNone(InvoiceGlobalSettings.getCached())
+
+    def testVersionChangedOnCommit(self):
+        invoiceSettings = createInvoiceSettings()
+        InvoiceGlobalSettings.getCached()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoiceSettings.save()
+            version = cache.get(InvoiceGlobalSettings.cacheVersionKey)
+
+        self.assertNotEqual(cache.get(InvoiceGlobalSettings.cacheVersionKey), version)
+
+@override_settings(CACHES=locmemCache, CACHE_SHARED=False)
+class TestInvoiceGlobalSettingsPerProcessCache(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def testChangeInOtherWorkerSeen(self):
+        invoiceSettings = createInvoiceSettings()
+        InvoiceGlobalSettings.getCached()
+
+        # Update doesn't invalidate this process's cache, like a save handled by another worker
+        InvoiceGlobalSettings.objects.filter(pk=invoiceSettings.pk).update(surchargeName='New name')
+
+        self.assertEqual(InvoiceGlobalSettings.getCached().surchargeName, 'New name')
+
+@override_settings(CACHES=locmemCache, CACHE_SHARED=True)
+class TestInvoiceGlobalSettingsCacheUsage(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        cls.invoiceSettings.surchargeName = 'Test surcharge'
+        cls.invoiceSettings.surchargeInvoiceDescription = 'Invoice description'
+        cls.invoiceSettings.surchargeEventDescription = 'Event description'
+        cls.invoiceSettings.save()
+
+    def setUp(self):
+        cache.clear()
+
+    def testEventSurchargeFieldsReadSettingsOnce(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.state1_openCompetition.surchargeName(), 'Test surcharge')
+            self.assertEqual(self.state1_openCompetition.surchargeEventDescription(), 'Event description')
+            self.assertEqual(self.state1_openWorkshop.surchargeName(), 'Test surcharge')
+
+    def testSurchargeInvoiceItem(self):
+        invoice = Invoice(event=self.state1_openCompetition)
+
+        InvoiceGlobalSettings.getCached()
+        with self.assertNumQueries(0):
+            item = invoice.surchargeInvoiceItem(2)
+
+        self.assertEqual(item['name'], 'Test surcharge')
+        self.assertEqual(item['description'], 'Invoice description')
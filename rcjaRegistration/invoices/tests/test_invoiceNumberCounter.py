@@ -0,0 +1,152 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents
+from django.test import TestCase, TransactionTestCase
+from django.db import connection, transaction
+
+from invoices.models import Invoice, InvoiceNumberCounter
+
+import threading
+
+class TestInvoiceNumberCounter(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+
+    def createInvoice(self, event):
+        return Invoice.objects.create(event=event, school=self.school1_state1, invoiceToUser=self.user_state1_school1_mentor1)
+
+    def testFirstInvoiceNumberFromSettings(self):
+        self.invoiceSettings.firstInvoiceNumber = 500
+        self.invoiceSettings.save()
+
+        self.assertEqual(self.createInvoice(self.state1_openCompetition).invoiceNumber, 500)
+        self.assertEqual(self.createInvoice(self.state2_openCompetition).invoiceNumber, 501)
+
+    def testFirstInvoiceNumberIgnoredOnceInvoicesExist(self):
+        first = self.createInvoice(self.state1_openCompetition)
+
+        self.invoiceSettings.firstInvoiceNumber = 500
+        self.invoiceSettings.save()
+
+        self.assertEqual(self.createInvoice(self.state2_openCompetition).invoiceNumber, first.invoiceNumber + 1)
+
+    def testAllocateBlock(self):
+        numbers = InvoiceNumberCounter.allocate(5)
+
+        self.assertEqual(numbers, list(range(numbers[0], numbers[0] + 5)))
+        self.assertEqual(InvoiceNumberCounter.allocate(), [numbers[-1] + 1])
+
+    def testAllocateOneQuery(self):
+        with self.assertNumQueries(1):
+            InvoiceNumberCounter.allocate(10)
+
+    def testAssignInvoiceNumbers(self):
+        invoices = [Invoice(), Invoice(), Invoice(invoiceNumber=1000)]
+
+        with self.assertNumQueries(1):
+            Invoice.assignInvoiceNumbers(invoices)
+
+        self.assertEqual(invoices[1].invoiceNumber, invoices[0].invoiceNumber + 1)
+        self.assertEqual(invoices[2].invoiceNumber, 1000)
+
+    def testCounterRecreatedFromInvoices(self):
+        if InvoiceNumberCounter.usesSequence():
+            self.skipTest('Counter row not used with a sequence')
+
+        invoice = self.createInvoice(self.state1_openCompetition)
+        Invoice.objects.filter(pk=invoice.pk).update(invoiceNumber=800)
+        InvoiceNumberCounter.objects.all().delete()
+
+        self.assertEqual(self.createInvoice(self.state2_openCompetition).invoiceNumber, 801)
+
+class TestInvoiceNumberCounterConcurrency(TransactionTestCase):
+    threadCount = 8
+    allocationsPerThread = 20
+
+    def setUp(self):
+        # Threads share an in memory SQLite database through a shared cache, which raises locking errors instead of waiting
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Needs a file backed SQLite database or PostgreSQL')
+
+        InvoiceNumberCounter.setLastNumber(0)
+
+    def testConcurrentAllocationsUnique(self):
+        numbers = []
+        errors = []
+        barrier = threading.Barrier(self.threadCount)
+
+        def allocate(blockSize):
+            try:
+                barrier.wait()
+                for i in range(self.allocationsPerThread):
+                    numbers.extend(InvoiceNumberCounter.allocate(blockSize))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        # Mix of single numbers and blocks
+        threads = [threading.Thread(target=allocate, args=(1 + i % 3,)) for i in range(self.threadCount)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(numbers), list(range(1, len(numbers) + 1)))
+        self.assertEqual(InvoiceNumberCounter.allocate(), [len(numbers) + 1])
+
+    def testAllocationNotBlockedByOpenTransaction(self):
+        if not InvoiceNumberCounter.usesSequence():
+            self.skipTest('Only allocated outside the transaction with a sequence')
+
+        allocated = threading.Event()
+        release = threading.Event()
+
+        def holdTransaction():
+            try:
+                with transaction.atomic():
+                    InvoiceNumberCounter.allocate()
+                    allocated.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        def allocate():
+            try:
+                numbers.extend(InvoiceNumberCounter.allocate())
+            finally:
+                connection.close()
+
+        numbers = []
+        holder = threading.Thread(target=holdTransaction)
+        holder.start()
+        self.assertTrue(allocated.wait(10))
+
+        # Would wait until the first transaction ends if the allocation were held by the transaction
+        allocator = threading.Thread(target=allocate)
+        allocator.start()
+        allocator.join(5)
+        finished = not allocator.is_alive()
+
+        release.set()
+        holder.join()
+        allocator.join()
+
+        self.assertTrue(finished)
+        self.assertEqual(numbers, [2])
+
+    def testRolledBackNumbersSkipped(self):
+        if not InvoiceNumberCounter.usesSequence():
+            self.skipTest('Counter row is rolled back with the transaction')
+
+        try:
+            with transaction.atomic():
+                InvoiceNumberCounter.allocate()
+                raise ValueError
+        except ValueError:
+            pass
+
+        self.assertEqual(InvoiceNumberCounter.allocate(), [2])
@@ -0,0 +1,235 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.db import transaction
+from django.http import HttpRequest
+from django.urls import reverse
+from unittest.mock import patch
+
+from invoices.models import Invoice
+from invoices.recalculation import backgroundWorker
+from teams.models import Team, Student, HardwarePlatform, SoftwarePlatform
+
+def createTeam(self, name, numberStudents):
+    team = Team.objects.create(
+        event=self.state1_openCompetition,
+        division=self.division3,
+        mentorUser=self.user_state1_school1_mentor1,
+        school=self.school1_state1,
+        name=name,
+    )
+    for i in range(numberStudents):
+        Student.objects.create(
+            team=team,
+            firstName='First',
+            lastName='Last',
+            yearLevel=5,
+            gender='other',
+        )
+    return team
+
+def setStudentBilling(self):
+    self.state1_openCompetition.competition_billingType = 'student'
+    self.state1_openCompetition.save()
+
+class TestDeferredInvoiceRecalculation(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        setStudentBilling(cls)
+
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.team1 = createTeam(cls, 'Team 1', 1)
+        cls.invoice = Invoice.objects.get(event=cls.state1_openCompetition, school=cls.school1_state1)
+
+    def testRecalculatedOnceOnCommit(self):
+        with patch.object(Invoice, 'calculateAndSaveAllTotals', autospec=True, side_effect=Invoice.calculateAndSaveAllTotals) as mockCalculate:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    createTeam(self, 'Team 2', 4)
+                    self.assertEqual(mockCalculate.call_count, 0)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(mockCalculate.call_count, 1)
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 5 * 50)
+
+    def testNestedAtomicRecalculatedOnce(self):
+        with patch.object(Invoice, 'calculateAndSaveAllTotals', autospec=True, side_effect=Invoice.calculateAndSaveAllTotals) as mockCalculate:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    createTeam(self, 'Team 2', 1)
+                    with transaction.atomic():
+                        createTeam(self, 'Team 3', 2)
+
+        self.assertEqual(mockCalculate.call_count, 1)
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 4 * 50)
+
+    def testRolledBackSavepointStillRecalculatesOuter(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                createTeam(self, 'Team 2', 1)
+                try:
+                    with transaction.atomic():
+                        createTeam(self, 'Team 3', 2)
+                        raise ValueError
+                except ValueError:
+                    pass
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 2 * 50)
+
+    def testRecalculatedAfterFirstSavepointRolledBack(self):
+        # Callback first registered in the rolled back savepoint is discarded, so a new one is needed for the outer block
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        createTeam(self, 'Team 2', 2)
+                        raise ValueError
+                except ValueError:
+                    pass
+                createTeam(self, 'Team 3', 1)
+
+        self.assertEqual(len(callbacks), 1)
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 2 * 50)
+
+    def testNotRecalculatedOnRollback(self):
+        with patch.object(Invoice, 'calculateAndSaveAllTotals', autospec=True, side_effect=Invoice.calculateAndSaveAllTotals) as mockCalculate:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                try:
+                    with transaction.atomic():
+                        createTeam(self, 'Team 2', 4)
+                        raise ValueError
+                except ValueError:
+                    pass
+
+        self.assertEqual(len(callbacks), 0)
+        self.assertEqual(mockCalculate.call_count, 0)
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 1 * 50)
+
+    def testRecalculatedAfterPreviousRollback(self):
+        # Recalculation pending from a rolled back transaction must not stop later recalculation
+        try:
+            with transaction.atomic():
+                createTeam(self, 'Team 2', 4)
+                raise ValueError
+        except ValueError:
+            pass
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                createTeam(self, 'Team 3', 2)
+
+        self.assertEqual(len(callbacks), 1)
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 3 * 50)
+
+    def testMultipleInvoicesRecalculated(self):
+        with self.settings(INVOICE_RECALCULATION_MODE='immediate'):
+            team2 = createTeam(self, 'Team 2', 1)
+            invoice2 = Invoice.objects.create(event=self.state1_openCompetition, school=self.school2_state1, invoiceToUser=self.user_state1_school2_mentor3)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                team2.invoiceOverride = invoice2
+                team2.save()
+
+        self.assertEqual(len(callbacks), 1)
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 1 * 50)
+        invoice2.refresh_from_db()
+        self.assertEqual(invoice2.invoiceAmountInclGST(), 1 * 50)
+
+    def testTeamCreateViewRecalculatesOnce(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_school1_mentor1, password=self.password)
+        payload = {
+            'student_set-TOTAL_FORMS': 2,
+            'student_set-INITIAL_FORMS': 0,
+            'student_set-MIN_NUM_FORMS': 0,
+            'student_set-MAX_NUM_FORMS': 4,
+            'name': 'Team 2',
+            'division': self.division3.id,
+            'hardwarePlatform': HardwarePlatform.objects.create(name='Hardware').id,
+            'softwarePlatform': SoftwarePlatform.objects.create(name='Software').id,
+            'student_set-0-firstName': 'Test',
+            'student_set-0-lastName': 'test',
+            'student_set-0-yearLevel': 5,
+            'student_set-0-gender': 'male',
+            'student_set-1-firstName': 'Test',
+            'student_set-1-lastName': 'test',
+            'student_set-1-yearLevel': 5,
+            'student_set-1-gender': 'male',
+        }
+
+        with patch.object(Invoice, 'calculateAndSaveAllTotals', autospec=True, side_effect=Invoice.calculateAndSaveAllTotals) as mockCalculate:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('teams:create', kwargs={'eventID': self.state1_openCompetition.id}), data=payload)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mockCalculate.call_count, 1)
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 3 * 50)
+
+@override_settings(INVOICE_RECALCULATION_MODE='background')
+class TestBackgroundInvoiceRecalculation(TransactionTestCase):
+    def setUp(self):
+        createStates(self)
+        createUsers(self)
+        createSchools(self)
+        createEvents(self)
+        setStudentBilling(self)
+
+        self.team1 = createTeam(self, 'Team 1', 1)
+        backgroundWorker.waitUntilIdle()
+        self.invoice = Invoice.objects.get(event=self.state1_openCompetition, school=self.school1_state1)
+
+    def testRecalculatedInBackground(self):
+        with transaction.atomic():
+            createTeam(self, 'Team 2', 4)
+
+        backgroundWorker.waitUntilIdle()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 5 * 50)
+
+    def testBatchesCoalesced(self):
+        backgroundWorker.enqueue([self.invoice.pk])
+        backgroundWorker.enqueue([self.invoice.pk])
+        backgroundWorker.waitUntilIdle()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 1 * 50)
+
+    def testOldConnectionsClosedAroundBatch(self):
+        with patch('invoices.recalculation.close_old_connections') as mockClose:
+            backgroundWorker.enqueue([self.invoice.pk])
+            backgroundWorker.waitUntilIdle()
+
+        self.assertEqual(mockClose.call_count, 2)
+
+    def testRecoversAfterConnectionError(self):
+        # A failed batch, such as from a dead connection, must not stop later batches
+        with patch('invoices.recalculation.recalculateInvoices', side_effect=Exception('Connection lost')):
+            backgroundWorker.enqueue([self.invoice.pk])
+            backgroundWorker.waitUntilIdle()
+
+        Invoice.objects.filter(pk=self.invoice.pk).update(cache_invoiceAmountInclGST_unrounded=0)
+        backgroundWorker.enqueue([self.invoice.pk])
+        backgroundWorker.waitUntilIdle()
+
+        self.invoice.refresh_from_db()
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 1 * 50)
@@ -0,0 +1,195 @@
+from common.baseTests import createStates, createUsers, createSchools, createEvents
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from invoices.models import Invoice
+from events.models import Division, AvailableDivision
+from teams.models import Team, Student
+from workshops.models import WorkshopAttendee
+
+def createTeamsAndStudents(self, numberTeams):
+    for i in range(numberTeams):
+        team = Team.objects.create(
+            event=self.state1_openCompetition,
+            division=self.division3 if i % 2 else self.division4,
+            mentorUser=self.user_state1_school1_mentor1,
+            school=self.school1_state1,
+            name=f'Totals Team {i}',
+        )
+        for j in range(3):
+            Student.objects.create(
+                team=team,
+                firstName='First',
+                lastName='Last',
+                yearLevel=5,
+                gender='other',
+            )
+
+class TestCalculateAndSaveAllTotals(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeamsAndStudents(cls, 4)
+
+    def setUp(self):
+        # Load related objects up front so only the recalculation itself is counted
+        self.invoice = Invoice.objects.select_related('event', 'school').get(event=self.state1_openCompetition, school=self.school1_state1)
+
+    def testTotalsCorrect(self):
+        self.invoice.cache_invoiceAmountInclGST_unrounded = None
+        self.invoice.calculateAndSaveAllTotals()
+        self.invoice.refresh_from_db()
+
+        self.assertEqual(self.invoice.totalQuantity(), 4)
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 200)
+        self.assertEqual(self.invoice.invoiceAmountExclGST(), round(200 / 1.1, 2))
+        self.assertEqual(self.invoice.amountGST(), round(200 - 200 / 1.1, 2))
+
+    def testTotalsMatchIndividualCalculations(self):
+        self.invoice.calculateAndSaveAllTotals()
+
+        self.assertEqual(self.invoice.cache_amountGST_unrounded, self.invoice.calculate_amountGST_unrounded())
+        self.assertEqual(self.invoice.cache_totalQuantity, self.invoice.calculate_totalQuantity())
+        self.assertEqual(self.invoice.cache_invoiceAmountExclGST_unrounded, self.invoice.calculate_invoiceAmountExclGST_unrounded())
+        self.assertEqual(self.invoice.cache_invoiceAmountInclGST_unrounded, self.invoice.calculate_invoiceAmountInclGST_unrounded())
+
+    def testInvoiceItemsBuiltOnce(self):
+        # Recalculation should cost one build of the invoice items plus the update
+        with CaptureQueriesContext(connection) as invoiceItemsQueries:
+            self.invoice.invoiceItems()
+
+        with self.assertNumQueries(len(invoiceItemsQueries) + 1):
+            self.invoice.calculateAndSaveAllTotals()
+
+    def testNumQueries(self):
+        with self.assertNumQueries(6):
+            self.invoice.calculateAndSaveAllTotals()
+
+    def testNumQueriesConstantAsDivisionsIncrease(self):
+        with CaptureQueriesContext(connection) as initialQueries:
+            self.invoice.calculateAndSaveAllTotals()
+
+        for i in range(5):
+            division = Division.objects.create(name=f'Totals Division {i}')
+            AvailableDivision.objects.create(event=self.state1_openCompetition, division=division, division_billingType='student', division_entryFee=10)
+            Team.objects.create(
+                event=self.state1_openCompetition,
+                division=division,
+                mentorUser=self.user_state1_school1_mentor1,
+                school=self.school1_state1,
+                name=f'Totals Division Team {i}',
+            )
+
+        with self.assertNumQueries(len(initialQueries)):
+            self.invoice.calculateAndSaveAllTotals()
+
+        self.assertEqual(len(self.invoice.invoiceItems()), 7)
+
+class TestInvoiceItems(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeamsAndStudents(cls, 4)
+
+        cls.invoice = Invoice.objects.get(event=cls.state1_openCompetition, school=cls.school1_state1)
+
+    def testDivisionItems(self):
+        invoiceItems = self.invoice.invoiceItems()
+
+        self.assertEqual([item['name'] for item in invoiceItems], ['Division 3', 'Division 4'])
+        self.assertEqual([item['quantity'] for item in invoiceItems], [2, 2])
+        self.assertEqual([item['unit'] for item in invoiceItems], ['team', 'team'])
+
+    def testDivisionItemsStudentBilling(self):
+        self.availableDivision3_state1_openCompetition.division_billingType = 'student'
+        self.availableDivision3_state1_openCompetition.division_entryFee = 20
+        self.availableDivision3_state1_openCompetition.save()
+
+        invoiceItems = self.invoice.invoiceItems()
+
+        self.assertEqual(invoiceItems[0]['name'], 'Division 3')
+        self.assertEqual(invoiceItems[0]['quantity'], 6)
+        self.assertEqual(invoiceItems[0]['unit'], 'student')
+        self.assertEqual(invoiceItems[0]['totalInclGST'], 120)
+        self.assertEqual(invoiceItems[1]['quantity'], 2)
+        self.assertEqual(invoiceItems[1]['unit'], 'team')
+
+    def testSpecialRateItems(self):
+        self.state1_openCompetition.competition_specialRateNumber = 3
+        self.state1_openCompetition.competition_specialRateFee = 30
+        self.state1_openCompetition.save()
+
+        invoiceItems = self.invoice.invoiceItems()
+
+        self.assertEqual(invoiceItems[0]['name'], 'First 3 teams')
+        self.assertEqual(invoiceItems[0]['quantity'], 3)
+        self.assertEqual(sum(item['quantity'] for item in invoiceItems), 4)
+
+    def testOverrideItems(self):
+        invoice2 = Invoice.objects.create(event=self.state1_openCompetition, school=self.school2_state1, invoiceToUser=self.user_state1_school2_mentor3)
+        team = Team.objects.get(name='Totals Team 1')
+        team.invoiceOverride = invoice2
+        team.save()
+
+        invoiceItems = invoice2.invoiceItems()
+
+        self.assertEqual(len(invoiceItems), 1)
+        self.assertEqual(invoiceItems[0]['name'], 'Other teams - Division 3')
+        self.assertEqual(invoiceItems[0]['description'], 'Totals Team 1 (School 1)')
+        self.assertEqual(invoiceItems[0]['quantity'], 1)
+
+        self.assertEqual(sum(item['quantity'] for item in self.invoice.invoiceItems()), 3)
+
+class TestWorkshopInvoiceItems(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            for attendeeType, number in [('teacher', 1), ('student', 3)]:
+                for i in range(number):
+                    WorkshopAttendee.objects.create(
+                        event=cls.state1_openWorkshop,
+                        mentorUser=cls.user_state1_school1_mentor1,
+                        school=cls.school1_state1,
+                        division=cls.division3,
+                        firstName=f'{attendeeType} {i}',
+                        lastName='Last',
+                        yearLevel='10',
+                        attendeeType=attendeeType,
+                        email='teacher@test.com',
+                        gender='other',
+                    )
+
+        cls.invoice = Invoice.objects.get(event=cls.state1_openWorkshop, school=cls.school1_state1)
+
+    def testAttendeeItems(self):
+        invoiceItems = self.invoice.invoiceItems()
+
+        self.assertEqual([item['name'] for item in invoiceItems], ['Division 3 - teacher', 'Division 3 - student'])
+        self.assertEqual([item['quantity'] for item in invoiceItems], [1, 3])
+        self.assertEqual(self.invoice.invoiceAmountInclGST(), 200)
+
+    def testOverrideAttendeeItems(self):
+        invoice2 = Invoice.objects.create(event=self.state1_openWorkshop, school=self.school2_state1, invoiceToUser=self.user_state1_school2_mentor3)
+        attendee = WorkshopAttendee.objects.get(firstName='teacher 0')
+        attendee.invoiceOverride = invoice2
+        attendee.save()
+
+        invoiceItems = invoice2.invoiceItems()
+
+        self.assertEqual(len(invoiceItems), 1)
+        self.assertEqual(invoiceItems[0]['name'], 'Other attendees - Division 3 - teacher')
+        self.assertEqual(invoiceItems[0]['description'], 'teacher 0 Last (School 1)')
+        self.assertEqual(invoiceItems[0]['quantity'], 1)
@@ -308,8 +308,9 @@ class TestPaypalViewPermissions(TestCase):
         self.state1.save()
 
     def testLoginRequired(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
     
         response = self.client.get(url, follow=True)
@@ -320,8 +321,9 @@ class TestPaypalViewPermissions(TestCase):
         self.assertEqual(response.status_code, 302)
 
     def testSuccessInvoiceToUserMentor(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email1, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -329,8 +331,9 @@ class TestPaypalViewPermissions(TestCase):
         self.assertEqual(response.status_code, 200)
 
     def testDeniedInvoiceToUserMentor(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email2, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -339,9 +342,10 @@ class TestPaypalViewPermissions(TestCase):
         self.assertContains(response, "You do not have permission to view this invoice", status_code=403)
 
     def testSuccessSchoolInvoice(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1, school=self.school1)
-        self.schoolAdmin1 = SchoolAdministrator.objects.create(school=self.school1, user=self.user2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1, school=self.school1)
+            self.schoolAdmin1 = SchoolAdministrator.objects.create(school=self.school1, user=self.user2)
         self.client.login(request=HttpRequest(), username=self.email2, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -349,9 +353,10 @@ class TestPaypalViewPermissions(TestCase):
         self.assertEqual(response.status_code, 200)
 
     def testDeniedSchoolInvoice(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1, school=self.school1)
-        self.schoolAdmin1 = SchoolAdministrator.objects.create(school=self.school1, user=self.user2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1, school=self.school1)
+            self.schoolAdmin1 = SchoolAdministrator.objects.create(school=self.school1, user=self.user2)
         self.client.login(request=HttpRequest(), username=self.email3, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -360,9 +365,10 @@ class TestPaypalViewPermissions(TestCase):
         self.assertContains(response, "You do not have permission to view this invoice", status_code=403)
 
     def testDeniedCoordinator(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
-        self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state1, permissionLevel='viewall')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+            self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state1, permissionLevel='viewall')
         self.client.login(request=HttpRequest(), username=self.email2, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -371,8 +377,9 @@ class TestPaypalViewPermissions(TestCase):
         self.assertContains(response, "You do not have permission to view this invoice", status_code=403)     
 
     def testDeniedSuperUser(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email_superUser, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -381,9 +388,10 @@ class TestPaypalViewPermissions(TestCase):
         self.assertContains(response, "You do not have permission to view this invoice", status_code=403)   
 
     def testDeniedCoordinator_NotCoordinator(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
-        self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state1, permissionLevel='viewall')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+            self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state1, permissionLevel='viewall')
         self.client.login(request=HttpRequest(), username=self.email3, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -392,9 +400,10 @@ class TestPaypalViewPermissions(TestCase):
         self.assertContains(response, "You do not have permission to view this invoice", status_code=403)   
 
     def testDeniedCoordinator_WrongState(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
-        self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state2, permissionLevel='viewall')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+            self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state2, permissionLevel='viewall')
         self.client.login(request=HttpRequest(), username=self.email2, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -403,9 +412,10 @@ class TestPaypalViewPermissions(TestCase):
         self.assertContains(response, "You do not have permission to view this invoice", status_code=403)
 
     def testDeniedCoordinator_WrongPermissionLevel(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
-        self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state1, permissionLevel='schoolmanager')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+            self.coordinator = Coordinator.objects.create(user=self.user2, state=self.state1, permissionLevel='schoolmanager')
         self.client.login(request=HttpRequest(), username=self.email2, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -426,8 +436,9 @@ class TestPaypalView(TestCase):
         self.state1.save()
 
     def testMentorSetsInvoicedDate_noDate(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email1, password=self.password)
 
         self.invoice.refresh_from_db()
@@ -441,8 +452,9 @@ class TestPaypalView(TestCase):
         self.assertEqual(self.invoice.invoicedDate, datetime.datetime.today().date())
 
     def testMentorSetsInvoicedDate_futureDate(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, invoicedDate=datetime.datetime.now() + datetime.timedelta(days=10))
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, invoicedDate=datetime.datetime.now() + datetime.timedelta(days=10))
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email1, password=self.password)
 
         self.invoice.refresh_from_db()
@@ -471,8 +483,9 @@ class TestPaypalView(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), 0)
 
     def testDontOverwritePastDate(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, invoicedDate=datetime.datetime.now() + datetime.timedelta(days=-10))
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, invoicedDate=datetime.datetime.now() + datetime.timedelta(days=-10))
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email1, password=self.password)
 
         self.invoice.refresh_from_db()
@@ -486,8 +499,9 @@ class TestPaypalView(TestCase):
         self.assertEqual(self.invoice.invoicedDate, (datetime.datetime.now() + datetime.timedelta(days=-10)).date())
 
     def testUsesCorrectTemplate(self):
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email1, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -499,8 +513,9 @@ class TestPaypalView(TestCase):
         self.state1.paypalEmail = ''
         self.state1.save()
 
-        self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
-        self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
+            self.team1 = Team.objects.create(event=self.event, mentorUser=self.user1, name='Team 1', division=self.division1)
         self.client.login(request=HttpRequest(), username=self.email1, password=self.password)
 
         url = reverse('invoices:paypal', kwargs= {'invoiceID':self.invoice.id})
@@ -999,8 +1014,10 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
     @classmethod
     def setUpTestData(cls):
         commonSetUp(cls)
-        createTeams(cls, cls.school1)
-        createStudents(cls)
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createTeams(cls, cls.school1)
+            createStudents(cls)
         cls.invoice = Invoice.objects.get(event=cls.event, school=cls.school1)
         cls.invoice2 = Invoice.objects.create(event=cls.event, school=cls.school2, invoiceToUser=cls.user2)
         cls.invoice3 = Invoice.objects.create(event=cls.event, school=cls.school3, invoiceToUser=cls.user3)
@@ -1015,9 +1032,10 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), round(12 * 50, 2))
 
     def testSurchage(self):
-        self.event.eventSurchargeAmount = 11
-        self.event.save()
-        self.invoice.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.eventSurchargeAmount = 11
+            self.event.save()
+            self.invoice.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50 + 12 * 11, 2))
@@ -1030,26 +1048,29 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
     def testAddTeam(self):
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
 
-        Team.objects.create(
-            event=self.event,
-            school=self.school1,
-            mentorUser=self.user1,
-            name='New Team',
-            division=self.division1,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Team.objects.create(
+                event=self.event,
+                school=self.school1,
+                mentorUser=self.user1,
+                name='New Team',
+                division=self.division1,
+            )
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(13 * 50, 2))
 
     def testDeleteTeam(self):
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
-        self.teams[1].delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[1].delete()
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(11 * 50, 2))
 
     def testDefaultRateTeamExclGST(self):
-        self.event.entryFeeIncludesGST = False
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.entryFeeIncludesGST = False
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountExclGST(), round(12 * 50, 2))
@@ -1060,11 +1081,12 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), round((12 * 50) * 1.1, 2))
 
     def testAmountPaid(self):
-        InvoicePayment.objects.create(
-            invoice=self.invoice,
-            amountPaid=200,
-            datePaid=datetime.datetime.today(),
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoicePayment.objects.create(
+                invoice=self.invoice,
+                amountPaid=200,
+                datePaid=datetime.datetime.today(),
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
@@ -1075,11 +1097,12 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), round(12 * 50 - 200))
 
     def testAmountDueNotNegative(self):
-        InvoicePayment.objects.create(
-            invoice=self.invoice,
-            amountPaid=20000,
-            datePaid=datetime.datetime.today(),
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoicePayment.objects.create(
+                invoice=self.invoice,
+                amountPaid=20000,
+                datePaid=datetime.datetime.today(),
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
@@ -1090,46 +1113,52 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), 0)
 
     def testDefaultRateStudent(self):
-        self.event.competition_billingType = 'student'
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_billingType = 'student'
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(36 * 50, 2))
 
     def testAddStudent(self):
-        self.event.competition_billingType = 'student'
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_billingType = 'student'
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(36 * 50, 2))
 
-        self.newStudent = Student.objects.create(
-            team=self.teams[0],
-            firstName='First name',
-            lastName='Last name',
-            yearLevel=5,
-            gender='other',
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.newStudent = Student.objects.create(
+                team=self.teams[0],
+                firstName='First name',
+                lastName='Last name',
+                yearLevel=5,
+                gender='other',
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(37 * 50, 2))
 
     def testDeleteStudent(self):
-        self.event.competition_billingType = 'student'
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_billingType = 'student'
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(36 * 50, 2))
 
-        self.students[0].delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].delete()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(35 * 50, 2))
 
     def testSpecialRateInclGST(self):
-        self.event.competition_specialRateNumber = 4
-        self.event.competition_specialRateFee = 30
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_specialRateNumber = 4
+            self.event.competition_specialRateFee = 30
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50 - 80, 2))
@@ -1137,9 +1166,10 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
     def testSpecialRateExclGST(self):
         self.event.entryFeeIncludesGST = False
 
-        self.event.competition_specialRateNumber = 4
-        self.event.competition_specialRateFee = 30
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_specialRateNumber = 4
+            self.event.competition_specialRateFee = 30
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountExclGST(), round(12 * 50 - 80, 2))
@@ -1147,39 +1177,43 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round((12 * 50 - 80)*1.1, 2))
 
     def testAvailableDivisionRateTeam(self):
-        AvailableDivision.objects.create(
-            division=self.division1,
-            event=self.event,
-            division_billingType='team',
-            division_entryFee=80,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableDivision.objects.create(
+                division=self.division1,
+                event=self.event,
+                division_billingType='team',
+                division_entryFee=80,
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50 + 120, 2))
 
     def testDeleteAvailableDivision(self):
-        self.availableDivision = AvailableDivision.objects.create(
-            division=self.division1,
-            event=self.event,
-            division_billingType='team',
-            division_entryFee=80,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.availableDivision = AvailableDivision.objects.create(
+                division=self.division1,
+                event=self.event,
+                division_billingType='team',
+                division_entryFee=80,
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50 + 120, 2))
 
-        self.availableDivision.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.availableDivision.delete()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
 
     def testAvailableDivisionRateStudent(self):
-        AvailableDivision.objects.create(
-            division=self.division1,
-            event=self.event,
-            division_billingType='student',
-            division_entryFee=80,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableDivision.objects.create(
+                division=self.division1,
+                event=self.event,
+                division_billingType='student',
+                division_entryFee=80,
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), 1360)
@@ -1190,8 +1224,9 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(0 * 50, 2))
 
-        self.teams[0].school = self.school2
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].school = self.school2
+            self.teams[0].save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(11 * 50, 2))
@@ -1204,8 +1239,9 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(0 * 50, 2))
 
-        self.teams[0].invoiceOverride = self.invoice2
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].invoiceOverride = self.invoice2
+            self.teams[0].save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(11 * 50, 2))
@@ -1213,16 +1249,18 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(1 * 50, 2))
 
     def testChangeInvoiceOverride(self):
-        self.teams[0].invoiceOverride = self.invoice2
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].invoiceOverride = self.invoice2
+            self.teams[0].save()
 
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(1 * 50, 2))
         self.invoice3.refresh_from_db()
         self.assertEqual(self.invoice3.invoiceAmountInclGST(), round(0 * 50, 2))
 
-        self.teams[0].invoiceOverride = self.invoice3
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].invoiceOverride = self.invoice3
+            self.teams[0].save()
 
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(0 * 50, 2))
@@ -1231,16 +1269,18 @@ class TestInvoiceCalculations_NoCampuses(TestCase):
 
 
     def testRemoveInvoiceOverride(self):
-        self.teams[0].invoiceOverride = self.invoice2
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].invoiceOverride = self.invoice2
+            self.teams[0].save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(11 * 50, 2))
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(1 * 50, 2))
 
-        self.teams[0].invoiceOverride = None
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].invoiceOverride = None
+            self.teams[0].save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
@@ -1258,69 +1298,78 @@ class TestInvoiceCalculations_Campuses(TestCase):
     def setUpTestData(cls):
         commonSetUp(cls)
         createCammpuses(cls)
-        createTeams(cls, cls.school1, campuses = cls.campuses)
-        createStudents(cls)
-        cls.campus1 = cls.campuses[0]
-        cls.invoice = Invoice.objects.create(event=cls.event, school=cls.school1, campus=cls.campus1, invoiceToUser=cls.user1)
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createTeams(cls, cls.school1, campuses = cls.campuses)
+            createStudents(cls)
+            cls.campus1 = cls.campuses[0]
+            cls.invoice = Invoice.objects.create(event=cls.event, school=cls.school1, campus=cls.campus1, invoiceToUser=cls.user1)
     
     def testDefaultRateTeam(self):
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(6 * 50, 2))
 
     def testSurchage(self):
-        self.event.eventSurchargeAmount = 11
-        self.event.save()
-        self.invoice.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.eventSurchargeAmount = 11
+            self.event.save()
+            self.invoice.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(6 * 50 + 6 * 11, 2))
 
     def testDefaultRateStudent(self):
-        self.event.competition_billingType = 'student'
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_billingType = 'student'
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(18 * 50, 2))
 
     def testChangeStudentTeam(self):
-        self.event.competition_billingType = 'student'
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_billingType = 'student'
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(18 * 50, 2))
 
-        self.students[0].team = self.teams[1]
-        self.students[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.students[0].team = self.teams[1]
+            self.students[0].save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(17 * 50, 2))
 
     def testSpecialRate(self):
-        self.event.competition_specialRateNumber = 4
-        self.event.competition_specialRateFee = 30
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_specialRateNumber = 4
+            self.event.competition_specialRateFee = 30
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(6 * 50 - 40, 2))
 
     def testAvailableDivisionRateTeam(self):
-        AvailableDivision.objects.create(
-            division=self.division1,
-            event=self.event,
-            division_billingType='team',
-            division_entryFee=80,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableDivision.objects.create(
+                division=self.division1,
+                event=self.event,
+                division_billingType='team',
+                division_entryFee=80,
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(6 * 50 + 60, 2))
 
     def testAvailableDivisionRateStudent(self):
-        AvailableDivision.objects.create(
-            division=self.division1,
-            event=self.event,
-            division_billingType='student',
-            division_entryFee=80,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableDivision.objects.create(
+                division=self.division1,
+                event=self.event,
+                division_billingType='student',
+                division_entryFee=80,
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), 680)
@@ -1329,8 +1378,9 @@ class TestInvoiceCalculations_Campuses(TestCase):
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(6 * 50, 2))
 
-        self.teams[0].campus = self.campuses[1]
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].campus = self.campuses[1]
+            self.teams[0].save()
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(5 * 50, 2))
 
@@ -1344,8 +1394,10 @@ class TestInvoiceCalculations_Independent(TestCase):
     @classmethod
     def setUpTestData(cls):
         commonSetUp(cls)
-        createTeams(cls, None)
-        createStudents(cls)
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createTeams(cls, None)
+            createStudents(cls)
         cls.invoice = Invoice.objects.get(event=cls.event, invoiceToUser=cls.user1)
     
     def testDefaultRateTeam(self):
@@ -1353,46 +1405,51 @@ class TestInvoiceCalculations_Independent(TestCase):
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
 
     def testSurchage(self):
-        self.event.eventSurchargeAmount = 11
-        self.event.save()
-        self.invoice.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.eventSurchargeAmount = 11
+            self.event.save()
+            self.invoice.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50 + 12 * 11, 2))
 
     def testDefaultRateStudent(self):
-        self.event.competition_billingType = 'student'
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_billingType = 'student'
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(36 * 50, 2))
 
     def testSpecialRate(self):
-        self.event.competition_specialRateNumber = 4
-        self.event.competition_specialRateFee = 30
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.competition_specialRateNumber = 4
+            self.event.competition_specialRateFee = 30
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50 - 80, 2))
 
     def testAvailableDivisionRateTeam(self):
-        AvailableDivision.objects.create(
-            division=self.division1,
-            event=self.event,
-            division_billingType='team',
-            division_entryFee=80,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableDivision.objects.create(
+                division=self.division1,
+                event=self.event,
+                division_billingType='team',
+                division_entryFee=80,
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50 + 120, 2))
 
     def testAvailableDivisionRateStudent(self):
-        AvailableDivision.objects.create(
-            division=self.division1,
-            event=self.event,
-            division_billingType='student',
-            division_entryFee=80,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailableDivision.objects.create(
+                division=self.division1,
+                event=self.event,
+                division_billingType='student',
+                division_entryFee=80,
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), 1360)
@@ -1401,8 +1458,9 @@ class TestInvoiceCalculations_Independent(TestCase):
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(12 * 50, 2))
 
-        self.teams[0].mentorUser = self.user2
-        self.teams[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teams[0].mentorUser = self.user2
+            self.teams[0].save()
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(11 * 50, 2))
 
@@ -1416,46 +1474,48 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
     @classmethod
     def setUpTestData(cls):
         commonSetUp(cls)
-        cls.event = Event.objects.create(
-            year=cls.year,
-            state=cls.state1,
-            name='Workshop Event',
-            eventType='workshop',
-            status='published',
-            maxMembersPerTeam=5,
-            entryFeeIncludesGST=True,
-            competition_billingType='team',
-            competition_defaultEntryFee = 35,
-            startDate=(datetime.datetime.now() + datetime.timedelta(days=5)).date(),
-            endDate = (datetime.datetime.now() + datetime.timedelta(days=5)).date(),
-            registrationsOpenDate = (datetime.datetime.now() + datetime.timedelta(days=-10)).date(),
-            registrationsCloseDate = (datetime.datetime.now() + datetime.timedelta(days=1)).date(),
-            directEnquiriesTo = cls.user1,
-        )
-        cls.attendee1 = WorkshopAttendee.objects.create(
-            event=cls.event,
-            school=cls.school1,
-            mentorUser=cls.user1,
-            division=cls.division1,
-            attendeeType='student',
-            firstName='Name 1',
-            lastName='Last 1',
-            yearLevel='5',
-            gender='other',
-            email='test@test.com'
-        )
-        cls.attendee2 = WorkshopAttendee.objects.create(
-            event=cls.event,
-            school=cls.school1,
-            mentorUser=cls.user1,
-            division=cls.division1,
-            attendeeType='teacher',
-            firstName='Name 2',
-            lastName='Last 2',
-            yearLevel='5',
-            gender='other',
-            email='test@test.com'
-        )
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.event = Event.objects.create(
+                year=cls.year,
+                state=cls.state1,
+                name='Workshop Event',
+                eventType='workshop',
+                status='published',
+                maxMembersPerTeam=5,
+                entryFeeIncludesGST=True,
+                competition_billingType='team',
+                competition_defaultEntryFee = 35,
+                startDate=(datetime.datetime.now() + datetime.timedelta(days=5)).date(),
+                endDate = (datetime.datetime.now() + datetime.timedelta(days=5)).date(),
+                registrationsOpenDate = (datetime.datetime.now() + datetime.timedelta(days=-10)).date(),
+                registrationsCloseDate = (datetime.datetime.now() + datetime.timedelta(days=1)).date(),
+                directEnquiriesTo = cls.user1,
+            )
+            cls.attendee1 = WorkshopAttendee.objects.create(
+                event=cls.event,
+                school=cls.school1,
+                mentorUser=cls.user1,
+                division=cls.division1,
+                attendeeType='student',
+                firstName='Name 1',
+                lastName='Last 1',
+                yearLevel='5',
+                gender='other',
+                email='test@test.com'
+            )
+            cls.attendee2 = WorkshopAttendee.objects.create(
+                event=cls.event,
+                school=cls.school1,
+                mentorUser=cls.user1,
+                division=cls.division1,
+                attendeeType='teacher',
+                firstName='Name 2',
+                lastName='Last 2',
+                yearLevel='5',
+                gender='other',
+                email='test@test.com'
+            )
         cls.invoice = Invoice.objects.get(event=cls.event, school=cls.school1)
         cls.invoice2 = Invoice.objects.create(event=cls.event, school=cls.school2, invoiceToUser=cls.user2)
         cls.invoice3 = Invoice.objects.create(event=cls.event, school=cls.school3, invoiceToUser=cls.user3)
@@ -1470,9 +1530,10 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), round(2 * 35, 2))
 
     def testSurchage(self):
-        self.event.eventSurchargeAmount = 11
-        self.event.save()
-        self.invoice.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.eventSurchargeAmount = 11
+            self.event.save()
+            self.invoice.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(2 * 35 + 2 * 11, 2))
@@ -1480,31 +1541,34 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
     def testAddAttendee(self):
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(2 * 35, 2))
 
-        WorkshopAttendee.objects.create(
-            event=self.event,
-            school=self.school1,
-            mentorUser=self.user1,
-            division=self.division1,
-            attendeeType='student',
-            firstName='Name 2',
-            lastName='Last 2',
-            yearLevel='5',
-            gender='other',
-            email='test@test.com'
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkshopAttendee.objects.create(
+                event=self.event,
+                school=self.school1,
+                mentorUser=self.user1,
+                division=self.division1,
+                attendeeType='student',
+                firstName='Name 2',
+                lastName='Last 2',
+                yearLevel='5',
+                gender='other',
+                email='test@test.com'
+            )
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(3 * 35, 2))
 
     def testDeleteAttendee(self):
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(2 * 35, 2))
-        self.attendee1.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee1.delete()
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(1 * 35, 2))
 
     def testDefaultRateTeamExclGST(self):
-        self.event.entryFeeIncludesGST = False
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.entryFeeIncludesGST = False
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountExclGST(), round(2 * 35, 2))
@@ -1515,9 +1579,10 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), round((2 * 35) * 1.1, 2))
 
     def testDifferentRates(self):
-        self.event.workshopTeacherEntryFee = 2
-        self.event.workshopStudentEntryFee = 15
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.workshopTeacherEntryFee = 2
+            self.event.workshopStudentEntryFee = 15
+            self.event.save()
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(17, 2))
@@ -1528,11 +1593,12 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
         self.assertEqual(self.invoice.amountDueInclGST(), round(17, 2))
 
     def testAmountPaid(self):
-        InvoicePayment.objects.create(
-            invoice=self.invoice,
-            amountPaid=50,
-            datePaid=datetime.datetime.today(),
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoicePayment.objects.create(
+                invoice=self.invoice,
+                amountPaid=50,
+                datePaid=datetime.datetime.today(),
+            )
         self.invoice.refresh_from_db()
 
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(2 * 35, 2))
@@ -1548,8 +1614,9 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(0 * 35, 2))
 
-        self.attendee1.school = self.school2
-        self.attendee1.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee1.school = self.school2
+            self.attendee1.save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(1 * 35, 2))
@@ -1562,8 +1629,9 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(0 * 35, 2))
 
-        self.attendee1.invoiceOverride = self.invoice2
-        self.attendee1.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee1.invoiceOverride = self.invoice2
+            self.attendee1.save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(1 * 35, 2))
@@ -1571,16 +1639,18 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(1 * 35, 2))
 
     def testChangeInvoiceOverride(self):
-        self.attendee1.invoiceOverride = self.invoice2
-        self.attendee1.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee1.invoiceOverride = self.invoice2
+            self.attendee1.save()
 
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(1 * 35, 2))
         self.invoice3.refresh_from_db()
         self.assertEqual(self.invoice3.invoiceAmountInclGST(), round(0 * 35, 2))
 
-        self.attendee1.invoiceOverride = self.invoice3
-        self.attendee1.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee1.invoiceOverride = self.invoice3
+            self.attendee1.save()
 
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(0 * 35, 2))
@@ -1589,16 +1659,18 @@ class TestInvoiceCalculations_NoCampuses_Workshop(TestCase):
 
 
     def testRemoveInvoiceOverride(self):
-        self.attendee1.invoiceOverride = self.invoice2
-        self.attendee1.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee1.invoiceOverride = self.invoice2
+            self.attendee1.save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(1 * 35, 2))
         self.invoice2.refresh_from_db()
         self.assertEqual(self.invoice2.invoiceAmountInclGST(), round(1 * 35, 2))
 
-        self.attendee1.invoiceOverride = None
-        self.attendee1.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.attendee1.invoiceOverride = None
+            self.attendee1.save()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), round(2 * 35, 2))
@@ -1659,8 +1731,9 @@ class TestInvoiceMethods(TestCase):
     def testDeleteUpdatesOtherInvoices(self):
         self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
 
-        self.team1 = Team.objects.create(event=self.event, school=self.school1, campus=self.campuses[0], mentorUser=self.user3, name='Team 1', division=self.division1)
-        self.team2 = Team.objects.create(event=self.event, school=self.school1, campus=self.campuses[1], mentorUser=self.user3, name='Team 2', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team1 = Team.objects.create(event=self.event, school=self.school1, campus=self.campuses[0], mentorUser=self.user3, name='Team 1', division=self.division1)
+            self.team2 = Team.objects.create(event=self.event, school=self.school1, campus=self.campuses[1], mentorUser=self.user3, name='Team 2', division=self.division1)
 
         self.invoice1 = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1, campus=self.campuses[0])
         self.invoice2 = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1, campus=self.campuses[1])
@@ -1668,14 +1741,16 @@ class TestInvoiceMethods(TestCase):
         self.invoice.calculateAndSaveAllTotals()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), 0)
 
-        self.invoice1.delete()
-        self.invoice2.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice1.delete()
+            self.invoice2.delete()
 
         self.invoice.refresh_from_db()
         self.assertEqual(self.invoice.invoiceAmountInclGST(), 100)
 
     def baseTestTotalsNone(self, field, value):
-        self.team1 = Team.objects.create(event=self.event, school=self.school1, mentorUser=self.user3, name='Team 1', division=self.division1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.team1 = Team.objects.create(event=self.event, school=self.school1, mentorUser=self.user3, name='Team 1', division=self.division1)
         self.invoice = Invoice.objects.get(event=self.event, school=self.school1)
         self.invoice.cache_amountGST_unrounded = None
         self.invoice.cache_totalQuantity = None
@@ -1712,15 +1787,17 @@ class TestInvoiceMethods(TestCase):
         self.baseTestTotalsNone('invoiceAmountInclGST', 50)
 
     def test_preSave_setsInvoicedDate_noDate(self):
-        self.event.paymentDueDate = (datetime.datetime.now() + datetime.timedelta(days=5)).date()
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.paymentDueDate = (datetime.datetime.now() + datetime.timedelta(days=5)).date()
+            self.event.save()
 
         self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1)
         self.assertEqual(self.invoice.invoicedDate, self.event.paymentDueDate)
 
     def test_preSave_setsInvoicedDate_existingDate(self):
-        self.event.paymentDueDate = (datetime.datetime.now() + datetime.timedelta(days=5)).date()
-        self.event.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.paymentDueDate = (datetime.datetime.now() + datetime.timedelta(days=5)).date()
+            self.event.save()
 
         self.invoice = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, invoicedDate=(datetime.datetime.now() + datetime.timedelta(days=1)).date())
         self.assertEqual(self.invoice.invoicedDate, (datetime.datetime.now() + datetime.timedelta(days=1)).date())
@@ -1841,22 +1918,24 @@ class TestAmountDueFilter(TestCase):
     def setUp(self):
         commonSetUp(self)
         self.client.login(request=HttpRequest(), username=self.email_superUser, password=self.password)
-        self.invoice1 = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
-        self.invoice2 = Invoice.objects.create(event=self.event, invoiceToUser=self.user2, school=self.school2)
-        Team.objects.create(
-            event=self.event,
-            school=self.school1,
-            mentorUser=self.user1,
-            name='New Team',
-            division=self.division1,
-        )
-        Team.objects.create(
-            event=self.event,
-            school=self.school2,
-            mentorUser=self.user2,
-            name='New Team 2',
-            division=self.division1,
-        )
+        # Run the invoice recalculation that would happen when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice1 = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
+            self.invoice2 = Invoice.objects.create(event=self.event, invoiceToUser=self.user2, school=self.school2)
+            Team.objects.create(
+                event=self.event,
+                school=self.school1,
+                mentorUser=self.user1,
+                name='New Team',
+                division=self.division1,
+            )
+            Team.objects.create(
+                event=self.event,
+                school=self.school2,
+                mentorUser=self.user2,
+                name='New Team 2',
+                division=self.division1,
+            )
 
     def testNotFiltered(self):
         response = self.client.get(reverse(f'admin:invoices_invoice_changelist'))
@@ -1871,12 +1950,14 @@ class TestAmountDueFilter(TestCase):
         self.assertContains(response, f'2 Invoices')
 
     def testNotPaid_invoiceFullyPaid(self):
-        InvoicePayment.objects.create(invoice=self.invoice1, amountPaid=50, datePaid=datetime.datetime.now().date())
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoicePayment.objects.create(invoice=self.invoice1, amountPaid=50, datePaid=datetime.datetime.now().date())
         response = self.client.get(reverse(f'admin:invoices_invoice_changelist')+"?amountDueStatus=True")
         self.assertContains(response, f'1 Invoice')
 
     def testNotPaid_invoicePartiallyPaid(self):
-        InvoicePayment.objects.create(invoice=self.invoice1, amountPaid=5, datePaid=datetime.datetime.now().date())
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoicePayment.objects.create(invoice=self.invoice1, amountPaid=5, datePaid=datetime.datetime.now().date())
         response = self.client.get(reverse(f'admin:invoices_invoice_changelist')+"?amountDueStatus=True")
         self.assertContains(response, f'0 Invoices')
 
@@ -1890,16 +1971,18 @@ class TestInvoiceAmountFilter(TestCase):
     def setUp(self):
         commonSetUp(self)
         self.client.login(request=HttpRequest(), username=self.email_superUser, password=self.password)
-        self.invoice1 = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
-        self.invoice2 = Invoice.objects.create(event=self.event, invoiceToUser=self.user2, school=self.school2)
-        self.invoice2 = Invoice.objects.create(event=self.event, invoiceToUser=self.user3, school=self.school3)
-        Team.objects.create(
-            event=self.event,
-            school=self.school1,
-            mentorUser=self.user1,
-            name='New Team',
-            division=self.division1,
-        )
+        # Run the invoice recalculation that would happen when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.invoice1 = Invoice.objects.create(event=self.event, invoiceToUser=self.user1, school=self.school1)
+            self.invoice2 = Invoice.objects.create(event=self.event, invoiceToUser=self.user2, school=self.school2)
+            self.invoice2 = Invoice.objects.create(event=self.event, invoiceToUser=self.user3, school=self.school3)
+            Team.objects.create(
+                event=self.event,
+                school=self.school1,
+                mentorUser=self.user1,
+                name='New Team',
+                division=self.division1,
+            )
 
     def testDefault(self):
         response = self.client.get(reverse(f'admin:invoices_invoice_changelist'))
@@ -1,5 +1,5 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404
 from django.template import loader
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError, PermissionDenied
@@ -15,7 +15,7 @@ from schools.models import Campus
 
 @login_required
 def summary(request):
-    invoices = Invoice.invoicesForUser(request.user).prefetch_related('invoicepayment_set', 'school', 'campus', 'invoiceToUser', 'event__year', 'event__state')
+    invoices = Invoice.invoicesForUser(request.user).withAmountDue().prefetch_related('school', 'campus', 'invoiceToUser', 'event__year', 'event__state')
 
     context = {
         'invoices': invoices,
@@ -39,7 +39,9 @@ def updateInvoicedDate(invoice, mentor):
 def details(request, invoiceID):
     # Get invoice
     invoice = get_object_or_404(Invoice, pk=invoiceID)
-    invoiceSettings = get_object_or_404(InvoiceGlobalSettings)
+    invoiceSettings = InvoiceGlobalSettings.getCached()
+    if invoiceSettings is None:
+        raise Http404("Invoice settings not found")
 
     # Check permissions
     mentor = mentorInvoicePermissions(request, invoice)
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class PublicapiConfig(AppConfig):
+    name = 'publicapi'
+    def ready(self):
+        import publicapi.signals
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+import datetime
+import functools
+import hashlib
+import json
+
+from common.cacheVersions import currentVersion, bumpVersion
+
+# Response cache for the public events endpoints
+# The website polls these endpoints, but the data only changes when a coordinator edits an event
+# The cache key includes a version that is bumped when any model in the responses is saved or deleted, see signals.py
+# ETags are sent even without a shared cache, so clients still get 304 Not Modified responses
+
+cacheVersionKey = 'publicapi:version'
+
+def invalidateCache():
+    bumpVersion(cacheVersionKey)
+
+def responseCacheKey(viewset, request, actionName, abbreviation):
+    # Only the parameters the actions use, so other parameters such as a cache busting timestamp get the same cached response
+    # The scheme and host are used in registration and pagination links, upcoming and past events depend on the current date
+    keyParts = [
+        abbreviation.lower(),
+        actionName,
+        str(bool(request.GET.get('includeGlobal', False))),
+        request.GET.get(viewset.paginator.page_query_param, ''),
+        request.build_absolute_uri('/'),
+        datetime.date.today().isoformat(),
+    ]
+    keyHash = hashlib.sha256('|'.join(keyParts).encode()).hexdigest()
+    return f'publicapi:{currentVersion(cacheVersionKey)}:{keyHash}'
+
+def etagMatches(request, etag):
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    return etag in etags or '*' in etags
+
+def cachedResponse(actionMethod):
+    # Cache the serialized data and headers of the action, and respond with 304 Not Modified if the client already has them
+    @functools.wraps(actionMethod)
+    def wrapper(self, request, abbreviation=None):
+        if settings.CACHE_SHARED:
+            key = responseCacheKey(self, request, actionMethod.__name__, abbreviation)
+            cached = cache.get(key)
+        else:
+            cached = None
+
+        if cached is None:
+            response = actionMethod(self, request, abbreviation=abbreviation)
+
+            # Stored as json so the cached data doesn't hold the serializer
+            content = json.dumps(response.data, cls=JSONEncoder, sort_keys=True)
+            cached = {
+                'content': content,
+                'hash': hashlib.sha256(content.encode()).hexdigest(),
+                'headers': {name: value for name, value in response.items() if name == 'Link'},
+            }
+            if settings.CACHE_SHARED:
+                cache.set(key, cached, settings.PUBLIC_API_CACHE_TIMEOUT)
+
+        # Strong etag for each representation of the data
+        etag = f'"{cached["hash"]}-{request.accepted_renderer.format}"'
+
+        if etagMatches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        return Response(json.loads(cached['content']), headers={**cached['headers'], 'ETag': etag})
+
+    return wrapper
@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .serializers import EventSerializer, withRelated
+
+from events.models import Event, DeletedEvent
+
+import base64
+import datetime
+
+# Public API changes feed
+# Changes are ordered by (modified time, event id), and the cursor is the position of the last change returned
+# Keyset pagination on the (updatedDateTime, id) index, so each page costs the same however many events there are
+
+def encodeCursor(changedDateTime, eventID):
+    return base64.urlsafe_b64encode(f'{changedDateTime.isoformat()}|{eventID}'.encode()).decode()
+
+# Raises ValueError if the cursor isn't valid
+def decodeCursor(cursor):
+    try:
+        changedDateTime, eventID = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        changedDateTime = datetime.datetime.fromisoformat(changedDateTime)
+        eventID = int(eventID)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+    if timezone.is_naive(changedDateTime):
+        raise ValueError('Invalid cursor')
+
+    return changedDateTime, eventID
+
+def afterCursorFilter(dateTimeField, idField, cursor):
+    if cursor is None:
+        return Q()
+
+    changedDateTime, eventID = cursor
+    return Q(**{f'{dateTimeField}__gt': changedDateTime}) | Q(**{dateTimeField: changedDateTime, f'{idField}__gt': eventID})
+
+def getChanges(request, stateFilter, visibleEvents, cursor, limit):
+    # Returns dict of changes after the cursor, the cursor for the next request, and whether there are more changes
+    # stateFilter selects the events and tombstones for the endpoint's state, so other states' event IDs aren't returned
+    # visibleEvents is the events queryset for the endpoint, changes for events not in it are returned as tombstones
+
+    # Changes in the last few seconds are left for the next request, so a transaction that commits late can't be skipped over
+    settledBefore = timezone.now() - datetime.timedelta(seconds=settings.PUBLIC_API_CHANGES_DELAY)
+
+    # Events never shown on the website have nothing for clients to remove
+    changedEvents = Event.objects.filter(stateFilter, afterCursorFilter('updatedDateTime', 'id', cursor), shownOnWebsite=True, updatedDateTime__lte=settledBefore)
+    changedEvents = changedEvents.order_by('updatedDateTime', 'id').values_list('updatedDateTime', 'id')[:limit + 1]
+
+    deletedEvents = DeletedEvent.objects.filter(stateFilter, afterCursorFilter('deletedDateTime', 'eventID', cursor), deletedDateTime__lte=settledBefore)
+    deletedEvents = deletedEvents.order_by('deletedDateTime', 'eventID').values_list('deletedDateTime', 'eventID')[:limit + 1]
+
+    # Merge the two ordered lists
+    allChanges = [(changedDateTime, eventID) for changedDateTime, eventID in changedEvents]
+    allChanges += [(deletedDateTime, eventID) for deletedDateTime, eventID in deletedEvents]
+    allChanges.sort()
+    changes = allChanges[:limit]
+
+    changedIDs = [eventID for changedDateTime, eventID in changes]
+    events = withRelated(visibleEvents.filter(pk__in=changedIDs), EventSerializer).in_bulk()
+    serializedEvents = EventSerializer(list(events.values()), many=True, context={'request': request}).data
+    serializedEvents = {eventData['id']: eventData for eventData in serializedEvents}
+
+    # The current event is returned if still visible, so a tombstone for a previous state can't remove an event also shown in its new state
+    results = []
+    for changedDateTime, eventID in changes:
+        if eventID in serializedEvents:
+            results.append({'id': eventID, 'deleted': False, 'event': serializedEvents[eventID]})
+        else:
+            # Deleted, unpublished or no longer shown for this state
+            results.append({'id': eventID, 'deleted': True})
+
+    if changes:
+        nextCursor = encodeCursor(*changes[-1])
+    elif cursor is not None:
+        nextCursor = encodeCursor(*cursor)
+    else:
+        nextCursor = None
+
+    return {
+        'changes': results,
+        'cursor': nextCursor,
+        'more': len(allChanges) > limit,
+    }
@@ -2,8 +2,52 @@ from rest_framework import serializers
 
 from regions.models import State
 from events.models import Event, AvailableDivision, Venue
+from invoices.models import InvoiceGlobalSettings
 from users.models import User
 
+import functools
+
+# *****Related object loading*****
+
+# Returns (selectRelated, prefetchRelated) lookups for the relations a serializer reads, so a list of objects is serialized with a fixed number of queries
+# Nested serializers and dotted sources are found from the fields, relations used by model methods are listed in Meta.relatedFields
+@functools.lru_cache(maxsize=None)
+def relatedLookups(serializerClass, prefix=''):
+    selectRelated = []
+    prefetchRelated = []
+
+    # Relations inside a prefetched relation are prefetched too
+    def addRelation(lookup):
+        (prefetchRelated if prefix else selectRelated).append(prefix + lookup)
+
+    for relation in getattr(serializerClass.Meta, 'relatedFields', []):
+        addRelation(relation)
+
+    for field in serializerClass().fields.values():
+        if field.source == '*':
+            continue
+        source = field.source.replace('.', '__')
+
+        if isinstance(field, serializers.ListSerializer):
+            prefetchRelated.append(prefix + source)
+            childSelectRelated, childPrefetchRelated = relatedLookups(type(field.child), f'{prefix}{source}__')
+            prefetchRelated += childSelectRelated + childPrefetchRelated
+
+        elif isinstance(field, serializers.BaseSerializer):
+            addRelation(source)
+            childSelectRelated, childPrefetchRelated = relatedLookups(type(field), f'{prefix}{source}__')
+            selectRelated += childSelectRelated
+            prefetchRelated += childPrefetchRelated
+
+        elif '__' in source:
+            addRelation(source.rsplit('__', 1)[0])
+
+    return tuple(dict.fromkeys(selectRelated)), tuple(dict.fromkeys(prefetchRelated))
+
+def withRelated(queryset, serializerClass):
+    selectRelated, prefetchRelated = relatedLookups(serializerClass)
+    return queryset.select_related(*selectRelated).prefetch_related(*prefetchRelated)
+
 # *****Regions*****
 
 class StateSerializer(serializers.ModelSerializer):
@@ -56,12 +100,31 @@ class EventSerializer(serializers.ModelSerializer):
     venue = VenueSerializer(read_only=True)
     directEnquiriesTo = BasicUserSerializer(read_only=True)
     registrationURL = serializers.SerializerMethodField()
+    surchargeName = serializers.SerializerMethodField()
+    surchargeEventDescription = serializers.SerializerMethodField()
 
     def get_registrationURL(self, obj):
         return self.context['request'].build_absolute_uri(obj.get_absolute_url())
 
+    # Invoice settings are the same for every event, so are read once for each response
+    # The context is shared by all the events in a list
+    def invoiceSettings(self):
+        if 'invoiceSettings' not in self.context:
+            self.context['invoiceSettings'] = InvoiceGlobalSettings.getCached()
+        return self.context['invoiceSettings']
+
+    def get_surchargeName(self, obj):
+        invoiceSettings = self.invoiceSettings()
+        return invoiceSettings.surchargeName if invoiceSettings else ''
+
+    def get_surchargeEventDescription(self, obj):
+        invoiceSettings = self.invoiceSettings()
+        return invoiceSettings.surchargeEventDescription if invoiceSettings else ''
+
     class Meta:
         model = Event
+        # Used by effectiveBannerImageURL
+        relatedFields = ['venue', 'state']
         fields = [
             'id',
             'state',
@@ -0,0 +1,39 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import invalidateCache
+
+from events.models import Event, AvailableDivision, Venue, Division, Year
+from users.models import User
+from regions.models import State
+from invoices.models import InvoiceGlobalSettings
+
+# Models in the public events responses post-save and post-delete
+# Invalidate the cached responses so the next request returns the changes
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=AvailableDivision)
+@receiver(post_delete, sender=AvailableDivision)
+@receiver(post_save, sender=Venue)
+@receiver(post_delete, sender=Venue)
+@receiver(post_save, sender=State)
+@receiver(post_delete, sender=State)
+@receiver(post_save, sender=Division)
+@receiver(post_delete, sender=Division)
+@receiver(post_save, sender=Year)
+@receiver(post_delete, sender=Year)
+@receiver(post_save, sender=InvoiceGlobalSettings)
+@receiver(post_delete, sender=InvoiceGlobalSettings)
+def publicEventsData_changed(sender, instance, **kwargs):
+    invalidateCache()
+
+# User post-save
+# Shown as the contact for events, only invalidate if the user is a contact and their name or email could have changed
+# Saves of other fields, such as last_login on every login, don't invalidate
+@receiver(post_save, sender=User)
+def User_post_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'first_name', 'last_name', 'email'} & set(update_fields):
+        return
+
+    if Event.objects.filter(directEnquiriesTo=instance).exists():
+        invalidateCache()
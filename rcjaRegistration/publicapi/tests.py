@@ -1,10 +1,22 @@
 from common.baseTests.populateDatabase import createStates, createUsers, createEvents
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
+from django.utils import timezone
 from django.urls import reverse
 
 from .views import StateViewSet
+from .serializers import relatedLookups, EventSerializer, SummaryEventSerializer
+from . import changesFeed
+from .cache import cacheVersionKey
+from events.models import Event, AvailableDivision, Year
 from regions.models import State
+from common.cacheVersions import currentVersion
+
+import datetime
+from unittest.mock import patch
 
 # Unit tests
 
@@ -261,3 +273,421 @@ class TestEvents(TestCase):
     def testTbcEventNotInPastCompetitions(self):
         response = self.client.get('/api/v1/public/states/ST1/pastCompetitions/')
         self.assertNotContains(response, 'State 1 TBC Competition')
+
+# Response cache tests
+
+locmemCache = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'publicapiTests',
+    }
+}
+
+@override_settings(CACHES=locmemCache, CACHE_SHARED=True)
+class TestEventsResponseCache(TestCase):
+    url = '/api/v1/public/states/ST1/allEventsDetailed/'
+
+    def setUp(self):
+        cache.clear()
+        createStates(self)
+        createUsers(self)
+        createEvents(self)
+
+    def testETag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['ETag'].startswith('"'))
+
+    def testSameETagWhenUnchanged(self):
+        response1 = self.client.get(self.url)
+        response2 = self.client.get(self.url)
+
+        self.assertEqual(response1.headers['ETag'], response2.headers['ETag'])
+        self.assertEqual(response1.content, response2.content)
+
+    def testCachedNoQueries(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'State 1 Open Competition')
+
+    def testNotModified(self):
+        etag = self.client.get(self.url).headers['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def testOtherETagModified(self):
+        self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+
+    def testEventSaveInvalidates(self):
+        etag = self.client.get(self.url).headers['ETag']
+
+        self.state1_openCompetition.name = 'Renamed Competition'
+        self.state1_openCompetition.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed Competition')
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def testDivisionSaveInvalidates(self):
+        self.client.get(self.url)
+
+        self.division3.name = 'Renamed Division'
+        self.division3.save()
+
+        self.assertContains(self.client.get(self.url), 'Renamed Division')
+
+    def testContactUserSaveInvalidates(self):
+        self.client.get(self.url)
+
+        self.user_state1_super1.first_name = 'Renamed'
+        self.user_state1_super1.save()
+
+        self.assertContains(self.client.get(self.url), 'Renamed')
+
+    def testOtherUserSaveDoesntInvalidate(self):
+        version = currentVersion(cacheVersionKey)
+
+        self.user_state1_school1_mentor1.first_name = 'Renamed'
+        self.user_state1_school1_mentor1.save()
+
+        self.assertEqual(currentVersion(cacheVersionKey), version)
+
+    def testContactUserLoginDoesntInvalidate(self):
+        version = currentVersion(cacheVersionKey)
+
+        self.user_state1_super1.last_login = timezone.now()
+        self.user_state1_super1.save(update_fields=['last_login'])
+
+        self.assertEqual(currentVersion(cacheVersionKey), version)
+
+    def testKeyedByAction(self):
+        self.client.get('/api/v1/public/states/ST1/upcomingCompetitions/')
+
+        response = self.client.get('/api/v1/public/states/ST1/pastCompetitions/')
+        self.assertContains(response, 'State 1 Past Competition')
+        self.assertNotContains(response, 'State 1 Open Competition')
+
+    def testKeyedByState(self):
+        self.client.get(self.url)
+
+        response = self.client.get('/api/v1/public/states/ST2/allEventsDetailed/')
+        self.assertContains(response, 'State 2 Open Competition')
+        self.assertNotContains(response, 'State 1 Open Competition')
+
+    def testOtherQueryParametersShareCache(self):
+        etag = self.client.get(self.url).headers['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'_': '1700000000000'})
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def testKeyedByIncludeGlobal(self):
+        self.state1_openCompetition.globalEvent = True
+        self.state1_openCompetition.save()
+        self.client.get(self.url)
+
+        self.assertContains(self.client.get(self.url, {'includeGlobal': 'true'}), 'State 1 Open Competition')
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'other.example.com'])
+    def testKeyedByHost(self):
+        self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_HOST='other.example.com')
+        self.assertContains(response, 'http://other.example.com/')
+        self.assertNotContains(response, 'http://testserver/')
+
+    def testNotFoundNotCached(self):
+        self.state1.typeWebsite = False
+        self.state1.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.state1.typeWebsite = True
+        self.state1.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+# Serializer query tests
+
+@override_settings(CACHES=locmemCache, CACHE_SHARED=False)
+class TestEventsPerProcessCache(TestCase):
+    url = '/api/v1/public/states/ST1/allEventsDetailed/'
+
+    def setUp(self):
+        cache.clear()
+        createStates(self)
+        createUsers(self)
+        createEvents(self)
+
+    def testChangeInOtherWorkerSeen(self):
+        self.client.get(self.url)
+
+        # Update doesn't invalidate this process's cache, like a save handled by another worker
+        Event.objects.filter(pk=self.state1_openCompetition.pk).update(name='Renamed Competition')
+
+        self.assertContains(self.client.get(self.url), 'Renamed Competition')
+
+    def testNotModified(self):
+        response = self.client.get(self.url)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+class TestEventSerializerQueries(TestCase):
+    def setUp(self):
+        createStates(self)
+        createUsers(self)
+        createEvents(self)
+
+    def createEvent(self, name):
+        event = Event.objects.create(
+            year = self.year,
+            state = self.state1,
+            name = name,
+            eventType = 'competition',
+            status = 'published',
+            competition_defaultEntryFee = 50,
+            startDate = (datetime.datetime.now() + datetime.timedelta(days=20)).date(),
+            endDate = (datetime.datetime.now() + datetime.timedelta(days=20)).date(),
+            registrationsOpenDate = (datetime.datetime.now() + datetime.timedelta(days=-10)).date(),
+            registrationsCloseDate = (datetime.datetime.now() + datetime.timedelta(days=1)).date(),
+            directEnquiriesTo = self.user_state1_super1,
+            venue=self.venue1_state1,
+        )
+        AvailableDivision.objects.create(event=event, division=self.division3)
+        AvailableDivision.objects.create(event=event, division=self.division4)
+
+    def testRelatedLookups(self):
+        selectRelated, prefetchRelated = relatedLookups(EventSerializer)
+
+        self.assertEqual(set(selectRelated), {'venue', 'state', 'directEnquiriesTo'})
+        self.assertEqual(set(prefetchRelated), {'availabledivision_set', 'availabledivision_set__division'})
+
+    def testSummaryNoRelatedLookups(self):
+        self.assertEqual(relatedLookups(SummaryEventSerializer), ((), ()))
+
+    def testConstantQueries(self):
+        url = '/api/v1/public/states/ST1/allEventsDetailed/'
+
+        with CaptureQueriesContext(connection) as initialQueries:
+            initialResponse = self.client.get(url)
+
+        for i in range(5):
+            self.createEvent(f'New Competition {i}')
+
+        with self.assertNumQueries(len(initialQueries)):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.json()), len(initialResponse.json()) + 5)
+
+    def testSurchargeFields(self):
+        self.invoiceSettings.surchargeName = 'Test surcharge'
+        self.invoiceSettings.save()
+
+        response = self.client.get('/api/v1/public/states/ST1/allEventsDetailed/')
+        self.assertTrue(all(event['surchargeName'] == 'Test surcharge' for event in response.json()))
+
+# Changes feed tests
+
+class TestChangesFeed(TestCase):
+    url = '/api/v1/public/states/ST1/changes/'
+
+    def setUp(self):
+        createStates(self)
+        createUsers(self)
+        createEvents(self)
+
+    def getChanges(self, cursor=None):
+        response = self.client.get(self.url, {'cursor': cursor} if cursor else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def changedIDs(self, data, deleted=False):
+        return [change['id'] for change in data['changes'] if change['deleted'] == deleted]
+
+    def testInitialSyncIncludesEvents(self):
+        data = self.getChanges()
+
+        self.assertIn(self.state1_openCompetition.id, self.changedIDs(data))
+        self.assertFalse(data['more'])
+        self.assertIsNotNone(data['cursor'])
+
+    def testEventData(self):
+        data = self.getChanges()
+        change = next(change for change in data['changes'] if change['id'] == self.state1_openCompetition.id)
+
+        self.assertEqual(change['event']['name'], 'State 1 Open Competition')
+        self.assertEqual(len(change['event']['availabledivisions']), 2)
+
+    def createEvent(self, year, status, name):
+        return Event.objects.create(
+            year=year,
+            state=self.state1,
+            name=name,
+            eventType='competition',
+            status=status,
+            directEnquiriesTo=self.user_state1_super1,
+        )
+
+    def state1EventIDs(self):
+        return sorted(Event.objects.filter(state=self.state1).values_list('id', flat=True))
+
+    def testOtherStateNotIncluded(self):
+        data = self.getChanges()
+
+        self.assertNotIn(self.state2_openCompetition.id, [change['id'] for change in data['changes']])
+
+    def testOtherStateChangeNotIncluded(self):
+        cursor = self.getChanges()['cursor']
+
+        self.state2_openCompetition.status = 'draft'
+        self.state2_openCompetition.save()
+        self.state2_openWorkshop.delete()
+
+        self.assertEqual(self.getChanges(cursor)['changes'], [])
+
+    def testNeverShownNotIncluded(self):
+        cursor = self.getChanges()['cursor']
+
+        draftEvent = self.createEvent(self.year, 'draft', 'Draft Competition')
+        draftEvent.name = 'Renamed Draft Competition'
+        draftEvent.save()
+        draftEvent.delete()
+
+        self.assertEqual(self.getChanges(cursor)['changes'], [])
+
+    def testHiddenYearEventNotIncluded(self):
+        hiddenYear = Year.objects.create(year=2030, displayEventsOnWebsite=False)
+        hiddenEvent = self.createEvent(hiddenYear, 'published', 'Hidden Competition')
+
+        self.assertNotIn(hiddenEvent.id, [change['id'] for change in self.getChanges()['changes']])
+
+    def testYearDisplayedMarksShown(self):
+        hiddenYear = Year.objects.create(year=2030, displayEventsOnWebsite=False)
+        hiddenEvent = self.createEvent(hiddenYear, 'published', 'Hidden Competition')
+        cursor = self.getChanges()['cursor']
+
+        hiddenYear.displayEventsOnWebsite = True
+        hiddenYear.save()
+        hiddenEvent.refresh_from_db()
+
+        self.assertTrue(hiddenEvent.shownOnWebsite)
+        self.assertIn(hiddenEvent.id, self.changedIDs(self.getChanges(cursor)))
+
+    def testNoChangesSinceCursor(self):
+        cursor = self.getChanges()['cursor']
+
+        data = self.getChanges(cursor)
+        self.assertEqual(data['changes'], [])
+        self.assertEqual(data['cursor'], cursor)
+
+    def testEditedEventSinceCursor(self):
+        cursor = self.getChanges()['cursor']
+
+        self.state1_openCompetition.name = 'Renamed Competition'
+        self.state1_openCompetition.save()
+
+        data = self.getChanges(cursor)
+        self.assertEqual(self.changedIDs(data), [self.state1_openCompetition.id])
+        self.assertEqual(data['changes'][0]['event']['name'], 'Renamed Competition')
+
+    def testAvailableDivisionChangeMarksEvent(self):
+        cursor = self.getChanges()['cursor']
+
+        self.availableDivision3_state1_openCompetition.division_maxRegistrationsPerSchool = 3
+        self.availableDivision3_state1_openCompetition.save()
+
+        self.assertEqual(self.changedIDs(self.getChanges(cursor)), [self.state1_openCompetition.id])
+
+    def testUnpublishedTombstone(self):
+        cursor = self.getChanges()['cursor']
+
+        self.state1_openCompetition.status = 'draft'
+        self.state1_openCompetition.save()
+
+        data = self.getChanges(cursor)
+        self.assertEqual(data['changes'], [{'id': self.state1_openCompetition.id, 'deleted': True}])
+
+    def testDeletedTombstone(self):
+        cursor = self.getChanges()['cursor']
+        eventID = self.state1_pastCompetition.id
+
+        self.state1_pastCompetition.delete()
+
+        data = self.getChanges(cursor)
+        self.assertEqual(data['changes'], [{'id': eventID, 'deleted': True}])
+
+    def testMovedStateTombstone(self):
+        cursor = self.getChanges()['cursor']
+        state2Cursor = self.client.get('/api/v1/public/states/ST2/changes/').json()['cursor']
+
+        self.state1_openCompetition.state = self.state2
+        self.state1_openCompetition.save()
+
+        self.assertEqual(self.getChanges(cursor)['changes'], [{'id': self.state1_openCompetition.id, 'deleted': True}])
+
+        data = self.client.get('/api/v1/public/states/ST2/changes/', {'cursor': state2Cursor}).json()
+        self.assertEqual(self.changedIDs(data), [self.state1_openCompetition.id])
+
+    def testTombstoneForPreviousStateReturnsVisibleEvent(self):
+        # Shown with includeGlobal both as a state 1 event and as a global event
+        cursor = self.client.get(self.url, {'includeGlobal': True}).json()['cursor']
+
+        self.state1_openCompetition.globalEvent = True
+        self.state1_openCompetition.save()
+
+        data = self.client.get(self.url, {'includeGlobal': True, 'cursor': cursor}).json()
+        self.assertEqual(self.changedIDs(data, deleted=True), [])
+        self.assertIn(self.state1_openCompetition.id, self.changedIDs(data))
+
+    def testContactUserChangeMarksEvent(self):
+        cursor = self.getChanges()['cursor']
+
+        self.user_state1_super1.first_name = 'Renamed'
+        self.user_state1_super1.save()
+
+        self.assertIn(self.state1_openCompetition.id, self.changedIDs(self.getChanges(cursor)))
+
+    def testKeysetPagination(self):
+        seenIDs = []
+        cursor = None
+
+        with patch.object(StateViewSet, 'changesPageSize', 2):
+            while True:
+                data = self.getChanges(cursor)
+                self.assertLessEqual(len(data['changes']), 2)
+                seenIDs += [change['id'] for change in data['changes']]
+                cursor = data['cursor']
+                if not data['more']:
+                    break
+
+        self.assertEqual(sorted(seenIDs), self.state1EventIDs())
+
+    def testSameTimestampOrderedByID(self):
+        updatedDateTime = timezone.now() - datetime.timedelta(minutes=1)
+        Event.objects.update(updatedDateTime=updatedDateTime)
+        eventIDs = self.state1EventIDs()
+
+        data = self.getChanges(changesFeed.encodeCursor(updatedDateTime, eventIDs[1]))
+        self.assertEqual([change['id'] for change in data['changes']], eventIDs[2:])
+
+    def testRecentChangesDelayed(self):
+        cursor = self.getChanges()['cursor']
+
+        self.state1_openCompetition.save()
+
+        with self.settings(PUBLIC_API_CHANGES_DELAY=60):
+            self.assertEqual(self.getChanges(cursor)['changes'], [])
+
+    def testInvalidCursor(self):
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 400)
@@ -8,7 +8,9 @@ from django.db.models.deletion import ProtectedError
 
 from common.apiPermissions import ReadOnly
 
-from .serializers import StateSerializer, EventSerializer, SummaryEventSerializer
+from .serializers import StateSerializer, EventSerializer, SummaryEventSerializer, withRelated
+from .cache import cachedResponse
+from . import changesFeed
 
 from events.models import Event
 from regions.models import State
@@ -18,6 +20,8 @@ import datetime
 
 class NestedSerializerActionMinxin:
     def nestedSerializer(self, queryset, serializerClass):
+        queryset = withRelated(queryset, serializerClass)
+
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = serializerClass(page, many=True, context={'request': self.request})
@@ -28,6 +32,16 @@ class NestedSerializerActionMinxin:
 
 # *****Regions*****
 
+# Filter for the events of a state, also used for changes feed tombstones which have the same state and globalEvent fields
+def stateEventsFilter(abbreviation, includeGlobal=False):
+    state = get_object_or_404(State, abbreviation__iexact=abbreviation, typeWebsite=True)
+    if state.typeGlobal:
+        return Q(globalEvent=True) | Q(globalEvent=False, state=state)
+    elif includeGlobal:
+        return Q(globalEvent=True) | Q(state=state) | Q(state__typeGlobal=True)
+    else:
+        return Q(globalEvent=False, state=state)
+
 class StateViewSet(viewsets.ReadOnlyModelViewSet, NestedSerializerActionMinxin):
     lookup_field = 'abbreviation__iexact'
     lookup_url_kwarg = 'abbreviation'
@@ -37,13 +51,7 @@ class StateViewSet(viewsets.ReadOnlyModelViewSet, NestedSerializerActionMinxin):
     permission_classes = (ReadOnly,)
 
     def eventsBaseQueryset(self, abbreviation, includeGlobal=False):
-        state = get_object_or_404(State, abbreviation__iexact=abbreviation, typeWebsite=True)
-        if state.typeGlobal:
-            return Event.objects.filter(Q(globalEvent=True) | Q(globalEvent=False, state=state), status='published', year__displayEventsOnWebsite=True)
-        elif includeGlobal:
-            return Event.objects.filter(Q(globalEvent=True) | Q(state=state) | Q(state__typeGlobal=True), status='published', year__displayEventsOnWebsite=True)
-        else:
-            return Event.objects.filter(globalEvent=False, state=state, status='published', year__displayEventsOnWebsite=True)
+        return Event.objects.filter(stateEventsFilter(abbreviation, includeGlobal), status='published', year__displayEventsOnWebsite=True)
 
     def upcomingEventsQueryset(self, abbreviation, includeGlobal):
         return self.eventsBaseQueryset(abbreviation, includeGlobal).filter(Q(startDate__gte=datetime.datetime.today())|Q(startDate=None)).order_by('startDate')
@@ -51,11 +59,15 @@ class StateViewSet(viewsets.ReadOnlyModelViewSet, NestedSerializerActionMinxin):
     def pastEventsQueryset(self, abbreviation, includeGlobal):
         return self.eventsBaseQueryset(abbreviation, includeGlobal).filter(startDate__lt=datetime.datetime.today()).order_by('-startDate')
 
+    # Event endpoints
+    # Responses are cached until events change and have an ETag, so polls with If-None-Match get 304 Not Modified if nothing changed
+
     # Summary event endpoint
     # Returns all events (past and upcoming) from years with displayEventsOnWebsite=True
     # Includes all published competitions and workshops
     # Fewer fields returned, uses summary serializer
     @action(detail=True)
+    @cachedResponse
     def allEvents(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.eventsBaseQueryset(abbreviation, includeGlobal).order_by('startDate')
@@ -63,6 +75,7 @@ class StateViewSet(viewsets.ReadOnlyModelViewSet, NestedSerializerActionMinxin):
 
     # Detailed event endpoint
     @action(detail=True)
+    @cachedResponse
     def allEventsDetailed(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.eventsBaseQueryset(abbreviation, includeGlobal).order_by('startDate')
@@ -71,18 +84,21 @@ class StateViewSet(viewsets.ReadOnlyModelViewSet, NestedSerializerActionMinxin):
     # Upcoming events
 
     @action(detail=True)
+    @cachedResponse
     def upcomingEvents(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.upcomingEventsQueryset(abbreviation, includeGlobal)
         return self.nestedSerializer(queryset, EventSerializer)
 
     @action(detail=True)
+    @cachedResponse
     def upcomingCompetitions(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.upcomingEventsQueryset(abbreviation, includeGlobal).filter(eventType = 'competition')
         return self.nestedSerializer(queryset, EventSerializer)
 
     @action(detail=True)
+    @cachedResponse
     def upcomingWorkshops(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.upcomingEventsQueryset(abbreviation, includeGlobal).filter(eventType = 'workshop')
@@ -91,23 +107,50 @@ class StateViewSet(viewsets.ReadOnlyModelViewSet, NestedSerializerActionMinxin):
     # Past events
 
     @action(detail=True)
+    @cachedResponse
     def pastEvents(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.pastEventsQueryset(abbreviation, includeGlobal)
         return self.nestedSerializer(queryset, EventSerializer)
 
     @action(detail=True)
+    @cachedResponse
     def pastCompetitions(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.pastEventsQueryset(abbreviation, includeGlobal).filter(eventType = 'competition')
         return self.nestedSerializer(queryset, EventSerializer)
 
     @action(detail=True)
+    @cachedResponse
     def pastWorkshops(self, request, abbreviation=None):
         includeGlobal = request.GET.get('includeGlobal', False)
         queryset = self.pastEventsQueryset(abbreviation, includeGlobal).filter(eventType = 'workshop')
         return self.nestedSerializer(queryset, EventSerializer)
 
+    # Changes feed
+    # Events changed since the cursor, oldest first, so consumers can stay in sync without downloading all events again
+    # Events deleted, unpublished or moved to another state are returned as tombstones, only to the states they were shown for
+    # Start without a cursor, then pass the returned cursor in the next request. If more is true there are more changes to fetch straight away
+
+    changesPageSize = 50
+
+    @action(detail=True)
+    def changes(self, request, abbreviation=None):
+        includeGlobal = request.GET.get('includeGlobal', False)
+        stateFilter = stateEventsFilter(abbreviation, includeGlobal)
+        visibleEvents = self.eventsBaseQueryset(abbreviation, includeGlobal)
+
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                cursor = changesFeed.decodeCursor(cursor)
+            except ValueError:
+                return Response({'detail': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            cursor = None
+
+        return Response(changesFeed.getChanges(request, stateFilter, visibleEvents, cursor, self.changesPageSize))
+
     # @action(detail=True)
     # def committeeMembers(self, request, pk=None):
     #     state = get_object_or_404(State, pk=pk, typeWebsite=True)
@@ -38,7 +38,13 @@ env = environ.Env(
     DEV_SETTINGS=(bool, False),
     DEFAULT_FROM_EMAIL=(str, 'entersupport@robocupjunior.org.au'),
     USE_PROXY=(bool, False),
-    ENVIRONMENT=(str, 'development')
+    ENVIRONMENT=(str, 'development'),
+    INVOICE_RECALCULATION_MODE=(str, 'deferred'),
+    CACHE_URL=(str, 'locmemcache://'),
+    INVOICE_SETTINGS_CACHE_TIMEOUT=(int, 300),
+    PUBLIC_API_CACHE_TIMEOUT=(int, 300),
+    REFERENCE_DATA_CACHE_TIMEOUT=(int, 3600),
+    PWNED_VALIDATOR_DATASET=(str, ''),
 )
 
 assert not (len(sys.argv) > 1 and sys.argv[1] == 'test'), "These settings should never be used to run tests"
@@ -94,6 +100,7 @@ INSTALLED_APPS = [
     'workshops.apps.WorkshopsConfig',
     'association.apps.AssociationConfig',
     'common.apps.CommonConfig',
+    'publicapi.apps.PublicapiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -216,11 +223,43 @@ PASSWORD_HASHERS = [
 PWNED_VALIDATOR_ERROR = "Your password was determined to have been involved in a major security breach. This was not a breach of this site. This can be caused by using this password on a different site that was breached or if someone else used the same password. Go to https://haveibeenpwned.com/Passwords for more information."
 PWNED_VALIDATOR_ERROR_FAIL = "We could not validate the safety of this password. This does not mean the password is invalid. Please try again in a little bit, if the problem persists please contact us."
 PWNED_VALIDATOR_FAIL_SAFE = False
+PWNED_VALIDATOR_CACHE_TIMEOUT = 86400 # Seconds range responses are kept in the cache
+# Local dataset built with the buildpwneddataset command, checked before the API so password changes don't depend on the API
+PWNED_VALIDATOR_DATASET = env('PWNED_VALIDATOR_DATASET')
+PWNED_VALIDATOR_SOURCES = ['local', 'remote']
 
 # Dev only
 if DEV_SETTINGS:
     EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Invoices
+
+# 'deferred' recalculates each affected invoice once when the transaction commits
+# 'background' does the same in a local background thread, 'immediate' recalculates on every save
+INVOICE_RECALCULATION_MODE = env('INVOICE_RECALCULATION_MODE')
+
+# Seconds invoice settings are cached for, changes are seen immediately by workers sharing the cache
+INVOICE_SETTINGS_CACHE_TIMEOUT = env('INVOICE_SETTINGS_CACHE_TIMEOUT')
+
+# Seconds public events API responses are cached for, cleared when events change
+PUBLIC_API_CACHE_TIMEOUT = env('PUBLIC_API_CACHE_TIMEOUT')
+
+# Seconds years, states, regions and other lookup tables are cached for, cleared when they change
+REFERENCE_DATA_CACHE_TIMEOUT = env('REFERENCE_DATA_CACHE_TIMEOUT')
+
+# Seconds before changes appear in the public API changes feed, so changes committed late aren't skipped by consumers
+PUBLIC_API_CHANGES_DELAY = 5
+
+# Cache
+# Set CACHE_URL to a shared cache such as redis://host:6379/0 so all workers see the same cached values, the production docker compose file runs one
+# Values that are cleared when data changes are only cached with a shared cache, because a per process cache isn't cleared by changes made in other workers
+
+CACHES = {
+    'default': env.cache(),
+}
+
+CACHE_SHARED = CACHES['default']['BACKEND'] not in ['django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache']
+
 PASSWORD_RESET_TIMEOUT_DAYS = 1 # 1 day
 SESSION_COOKIE_AGE = 172800 # 2 days
 
@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     'workshops.apps.WorkshopsConfig',
     'association.apps.AssociationConfig',
     'common.apps.CommonConfig',
+    'publicapi.apps.PublicapiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -161,6 +162,23 @@ PWNED_VALIDATOR_FAIL_SAFE = False
 
 EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
 
+# Cache
+
+# Test database changes are rolled back without invalidating cached values, so nothing is cached by default
+# Caching is tested explicitly
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+CACHE_SHARED = False
+
+INVOICE_SETTINGS_CACHE_TIMEOUT = 300
+PUBLIC_API_CACHE_TIMEOUT = 300
+PUBLIC_API_CHANGES_DELAY = 0
+REFERENCE_DATA_CACHE_TIMEOUT = 3600
+
 PASSWORD_RESET_TIMEOUT_DAYS = 1 # 1 day
 SESSION_COOKIE_AGE = 172800 # 2 days
 
@@ -1,5 +1,5 @@
 from common.baseTests import createStates, createUsers
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 from django.urls import reverse
 from django.test import TestCase
 
@@ -18,6 +18,8 @@ class TestAdminCSVExport_State(TestCase):
 
     def test_export_as_csv_correctHeaders(self):
         response = self.client.post(reverse('admin:regions_state_changelist'), {'action': 'export_as_csv', '_selected_action': [self.state1.pk]})
+        # Streamed content can only be read once, so read it into a response assertContains can check repeatedly
+        response = HttpResponse(response.getvalue())
         self.assertContains(response, 'Name')
         self.assertContains(response, 'Abbreviation')
         self.assertContains(response, 'User registration')
@@ -25,5 +27,7 @@ class TestAdminCSVExport_State(TestCase):
 
     def test_export_as_csv_correctValues(self):
         response = self.client.post(reverse('admin:regions_state_changelist'), {'action': 'export_as_csv', '_selected_action': [self.state1.pk]})
+        # Streamed content can only be read once, so read it into a response assertContains can check repeatedly
+        response = HttpResponse(response.getvalue())
         self.assertContains(response, 'State 1')
         self.assertContains(response, 'ST1')
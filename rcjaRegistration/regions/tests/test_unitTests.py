@@ -92,9 +92,9 @@ class TestGetRegionsLookup(TestCase):
     def testStateContent(self):
         lookup = getRegionsLookup()
 
-        self.assertEqual(2, lookup[1].regions.count())
+        self.assertEqual(2, len(lookup[1].regions))
 
     def testBlankContent(self):
         lookup = getRegionsLookup()
 
-        self.assertEqual(1, lookup[0].regions.count())
+        self.assertEqual(1, len(lookup[0].regions))
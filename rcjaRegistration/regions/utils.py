@@ -1,6 +1,5 @@
-from django.db.models import Q
-
 from regions.models import State, Region
+from common.referenceData import referenceData
 
 class RegionLookupObj:
     def __init__(self, stateID, regions):
@@ -10,15 +9,18 @@ class RegionLookupObj:
 def getRegionsLookup():
     """
     Creates a list of objects with state id and a list of regions that are available for that state.
+    States and regions are read from the reference data cache.
     """
 
+    regions = referenceData(Region)
     regionsLookup = []
 
     # Add blank state id with global regions for when no state selected
-    regionsLookup.append(RegionLookupObj('', Region.objects.filter(state=None)))
+    regionsLookup.append(RegionLookupObj('', [region for region in regions if region.state_id is None]))
 
     # Add regions for each state
-    for state in State.objects.filter(typeUserRegistration=True):
-        regionsLookup.append(RegionLookupObj(state.id, Region.objects.filter(Q(state=None) | Q(state=state))))
+    for state in referenceData(State):
+        if state.typeUserRegistration:
+            regionsLookup.append(RegionLookupObj(state.id, [region for region in regions if region.state_id in (None, state.id)]))
 
     return regionsLookup
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from common.adminMixins import ExportCSVMixin, DifferentAddFieldsMixin, FKActionsRemove
+from common.redirectsMiddleware import invalidateRedirectState
 from coordination.permissions import AdminPermissions, InlineAdminPermissions
 from .adminInlines import SchoolAdministratorInline
 
@@ -103,6 +104,8 @@ class SchoolAdmin(FKActionsRemove, AdminPermissions, admin.ModelAdmin, ExportCSV
 
     def setForceDetailsUpdate(self, request, queryset):
         queryset.update(forceSchoolDetailsUpdate=True)
+        # Update doesn't send save signals
+        invalidateRedirectState('school', list(queryset.values_list('pk', flat=True)))
     setForceDetailsUpdate.short_description = "Require details update"
     setForceDetailsUpdate.allowed_permissions = ('change',)
 
@@ -0,0 +1,228 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Value, Case, When, BooleanField, F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from collections import Counter
+
+from .models import Campus, SchoolAdministrator
+from users.models import User
+from events.models import BaseEventAttendance, RegistrationCounter
+from invoices.models import Invoice, InvoicePayment
+from invoices.recalculation import recalculateInvoiceTotals
+
+# Merge school 2 into school 1, or remove all campuses from school 1 if both schools are the same
+# The preview is worked out from grouped count queries and the merge is applied with update and delete statements,
+# so the number of queries doesn't depend on the number of teams, workshop attendees, administrators and invoices
+
+class SchoolMerge:
+    def __init__(self, school1, school2, keepExistingCampuses=False, school1NewCampusName='', school2NewCampusName=''):
+        self.school1 = school1
+        self.school2 = school2
+        self.keepExistingCampuses = keepExistingCampuses
+        self.differentSchools = school1 != school2
+        self.schools = [school1, school2] if self.differentSchools else [school1]
+        self.invoiceTotalsCalculated = False
+
+        self.campuses = {campus.pk: campus for campus in Campus.objects.filter(school__in=self.schools).select_related('school')}
+        for campus in self.campuses.values():
+            campus.oldSchool = campus.school
+
+        self.school1NewCampus = self.newCampus(school1, school1NewCampusName)
+        self.school2NewCampus = self.newCampus(school2, school2NewCampusName) if self.differentSchools else None
+
+        # Campuses after the merge, school is None if the campus is deleted
+        for campus in self.campuses.values():
+            if campus not in self.newCampuses():
+                campus.school = self.school1 if self.keepExistingCampuses else None
+
+    # *****Campuses*****
+
+    def newCampus(self, school, name):
+        # Existing campus of the school with this name, otherwise a new campus that is created when the merge is applied
+        # Objects without a campus are connected to this campus, and all objects if not keeping existing campuses
+        if not name:
+            return None
+
+        for campus in self.campuses.values():
+            if campus.oldSchool == school and campus.name == name:
+                campus.school = self.school1
+                return campus
+
+        campus = Campus(school=self.school1, name=name)
+        campus.oldSchool = None
+        return campus
+
+    def newCampuses(self):
+        return [campus for campus in [self.school1NewCampus, self.school2NewCampus] if campus is not None]
+
+    def schoolsAndNewCampuses(self):
+        if self.differentSchools:
+            return [(self.school1, self.school1NewCampus), (self.school2, self.school2NewCampus)]
+        return [(self.school1, self.school1NewCampus)]
+
+    def newCampusFor(self, school, campus):
+        newCampus = self.school1NewCampus if school == self.school1 else self.school2NewCampus
+
+        if self.keepExistingCampuses:
+            return campus or newCampus
+        return newCampus
+
+    # *****Preview*****
+
+    # Campuses are listed individually, there are only a few for each school
+    def campusChanges(self):
+        newCampuses = self.newCampuses()
+        return newCampuses + [campus for campus in self.campuses.values() if campus not in newCampuses]
+
+    def changeRows(self, groups):
+        # Rows of current school and campus, new school and campus and number of objects, from grouped counts
+        schools = {school.pk: school for school in self.schools}
+        rows = []
+
+        for group in groups:
+            oldSchool = schools[group['school']]
+            oldCampus = self.campuses.get(group['campus'])
+            deleted = group.get('delete', False)
+
+            rows.append({
+                'oldSchool': oldSchool,
+                'oldCampus': oldCampus,
+                'school': None if deleted else self.school1,
+                'campus': None if deleted else self.newCampusFor(oldSchool, oldCampus),
+                'number': group['number'],
+            })
+
+        return rows
+
+    def schoolAdministratorChanges(self):
+        return self.changeRows(SchoolAdministrator.objects.filter(school__in=self.schools).order_by('school', 'campus').values('school', 'campus').annotate(number=Count('pk')))
+
+    def eventAttendeeChanges(self):
+        return self.changeRows(BaseEventAttendance.objects.filter(school__in=self.schools).order_by('school', 'campus').values('school', 'campus').annotate(number=Count('pk')))
+
+    def invoiceChanges(self):
+        return self.changeRows(self.invoices().order_by('school', 'campus', 'delete').values('school', 'campus', 'delete').annotate(number=Count('pk')))
+
+    # *****Validation*****
+
+    def invoices(self):
+        # Invoices with no amount and no payments are deleted, unless a team or workshop attendee is billed to them
+        # Totals that haven't been calculated yet are calculated first so the amount is known
+        if not self.invoiceTotalsCalculated:
+            for invoice in Invoice.objects.filter(school__in=self.schools, cache_invoiceAmountInclGST_unrounded=None):
+                invoice.calculateAndSaveAllTotals()
+            self.invoiceTotalsCalculated = True
+
+        return Invoice.objects.filter(school__in=self.schools).annotate(
+            delete=Case(
+                When(
+                    Q(cache_invoiceAmountInclGST_unrounded__lt=0.05) &
+                    ~Exists(InvoicePayment.objects.filter(invoice=OuterRef('pk'))) &
+                    ~Exists(BaseEventAttendance.objects.filter(invoiceOverride=OuterRef('pk'))),
+                    then=Value(True)
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+        )
+
+    def validate(self):
+        for campus in self.newCampuses():
+            campus.full_clean()
+
+        # Campuses kept from both schools must have different names
+        names = Counter(campus.name for campus in self.campusChanges() if campus.school_id is not None)
+        for name, number in names.items():
+            if number > 1:
+                raise ValidationError(f"Campus {name} exists for both schools. Rename one of the campuses or don't keep existing campuses, then try again.")
+
+        # Only one invoice can remain for each event and campus of the merged school
+        remaining = Counter()
+        for invoiceNumber, eventID, schoolID, campusID in self.invoices().filter(delete=False).order_by('invoiceNumber').values_list('invoiceNumber', 'event', 'school', 'campus'):
+            oldSchool = self.school1 if schoolID == self.school1.pk else self.school2
+            newCampus = self.newCampusFor(oldSchool, self.campuses.get(campusID))
+            key = (eventID, newCampus.name if newCampus else None)
+
+            remaining[key] += 1
+            if remaining[key] > 1:
+                raise ValidationError(f"Couldn't save invoice {invoiceNumber} because already a conflicting invoice, couldn't delete because invoice amount is not 0. Remove any invoice payments and set invoice override for anything connected to this invoice, then try again.")
+
+    # *****Merge*****
+
+    def updateSchoolObjects(self, queryset, school, newCampus, **extraValues):
+        # Move objects of the school to school 1 and set the new campus, the campus is kept if keeping existing campuses
+        values = {}
+        if school != self.school1:
+            values['school'] = self.school1
+
+        if not self.keepExistingCampuses:
+            values['campus'] = newCampus
+        elif newCampus is not None:
+            values['campus'] = Coalesce(F('campus'), Value(newCampus.pk))
+
+        if values:
+            queryset.filter(school=school).update(**values, **extraValues)
+
+    def mergeSchoolAdministrators(self):
+        self.updateSchoolObjects(SchoolAdministrator.objects.all(), self.school1, self.school1NewCampus)
+
+        if not self.differentSchools:
+            return
+
+        # Administrators of both schools get the campus they would have from school 2
+        school2Administrators = SchoolAdministrator.objects.filter(school=self.school2)
+        if self.keepExistingCampuses:
+            newCampus = Subquery(school2Administrators.filter(user=OuterRef('user')).values('campus')[:1])
+            if self.school2NewCampus is not None:
+                newCampus = Coalesce(newCampus, Value(self.school2NewCampus.pk))
+        else:
+            newCampus = self.school2NewCampus
+
+        SchoolAdministrator.objects.filter(school=self.school1, user__in=school2Administrators.values('user')).update(campus=newCampus)
+        school2Administrators.filter(user__in=SchoolAdministrator.objects.filter(school=self.school1).values('user')).delete()
+        self.updateSchoolObjects(SchoolAdministrator.objects.all(), self.school2, self.school2NewCampus)
+
+        # Users that had school 2 selected now have the merged school selected
+        User.objects.filter(Q(currentlySelectedSchool=self.school2) | Q(currentlySelectedSchool=None, schooladministrator__school=self.school1)).update(currentlySelectedSchool=self.school1)
+
+    def apply(self):
+        # Must be called inside a transaction, school 2 is left with nothing connected to it and can then be deleted
+        self.validate()
+        deletedInvoicePKs = list(self.invoices().filter(delete=True).values_list('pk', flat=True))
+
+        # Campuses
+        for campus in self.newCampuses():
+            campus.save()
+
+        if self.differentSchools and self.keepExistingCampuses:
+            Campus.objects.filter(school=self.school2).update(school=self.school1)
+
+        # Teams and workshop attendees
+        for school, newCampus in self.schoolsAndNewCampuses():
+            self.updateSchoolObjects(BaseEventAttendance.objects.all(), school, newCampus, updatedDateTime=timezone.now())
+
+        if self.differentSchools:
+            # Registration counters aren't updated by update statements
+            RegistrationCounter.moveSchool(self.school2, self.school1)
+
+        # School administrators
+        self.mergeSchoolAdministrators()
+
+        # Invoices, totals are cleared and each invoice of the merged school is recalculated once when the transaction commits
+        Invoice.objects.filter(pk__in=deletedInvoicePKs).delete()
+        for school, newCampus in self.schoolsAndNewCampuses():
+            self.updateSchoolObjects(Invoice.objects.all(), school, newCampus,
+                cache_amountGST_unrounded=None,
+                cache_totalQuantity=None,
+                cache_invoiceAmountExclGST_unrounded=None,
+                cache_invoiceAmountInclGST_unrounded=None,
+                updatedDateTime=timezone.now(),
+            )
+
+        # Campuses that aren't kept, nothing refers to them now
+        if not self.keepExistingCampuses:
+            Campus.objects.filter(school__in=self.schools).exclude(pk__in=[campus.pk for campus in self.newCampuses()]).delete()
+
+        for invoice in Invoice.objects.filter(school=self.school1).select_related('event', 'school', 'campus', 'invoiceToUser'):
+            recalculateInvoiceTotals(invoice)
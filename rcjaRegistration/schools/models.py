@@ -174,10 +174,13 @@ class SchoolAdministrator(SaveDeleteMixin, models.Model):
 
     # *****Save & Delete Methods*****
 
+    trackedFields = ['user', 'school']
+
     def preSave(self):
-        if self.pk:
-            self.previousUser = SchoolAdministrator.objects.get(pk=self.pk).user
-            self.previousSchool = SchoolAdministrator.objects.get(pk=self.pk).school
+        previous = self.previousInstance()
+        if previous is not None:
+            self.previousUser = previous.user
+            self.previousSchool = previous.school
 
     def postSave(self):
         # Set currently selected school if not set
@@ -196,11 +199,13 @@ class SchoolAdministrator(SaveDeleteMixin, models.Model):
         return self.user.fullname_or_email()
     userName.short_description = 'User'
     userName.admin_order_field = 'user'
+    userName.exportSelectRelated = ['user']
 
     def userEmail(self):
         return self.user.email
     userEmail.short_description = 'User email'
     userEmail.admin_order_field = 'user__email'
+    userEmail.exportSelectRelated = ['user']
 
     def __str__(self):
         return f'{self.school}: {self.user.fullname_or_email()}'
@@ -0,0 +1,38 @@
+from common.baseTests import createStates, createUsers, createSchools
+from django.http import HttpRequest
+from django.urls import reverse
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from schools.models import SchoolAdministrator
+
+class TestAdminCSVExport_SchoolAdministrator(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+
+    def setUp(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_super1, password=self.password)
+
+    def export(self, schoolAdministrators):
+        response = self.client.post(reverse('admin:schools_schooladministrator_changelist'), {'action': 'export_as_csv', '_selected_action': [x.pk for x in schoolAdministrators]})
+        return b''.join(response.streaming_content).decode()
+
+    def test_export_as_csv_correctValues(self):
+        content = self.export(SchoolAdministrator.objects.filter(school=self.school1_state1))
+        self.assertIn('User email', content)
+        self.assertIn(self.email_user_state1_school1_mentor1, content)
+        self.assertIn('School 1', content)
+
+    def test_export_as_csv_numQueriesConstant(self):
+        with CaptureQueriesContext(connection) as initialQueries:
+            self.export(SchoolAdministrator.objects.all()[:1])
+
+        with CaptureQueriesContext(connection) as queries:
+            content = self.export(SchoolAdministrator.objects.all())
+
+        self.assertEqual(len(content.splitlines()), SchoolAdministrator.objects.count() + 1)
+        self.assertEqual(len(queries), len(initialQueries))
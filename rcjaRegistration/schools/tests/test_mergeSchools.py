@@ -3,10 +3,13 @@ from common.baseTests import createStates, createUsers, createSchools, createEve
 from django.test import TestCase
 from django.urls import reverse
 from django.http import HttpRequest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 import datetime
 
-from schools.models import School, Campus
+from schools.models import School, Campus, SchoolAdministrator
+from schools.merge import SchoolMerge
 from teams.models import Team
 from workshops.models import WorkshopAttendee
 from invoices.models import Invoice
@@ -19,13 +22,15 @@ def createAdditionalTeamsAndWorkshopAttendees(obj):
 class Base_Test_MergeSchools(TestCase):
     @classmethod
     def setUpTestData(cls):
-        createStates(cls)
-        createUsers(cls)
-        createSchools(cls)
-        createEvents(cls)
-        createTeams(cls)
-        createWorkshopAttendees(cls)
-        createAdditionalTeamsAndWorkshopAttendees(cls)
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createStates(cls)
+            createUsers(cls)
+            createSchools(cls)
+            createEvents(cls)
+            createTeams(cls)
+            createWorkshopAttendees(cls)
+            createAdditionalTeamsAndWorkshopAttendees(cls)
     
 class Test_MergeSchools_notstaff(Base_Test_MergeSchools, TestCase):
     def setUp(self):
@@ -97,19 +102,12 @@ class Test_MergeSchools_superuser(Base_Test_MergeSchools, TestCase):
         for campus in response.context['campusChanges']:
             self.assertTrue(hasattr(campus, 'oldSchool'))
         
-        self.assertIn(self.state1_event1_team1, response.context['eventAttendeeChanges'])
-        self.assertIn(self.state1_event1_team2, response.context['eventAttendeeChanges'])
-        self.assertIn(self.state2_event1_team3, response.context['eventAttendeeChanges'])
-        self.assertIn(self.state1_event1_workshopAttendee1, response.context['eventAttendeeChanges'])
-        self.assertIn(self.state1_event1_workshopAttendee2, response.context['eventAttendeeChanges'])
-        self.assertIn(self.state2_event1_workshopAttendee3, response.context['eventAttendeeChanges'])
-        self.assertIn(self.school2_team1, response.context['eventAttendeeChanges'])
-        self.assertIn(self.school2_team2, response.context['eventAttendeeChanges'])
-        self.assertNotIn(self.school3_workshopAttendee1, response.context['eventAttendeeChanges'])
-        for eventAttendee in response.context['eventAttendeeChanges']:
-            self.assertEqual(eventAttendee.school, self.school1_state1)
-            self.assertTrue(hasattr(eventAttendee, 'oldSchool'))
-            self.assertTrue(hasattr(eventAttendee, 'school'))
+        # Six teams and workshop attendees from school 1 and two teams from school 2, counted by current school and campus
+        self.assertEqual(sum(row['number'] for row in response.context['eventAttendeeChanges']), 8)
+        self.assertEqual(sum(row['number'] for row in response.context['eventAttendeeChanges'] if row['oldSchool'] == self.school2_state1), 2)
+        for row in response.context['eventAttendeeChanges']:
+            self.assertEqual(row['school'], self.school1_state1)
+            self.assertIn(row['oldSchool'], [self.school1_state1, self.school2_state1])
 
     def test_validate_loads_different_schools_keep_campuses(self):
         response = self.client.post(reverse('schools:adminMergeSchools', args=[self.school1_state1.id, self.school2_state1.id]), {
@@ -162,9 +160,9 @@ class Test_MergeSchools_superuser(Base_Test_MergeSchools, TestCase):
         for campus in response.context['campusChanges']:
             self.assertTrue(hasattr(campus, 'oldSchool'))
 
-        for eventAttendee in response.context['eventAttendeeChanges']:
-            self.assertEqual(eventAttendee.school, self.school1_state1)
-            self.assertTrue(hasattr(eventAttendee, 'oldSchool'))
+        for row in response.context['eventAttendeeChanges']:
+            self.assertEqual(row['school'], self.school1_state1)
+            self.assertEqual(row['campus'].name, 'New Campus 1' if row['oldSchool'] == self.school1_state1 else 'New Campus 2')
 
     def test_validate_loads_different_schools_campus_reused(self):
         response = self.client.post(reverse('schools:adminMergeSchools', args=[self.school1_state1.id, self.school2_state1.id]), {
@@ -365,3 +363,68 @@ class Test_MergeSchools_superuser(Base_Test_MergeSchools, TestCase):
 
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "because already a conflicting invoice")
+
+class Test_SchoolMerge(Base_Test_MergeSchools, TestCase):
+    def setUp(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_super1, password=self.password)
+
+    def merge(self, keepExistingCampuses=False):
+        return self.client.post(reverse('schools:adminMergeSchools', args=[self.school1_state1.id, self.school2_state1.id]), {
+            'keepExistingCampuses': keepExistingCampuses,
+            'school1NewCampusName': '',
+            'school2NewCampusName': '',
+            'merge': "",
+        })
+
+    def previewQueries(self):
+        merge = SchoolMerge(self.school1_state1, self.school2_state1)
+        with CaptureQueriesContext(connection) as queries:
+            merge.validate()
+            merge.schoolAdministratorChanges()
+            merge.eventAttendeeChanges()
+            merge.invoiceChanges()
+        return len(queries)
+
+    def test_preview_queries_constant(self):
+        self.previewQueries()
+        numberQueries = self.previewQueries()
+
+        for i in range(20):
+            Team.objects.create(school=self.school2_state1, event=self.state1_closedCompetition1, division=self.division1_state1, mentorUser=self.user_state1_school2_mentor3, name=f'Extra Team {i}')
+
+        self.assertEqual(self.previewQueries(), numberQueries)
+
+    def test_administrator_of_both_schools_merged(self):
+        SchoolAdministrator.objects.create(school=self.school2_state1, user=self.user_state1_school1_mentor1)
+
+        response = self.merge()
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(SchoolAdministrator.objects.filter(user=self.user_state1_school1_mentor1).count(), 1)
+        self.assertEqual(SchoolAdministrator.objects.filter(school=self.school1_state1).count(), 3)
+
+    def test_selected_school_moved(self):
+        self.user_state1_school2_mentor3.currentlySelectedSchool = self.school2_state1
+        self.user_state1_school2_mentor3.save()
+
+        self.merge()
+
+        self.user_state1_school2_mentor3.refresh_from_db()
+        self.assertEqual(self.user_state1_school2_mentor3.currentlySelectedSchool, self.school1_state1)
+
+    def test_invoices_recalculated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.merge()
+
+        self.assertTrue(Invoice.objects.filter(school=self.school1_state1).exists())
+        self.assertFalse(Invoice.objects.filter(school=self.school1_state1, cache_invoiceAmountInclGST_unrounded=None).exists())
+
+    def test_kept_campus_names_conflict(self):
+        self.campus3_school2.name = 'Campus 1'
+        self.campus3_school2.save()
+
+        response = self.merge(keepExistingCampuses=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Campus Campus 1 exists for both schools")
+        self.assertTrue(School.objects.filter(id=self.school2_state1.id).exists())
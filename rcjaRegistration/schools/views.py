@@ -17,6 +17,7 @@ from django.contrib.contenttypes.models import ContentType
 
 from users.models import User
 from .models import School, Campus, SchoolAdministrator
+from .merge import SchoolMerge
 
 from regions.utils import getRegionsLookup
 
@@ -146,200 +147,27 @@ def adminMergeSchools(request, school1ID, school2ID):
     if not request.user.is_superuser:
         raise PermissionDenied("No permission on selected schools")
 
-    eventAttendeeChanges = []
-    campusChanges = []
-    schoolAdministratorChanges = []
-    invoiceChanges = []
-
+    merge = None
     validated = False
     if request.method == 'POST':
         # Create Post version of form
         form = AdminSchoolsMergeForm(request.POST)
         if form.is_valid():
+            merge = SchoolMerge(
+                school1,
+                school2,
+                keepExistingCampuses=form.cleaned_data['keepExistingCampuses'],
+                school1NewCampusName=form.cleaned_data['school1NewCampusName'],
+                school2NewCampusName=form.cleaned_data['school2NewCampusName'],
+            )
+
             try:
-                with transaction.atomic():
-                    keepExistingCampuses = form.cleaned_data['keepExistingCampuses']
-                    # Create new campuses
-                    campus1Name = form.cleaned_data['school1NewCampusName']
-                    if campus1Name:
-                        try:
-                            school1NewCampus = Campus.objects.get(school=school1, name=campus1Name)
-                            school1NewCampus.oldSchool = school1NewCampus.school
-                        except Campus.DoesNotExist:
-                            school1NewCampus = Campus(school=school1, name=form.cleaned_data['school1NewCampusName'])
-                            school1NewCampus.oldSchool = None
-                        school1NewCampus.full_clean()
-                        campusChanges.append(school1NewCampus)
-                    else:
-                        school1NewCampus = None
-
-                    if school1NewCampus and "merge" in request.POST:
-                        school1NewCampus.save()
-
-                    campus2Name = form.cleaned_data['school2NewCampusName']
-                    if campus2Name:
-                        try:
-                            school2NewCampus = Campus.objects.get(school=school2, name=campus2Name)
-                            school2NewCampus.oldSchool = school2NewCampus.school
-                            school2NewCampus.school = school1
-                        except Campus.DoesNotExist:
-                            school2NewCampus = Campus(school=school1, name=form.cleaned_data['school2NewCampusName'])
-                            school2NewCampus.oldSchool = None
-                        school2NewCampus.full_clean()
-                        campusChanges.append(school2NewCampus)
-                    else:
-                        school2NewCampus = None
-
-                    if school2NewCampus and "merge" in request.POST:
-                        school2NewCampus.save()
-
-                    # School 1
-                    # School administrators
-                    for school1Administrator in school1.schooladministrator_set.all():
-                        school1Administrator.oldSchool = school1Administrator.school
-
-                        school1Administrator.oldCampus = school1Administrator.campus
-                        newCampus = school1NewCampus if not keepExistingCampuses else (school1Administrator.campus or school1NewCampus)
-                        school1Administrator.campus = newCampus
-
-                        schoolAdministratorChanges.append(school1Administrator)
-
-                        if "merge" in request.POST:
-                            school1Administrator.save()
-
-                    # Invoices
-                    for invoice in school1.invoice_set.all():
-                        invoice.oldSchool = invoice.school
-                        invoice.oldCampus = invoice.campus
-
-                        if invoice.invoiceAmountInclGST_unrounded() < 0.05 and not invoice.invoicepayment_set.exists():
-                            invoice.school = None
-                            invoice.campus = None
-                        else:
-                            newCampus = school1NewCampus if not keepExistingCampuses else (invoice.campus or school1NewCampus)
-                            invoice.campus = newCampus
-
-                        invoiceChanges.append(invoice)
-
-                        if "merge" in request.POST:
-                            try:
-                                if invoice.school is None:
-                                    invoice.delete()
-                                else:
-                                    invoice.full_clean()
-                                    invoice.cache_amountGST_unrounded = None
-                                    invoice.cache_totalQuantity = None
-                                    invoice.cache_invoiceAmountExclGST_unrounded = None
-                                    invoice.cache_invoiceAmountInclGST_unrounded = None
-                                    invoice.save(skipPrePostSave=True)
-                            except ValidationError as e:
-                                raise ValidationError(f"Couldn't save invoice {invoice.invoiceNumber} because already a conflicting invoice, couldn't delete because invoice amount is not 0. Remove any invoice payments and set invoice override for anything connected to this invoice, then try again. ({e.args[0]})")
-
-                    # Event attendances
-                    for eventAttendanceParent in school1.baseeventattendance_set.all():
-                        eventAttendance = eventAttendanceParent.childObject()
-
-                        eventAttendance.oldSchool = eventAttendance.school
-
-                        eventAttendance.oldCampus = eventAttendance.campus
-                        newCampus = school1NewCampus if not keepExistingCampuses else (eventAttendance.campus or school1NewCampus)
-                        eventAttendance.campus = newCampus
-
-                        eventAttendeeChanges.append(eventAttendance)
-
-                        if "merge" in request.POST:
-                            eventAttendance.save(skipPrePostSave=True)
-
-                    # If not keeping campuses existing campuses will be deleted, add them to changes list and delete
-                    for campus in school1.campus_set.all():
-                        if campus != school1NewCampus and campus != school2NewCampus:
-                            campus.oldSchool = campus.school
-                            campus.school = school1 if keepExistingCampuses else None
-
-                            campusChanges.append(campus)
-
-                            if "merge" in request.POST:
-                                if keepExistingCampuses:
-                                    campus.save()
-                                else:
-                                    campus.delete()
-
-                    # School 2
-                    if school1 != school2:
-                        # School administrators
-                        for school2Administrator in school2.schooladministrator_set.all():
-                            school2Administrator.oldSchool = school2Administrator.school
-                            school2Administrator.school = school1
-
-                            school2Administrator.oldCampus = school2Administrator.campus
-                            newCampus = school2NewCampus if not keepExistingCampuses else (school2Administrator.campus or school2NewCampus)
-                            school2Administrator.campus = newCampus
-
-                            schoolAdministratorChanges.append(school2Administrator)
-
-                            if "merge" in request.POST:
-                                schoolAdministrator, created = SchoolAdministrator.objects.update_or_create(school=school1, user=school2Administrator.user, defaults={'campus': newCampus})
-
-                        # Invoices
-                        for invoice in school2.invoice_set.all():
-                            invoice.oldSchool = invoice.school
-                            invoice.oldCampus = invoice.campus
-
-                            if invoice.invoiceAmountInclGST_unrounded() < 0.05 and not invoice.invoicepayment_set.exists():
-                                invoice.school = None
-                                invoice.campus = None
-                            else:
-                                invoice.school = school1
-                                newCampus = school2NewCampus if not keepExistingCampuses else (invoice.campus or school2NewCampus)
-                                invoice.campus = newCampus
-
-                            invoiceChanges.append(invoice)
-
-                            if "merge" in request.POST:
-                                try:
-                                    if invoice.school is None:
-                                        invoice.delete()
-                                    else:
-                                        invoice.full_clean()
-                                        invoice.cache_amountGST_unrounded = None
-                                        invoice.cache_totalQuantity = None
-                                        invoice.cache_invoiceAmountExclGST_unrounded = None
-                                        invoice.cache_invoiceAmountInclGST_unrounded = None
-                                        invoice.save(skipPrePostSave=True)
-                                except ValidationError as e:
-                                    raise ValidationError(f"Couldn't save invoice {invoice.invoiceNumber} because already a conflicting invoice, couldn't delete because invoice amount is not 0. Remove any invoice payments and set invoice override for anything connected to this invoice, then try again. ({e.args[0]})")
-
-                        # Event attendances
-                        for eventAttendanceParent in school2.baseeventattendance_set.all():
-                            eventAttendance = eventAttendanceParent.childObject()
-
-                            eventAttendance.oldSchool = eventAttendance.school
-                            eventAttendance.school = school1
-
-                            eventAttendance.oldCampus = eventAttendance.campus
-                            newCampus = school2NewCampus if not keepExistingCampuses else (eventAttendance.campus or school2NewCampus)
-                            eventAttendance.campus = newCampus
-
-                            eventAttendeeChanges.append(eventAttendance)
-
-                            if "merge" in request.POST:
-                                eventAttendance.save(skipPrePostSave=True)
-
-                        # If not keeping campuses existing campuses will be deleted, add them to changes list and delete
-                        for campus in school2.campus_set.all():
-                            if campus != school2NewCampus:
-                                campus.oldSchool = campus.school
-                                campus.school = school1 if keepExistingCampuses else None
-
-                                campusChanges.append(campus)
-                                if "merge" in request.POST:
-                                    if keepExistingCampuses:
-                                        campus.save()
-                                    else:
-                                        campus.delete()
-                        
+                if "merge" in request.POST:
+                    with transaction.atomic():
+                        merge.apply()
+
                         # Delete school 2
-                        if "merge" in request.POST:
+                        if school1 != school2:
                             LogEntry.objects.log_action(
                                 user_id = request.user.id,
                                 content_type_id = ContentType.objects.get_for_model(School).pk,
@@ -349,14 +177,13 @@ def adminMergeSchools(request, school1ID, school2ID):
                             )
                             school2.delete()
 
-                    validated = True
-                    if "merge" in request.POST:
-                        # raise ValidationError('To stop execution to DB')
-                        return redirect(reverse('admin:schools_school_changelist'))
-                        
+                    return redirect(reverse('admin:schools_school_changelist'))
+
+                merge.validate()
+                validated = True
 
             except ValidationError as e:
-                form.add_error(None, e.args[0])
+                form.add_error(None, e.messages)
 
     else:
         form = AdminSchoolsMergeForm()
@@ -366,10 +193,15 @@ def adminMergeSchools(request, school1ID, school2ID):
         'school1': school1,
         'school2': school2,
         'validated': validated,
-        'campusChanges': campusChanges,
-        'schoolAdministratorChanges': schoolAdministratorChanges,
-        "invoiceChanges": invoiceChanges,
-        'eventAttendeeChanges': eventAttendeeChanges,
     }
 
+    # Preview of the changes, counts of objects for each current and new school and campus
+    if validated:
+        context.update({
+            'campusChanges': merge.campusChanges(),
+            'schoolAdministratorChanges': merge.schoolAdministratorChanges(),
+            'invoiceChanges': merge.invoiceChanges(),
+            'eventAttendeeChanges': merge.eventAttendeeChanges(),
+        })
+
     return render(request, 'schools/adminMergeSchools.html', context)
@@ -1,9 +1,10 @@
-from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
+from django import forms
 
 from schools.models import Campus
+from common.referenceData import referenceData
 
 from .models import Team, Student, HardwarePlatform, SoftwarePlatform
-from .forms import TeamForm, StudentForm
+from .forms import TeamForm, StudentForm, TeamNameForm
 
 import csv
 import io
@@ -85,8 +86,8 @@ def optionsTable(event, user):
     if campusFieldRelevant(user):
         columns.append((CAMPUS_HEADER, [campus.name for campus in campusOptions(user)]))
 
-    columns.append((HARDWARE_PLATFORM_HEADER, [hardwarePlatform.name for hardwarePlatform in HardwarePlatform.objects.all()]))
-    columns.append((SOFTWARE_PLATFORM_HEADER, [softwarePlatform.name for softwarePlatform in SoftwarePlatform.objects.all()]))
+    columns.append((HARDWARE_PLATFORM_HEADER, [hardwarePlatform.name for hardwarePlatform in referenceData(HardwarePlatform)]))
+    columns.append((SOFTWARE_PLATFORM_HEADER, [softwarePlatform.name for softwarePlatform in referenceData(SoftwarePlatform)]))
     columns.append((GENDER_HEADER, genderOptions()))
 
     headers = [header for header, options in columns]
@@ -111,7 +112,7 @@ def readUploadedFile(uploadedFile):
 # *****Validation*****
 
 class ImportedTeam:
-    # Holds one row of the csv, its validation errors and the unsaved forms used to create the team
+    # Holds one row of the csv, its validation errors and the unsaved team and student forms used to create the team
     # The row is displayed like the team table on the event details page, so errors are grouped by the cell they belong in
     def __init__(self, rowNumber, showCampus):
         self.rowNumber = rowNumber
@@ -131,7 +132,7 @@ class ImportedTeam:
         self.softwarePlatformErrors = []
         self.studentErrors = []
 
-        self.teamForm = None
+        self.team = None
         self.studentForms = []
 
     @property
@@ -196,17 +197,34 @@ def matchHeaders(event, user, headerRow):
 
     return columnIndexes, errors
 
-def resolveByName(queryset, name, fieldLabel, errors):
+class OptionIndex:
+    # Options for a restricted column, loaded once so rows are matched without a query for each cell
+    def __init__(self, queryset):
+        self.options = list(queryset)
+        self.byName = {}
+
+        # Case-folded so names match regardless of case, same as the iexact lookup on the add team form
+        for option in self.options:
+            self.byName.setdefault(option.name.casefold(), []).append(option)
+
+        self.validOptions = ', '.join([str(option) for option in self.options]) or 'none available'
+
+    def matches(self, name):
+        return self.byName.get(name.casefold(), [])
+
+def resolveByName(options, name, fieldLabel, errors):
     # Returns (object, lookupFailed)
     if not name:
         return None, False
 
-    try:
-        return queryset.get(name__iexact=name), False
-    except ObjectDoesNotExist:
-        validOptions = ', '.join([str(option) for option in queryset]) or 'none available'
-        errors.append(f"{fieldLabel}: '{name}' is not a valid option. Valid options are: {validOptions}.")
-    except MultipleObjectsReturned:
+    matches = options.matches(name)
+
+    if len(matches) == 1:
+        return matches[0], False
+
+    if not matches:
+        errors.append(f"{fieldLabel}: '{name}' is not a valid option. Valid options are: {options.validOptions}.")
+    else:
         errors.append(f"{fieldLabel}: '{name}' matches more than one option. Please contact the event coordinator.")
 
     return None, True
@@ -244,26 +262,14 @@ class RegistrationLimits:
     def __init__(self, event, user):
         self.event = event
         self.user = user
-        self.filterDict = event.getBaseEventAttendanceFilterDict(user)
 
-        self.schoolCount = event.baseeventattendance_set.filter(**self.filterDict).count()
-        self.totalCount = event.baseeventattendance_set.count()
+        counts = event.registrationCounts(user)
+        self.schoolCount = counts.forSchool
+        self.totalCount = counts.total
 
         self.availableDivisions = {availableDivision.division_id: availableDivision for availableDivision in event.availabledivision_set.all()}
-        self.divisionSchoolCounts = {}
-        self.divisionTotalCounts = {}
-
-    def divisionSchoolCount(self, availableDivision):
-        if availableDivision.division_id not in self.divisionSchoolCounts:
-            self.divisionSchoolCounts[availableDivision.division_id] = availableDivision.division.baseeventattendance_set.filter(**self.filterDict).count()
-
-        return self.divisionSchoolCounts[availableDivision.division_id]
-
-    def divisionTotalCount(self, availableDivision):
-        if availableDivision.division_id not in self.divisionTotalCounts:
-            self.divisionTotalCounts[availableDivision.division_id] = availableDivision.division.baseeventattendance_set.filter(event=self.event).count()
-
-        return self.divisionTotalCounts[availableDivision.division_id]
+        self.divisionSchoolCounts = counts.divisionForSchool
+        self.divisionTotalCounts = counts.divisionTotals
 
     def checkAndCount(self, division, errors):
         event = self.event
@@ -286,13 +292,13 @@ class RegistrationLimits:
             return
 
         if availableDivision.division_maxRegistrationsPerSchool is not None:
-            if self.divisionSchoolCount(availableDivision) >= availableDivision.division_maxRegistrationsPerSchool:
+            if self.divisionSchoolCounts[availableDivision.division_id] >= availableDivision.division_maxRegistrationsPerSchool:
                 errors.append(f'{division}: Max {registrationName}s for school for this event division reached. Contact the organiser if you want to register more {registrationName}s in this division.')
 
             self.divisionSchoolCounts[availableDivision.division_id] += 1
 
         if availableDivision.division_maxRegistrationsForDivision is not None:
-            if self.divisionTotalCount(availableDivision) >= availableDivision.division_maxRegistrationsForDivision:
+            if self.divisionTotalCounts[availableDivision.division_id] >= availableDivision.division_maxRegistrationsForDivision:
                 errors.append(f'{division}: Max {registrationName}s for this event division reached. Contact the organiser if you want to register more {registrationName}s in this division.')
 
             self.divisionTotalCounts[availableDivision.division_id] += 1
@@ -304,11 +310,11 @@ def validateRow(event, user, importedTeam, cells, columnIndexes, options, limits
             return ''
         return cells[index].strip()
 
-    # Resolve names to primary keys because the form fields are model choice fields
+    # Resolve names to objects using the preloaded options
     lookupFailedFields = []
 
-    def resolveCell(fieldName, header, queryset):
-        value, lookupFailed = resolveByName(queryset, cellValue(header), header, importedTeam.errorList(fieldName))
+    def resolveCell(fieldName, header, fieldOptions):
+        value, lookupFailed = resolveByName(fieldOptions, cellValue(header), header, importedTeam.errorList(fieldName))
         if lookupFailed:
             lookupFailedFields.append(fieldName)
         return value
@@ -328,22 +334,36 @@ def validateRow(event, user, importedTeam, cells, columnIndexes, options, limits
     importedTeam.hardwarePlatform = hardwarePlatform or cellValue(HARDWARE_PLATFORM_HEADER)
     importedTeam.softwarePlatform = softwarePlatform or cellValue(SOFTWARE_PLATFORM_HEADER)
 
-    # School and event are disabled fields on the form so are set from the form initial, same as the add team form
-    teamForm = TeamForm(
-        data = {
-            'name': cellValue(TEAM_NAME_HEADER),
-            'division': division.id if division else None,
-            'campus': campus.id if campus else None,
-            'hardwarePlatform': hardwarePlatform.id if hardwarePlatform else None,
-            'softwarePlatform': softwarePlatform.id if softwarePlatform else None,
-        },
-        user = user,
+    # Name validated with the same form field and messages as the add team form
+    nameForm = TeamNameForm(data={'name': importedTeam.name})
+    nameForm.is_valid()
+    for fieldName, message in formErrors(nameForm):
+        importedTeam.nameErrors.append(message)
+
+    # Checked against the names loaded once for the event rather than running Team.clean for each row
+    if importedTeam.name in options['existingTeamNames']:
+        importedTeam.nameErrors.append(f"{TEAM_NAME_HEADER}: Team with this name in this event already exists")
+
+    for fieldName, header, value in (
+        ('division', DIVISION_HEADER, division),
+        ('hardwarePlatform', HARDWARE_PLATFORM_HEADER, hardwarePlatform),
+        ('softwarePlatform', SOFTWARE_PLATFORM_HEADER, softwarePlatform),
+    ):
+        if value is None and fieldName not in lookupFailedFields:
+            importedTeam.errorList(fieldName).append(f"{header}: {forms.Field.default_error_messages['required']}")
+
+    # School and mentor are set from the user, same as the disabled fields on the add team form
+    # Options are already restricted to this event and school, so the checks in BaseEventAttendance.clean are covered
+    importedTeam.team = Team(
         event = event,
+        division = division,
+        campus = campus,
+        hardwarePlatform = hardwarePlatform,
+        softwarePlatform = softwarePlatform,
+        name = importedTeam.name,
+        school = user.currentlySelectedSchool,
+        mentorUser = user,
     )
-    teamForm.is_valid()
-    for fieldName, message in formErrors(teamForm, skipFields=lookupFailedFields):
-        importedTeam.errorList(fieldName).append(message)
-    importedTeam.teamForm = teamForm
 
     # Students
     for studentNumber in range(1, event.maxMembersPerTeam + 1):
@@ -394,12 +414,15 @@ def parseAndValidateCSV(event, user, csvText):
     if not dataRows:
         return [], ['The file does not contain any teams.']
 
+    # Load everything rows are validated against up front so the number of queries doesn't grow with the file
     limits = RegistrationLimits(event, user)
     options = {
-        'division': divisionOptions(event, user),
-        'campus': campusOptions(user),
-        'hardwarePlatform': HardwarePlatform.objects.all(),
-        'softwarePlatform': SoftwarePlatform.objects.all(),
+        'division': OptionIndex(divisionOptions(event, user)),
+        'campus': OptionIndex(campusOptions(user)),
+        # Read from the database rather than the reference data cache, so teams are never saved with a platform that was just deleted
+        'hardwarePlatform': OptionIndex(HardwarePlatform.objects.all()),
+        'softwarePlatform': OptionIndex(SoftwarePlatform.objects.all()),
+        'existingTeamNames': set(Team.objects.filter(event=event).values_list('name', flat=True)),
     }
     importedTeams = []
     seenNames = {}
@@ -408,8 +431,8 @@ def parseAndValidateCSV(event, user, csvText):
         importedTeam = ImportedTeam(rowNumber, CAMPUS_HEADER in columnIndexes)
         validateRow(event, user, importedTeam, cells, columnIndexes, options, limits)
 
-        # Team.clean only checks for duplicate names already in the database
-        name = importedTeam.teamForm.data.get('name')
+        # Names already in the database are checked in validateRow
+        name = importedTeam.name
         if name:
             if name in seenNames:
                 importedTeam.nameErrors.append(f'{TEAM_NAME_HEADER}: Duplicate of the team on row {seenNames[name]} of this file.')
@@ -422,3 +445,34 @@ def parseAndValidateCSV(event, user, csvText):
 
 def hasErrors(importedTeams):
     return any(importedTeam.errors for importedTeam in importedTeams)
+
+# *****Create*****
+
+def createImportedTeams(importedTeams):
+    # Creates the teams and students from a validated csv, must be called in a transaction
+    # Teams are saved normally so their save hooks run, invoice recalculation is deferred until the transaction commits
+    teams = []
+    for importedTeam in importedTeams:
+        team = importedTeam.team
+        team.csv_imported = True
+        team.save()
+        teams.append(team)
+
+    students = []
+    for team, importedTeam in zip(teams, importedTeams):
+        for studentForm in importedTeam.studentForms:
+            student = studentForm.save(commit=False)
+            student.team = team
+            students.append(student)
+
+    Student.objects.bulk_create(students)
+
+    # Student save hooks were skipped, so recalculate each affected invoice once now the students exist
+    invoiceTeams = {}
+    for team in teams:
+        invoiceTeams.setdefault((team.school_id, team.campus_id, team.mentorUser_id), team)
+
+    for team in invoiceTeams.values():
+        team.createUpdateInvoices()
+
+    return teams
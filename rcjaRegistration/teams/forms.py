@@ -22,5 +22,15 @@ class TeamForm(BaseEventAttendanceFormInitMixin, forms.ModelForm):
         for field in ['hardwarePlatform', 'softwarePlatform']:
             self.fields[field].required = True
 
+class TeamNameForm(forms.Form):
+    # Team name field from the add team form, used to validate imported rows without the querysets of TeamForm
+    name = Team._meta.get_field('name').formfield()
+
+    def clean_name(self):
+        # The allowed characters validator is on the model field, which a model form runs in full_clean
+        name = self.cleaned_data['name']
+        Team._meta.get_field('name').run_validators(name)
+        return name
+
 class ImportTeamsCSVForm(forms.Form):
     csvFile = forms.FileField(label='CSV file', widget=forms.ClearableFileInput(attrs={'accept': '.csv'}))
@@ -187,6 +187,8 @@ class Student(SaveDeleteMixin, models.Model):
 
     # *****Save & Delete Methods*****
 
+    trackedFields = ['team']
+
     def preSave(self):
         self.setPreviousTeamValue()
 
@@ -202,15 +204,10 @@ class Student(SaveDeleteMixin, models.Model):
 
     # Check if team changed and record previous team on object
     def setPreviousTeamValue(self):
-        self.teamValueChanged = False
-        try:
-            self.previousTeam = Student.objects.get(pk=self.pk).team
-
-            if self.previousTeam != self.team:
-                self.teamValueChanged = True
+        self.teamValueChanged = self.previousTrackedValues() is not None and self.hasChanged('team')
 
-        except Student.DoesNotExist:
-            pass
+        if self.teamValueChanged:
+            self.previousTeam = self.previousInstance().team
 
     # *****Get Methods*****
 
@@ -232,9 +229,9 @@ class Student(SaveDeleteMixin, models.Model):
                 return studentNumber
             studentNumber += 1
 
-    # List of all csv headers for instance of this model
-    def csvHeaders(self):
-        studentNumber = self.getStudentNumber()
+    # List of csv headers for a student number
+    @classmethod
+    def csvHeadersForStudentNumber(cls, studentNumber):
         return [
             {'header': f'Member {studentNumber} First Name', 'order': f'{studentNumber}a'},
             {'header': f'Member {studentNumber} Last Name', 'order': f'{studentNumber}b'},
@@ -242,6 +239,17 @@ class Student(SaveDeleteMixin, models.Model):
             {'header': f'Member {studentNumber} Gender', 'order': f'{studentNumber}d'},
         ]
 
+    # List of all csv headers for students in queryset, from the largest number of students on a team
+    @classmethod
+    def csvHeadersForQueryset(cls, queryset):
+        maxStudents = queryset.order_by().values('team').annotate(numberStudents=models.Count('pk')).aggregate(models.Max('numberStudents'))['numberStudents__max'] or 0
+
+        headers = []
+        for studentNumber in range(1, maxStudents + 1):
+            headers += cls.csvHeadersForStudentNumber(studentNumber)
+
+        return headers
+
     # Dictionary of values for each header
     def csvValues(self):
         studentNumber = self.getStudentNumber()
@@ -1,9 +1,14 @@
 from common.baseTests import createStates, createUsers, createSchools, createEvents, createTeams, createQuestionsAndResponses
-from django.http import HttpRequest
+from django.http import HttpRequest, HttpResponse
 from django.urls import reverse
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from teams.models import Student
+from teams.models import Team, Student
+
+import csv
+import io
 
 class TestAdminCSVExport_Team(TestCase):
     @classmethod
@@ -25,6 +30,8 @@ class TestAdminCSVExport_Team(TestCase):
 
     def test_export_as_csv_correctHeaders(self):
         response = self.client.post(reverse('admin:teams_team_changelist'), {'action': 'export_as_csv', '_selected_action': [self.state1_event1_team1.pk]})
+        # Streamed content can only be read once, so read it into a response assertContains can check repeatedly
+        response = HttpResponse(response.getvalue())
         self.assertContains(response, 'Name')
         self.assertContains(response, 'Event')
         self.assertContains(response, 'Division')
@@ -41,6 +48,8 @@ class TestAdminCSVExport_Team(TestCase):
 
     def test_export_as_csv_correctValues(self):
         response = self.client.post(reverse('admin:teams_team_changelist'), {'action': 'export_as_csv', '_selected_action': [self.state1_event1_team1.pk]})
+        # Streamed content can only be read once, so read it into a response assertContains can check repeatedly
+        response = HttpResponse(response.getvalue())
         self.assertContains(response, 'Team 1')
         self.assertContains(response, 'State 1 Open Competition')
         self.assertContains(response, 'Division 3')
@@ -50,3 +59,87 @@ class TestAdminCSVExport_Team(TestCase):
         self.assertContains(response, 'Other')
         self.assertContains(response, 'True')
         self.assertContains(response, 'False')
+
+class TestAdminCSVExportStreaming_Team(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        createStates(cls)
+        createUsers(cls)
+        createSchools(cls)
+        createEvents(cls)
+        createTeams(cls)
+        createQuestionsAndResponses(cls)
+
+    def setUp(self):
+        self.client.login(request=HttpRequest(), username=self.email_user_state1_super1, password=self.password)
+
+    def createTeams(self, numberTeams, numberStudents):
+        for i in range(numberTeams):
+            team = Team.objects.create(
+                event=self.state1_openCompetition,
+                division=self.division3,
+                mentorUser=self.user_state1_school1_mentor1,
+                school=self.school1_state1,
+                name=f'Export Team {i}',
+                hardwarePlatform=self.hardwarePlatform,
+                softwarePlatform=self.softwarePlatform,
+            )
+            for j in range(numberStudents):
+                Student.objects.create(team=team, firstName=f'Student{j}', lastName="Smith", yearLevel=5, gender="other")
+
+    def export(self):
+        response = self.client.post(reverse('admin:teams_team_changelist'), {'action': 'export_as_csv', '_selected_action': list(Team.objects.values_list('pk', flat=True))})
+        self.assertTrue(response.streaming)
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def testStudentHeadersFromLargestTeam(self):
+        self.createTeams(1, 3)
+        rows = self.export()
+
+        self.assertIn('Member 3 Gender', rows[0])
+        self.assertNotIn('Member 4 First Name', rows[0])
+
+        exportTeamRow = [row for row in rows if 'Export Team 0' in row][0]
+        self.assertEqual(exportTeamRow[rows[0].index('Member 3 First Name')], 'Student2')
+
+    def testTeamWithoutStudentsHasBlankStudentValues(self):
+        self.createTeams(1, 2)
+        rows = self.export()
+
+        team1Row = [row for row in rows if 'Team 1' in row][0]
+        self.assertEqual(team1Row[rows[0].index('Member 1 First Name')], '')
+
+    def testNumQueriesConstantAsStudentsIncrease(self):
+        self.createTeams(5, 1)
+        with CaptureQueriesContext(connection) as initialQueries:
+            self.export()
+
+        for team in Team.objects.filter(name__startswith='Export Team'):
+            for j in range(3):
+                Student.objects.create(team=team, firstName=f'Extra{j}', lastName="Smith", yearLevel=5, gender="other")
+
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.export()
+
+        self.assertIn('Member 4 First Name', rows[0])
+        self.assertEqual(len(queries), len(initialQueries))
+
+    def testNumQueriesConstantAsTeamsIncrease(self):
+        self.createTeams(2, 2)
+        with CaptureQueriesContext(connection) as initialQueries:
+            self.export()
+
+        Team.objects.create(
+            event=self.state1_openCompetition,
+            division=self.division4,
+            mentorUser=self.user_state1_independent_mentor5,
+            name='Independent Export Team',
+            hardwarePlatform=self.hardwarePlatform,
+            softwarePlatform=self.softwarePlatform,
+        )
+        self.createTeams(20, 4)
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.export()
+
+        self.assertEqual(len(rows), Team.objects.count() + 1)
+        self.assertEqual(len(queries), len(initialQueries))
@@ -1,13 +1,21 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.http import HttpRequest
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
 
 from unittest.mock import patch
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from common.baseTests import createStates, createUsers, createSchools, createEvents, createTeams
+from common.referenceData import referenceData
 
-from teams.models import Team, Student
+from teams.models import Team, Student, HardwarePlatform
+from events.models import EventRegistrationCounts
+from teams import csvImport
+from invoices.models import Invoice
 
 # Column names come from the model field verbose names
 # Header for a school mentor on an event with the default four members per team
@@ -46,7 +54,10 @@ class ImportCSVBase:
         createUsers(cls)
         createSchools(cls)
         createEvents(cls)
-        createTeams(cls)
+
+        # Run the invoice recalculation that would happen when the transaction commits
+        with cls.captureOnCommitCallbacks(execute=True):
+            createTeams(cls)
 
     def setUp(self):
         self.event = self.state1_openCompetition
@@ -362,6 +373,17 @@ class TestImportCSVPreview(ImportCSVBase, TestCase):
         self.assertContains(response, 'Hardware platform: &#x27;Not A Platform&#x27; is not a valid option')
         self.assertImportButtonNotShown(response)
 
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}, CACHE_SHARED=True)
+    def testHardwarePlatformReadFromDatabase(self):
+        cache.clear()
+        referenceData(HardwarePlatform)
+
+        # Update doesn't invalidate the cached platforms, like a rename handled by a worker not sharing the cache
+        HardwarePlatform.objects.filter(name='HW 1').update(name='HW Renamed')
+
+        response = self.preview(buildCSV(HEADER, 'Team 10,Division 3,,HW 1,HW Renamed,Alice,Smith,7,Female'))
+        self.assertContains(response, 'Hardware platform: &#x27;HW 1&#x27; is not a valid option')
+
     def testUnknownCampus(self):
         response = self.preview(buildCSV(HEADER, 'Team 10,Division 3,Not A Campus,HW 1,HW 1,Alice,Smith,7,Female'))
         self.assertContains(response, 'Campus: &#x27;Not A Campus&#x27; is not a valid option')
@@ -762,16 +784,123 @@ class TestImportCSVCreate(ImportCSVBase, TestCase):
             'Team 11,Division 3,,HW 1,HW 1,Bob,Smith,7,Male',
         )
 
-        # Fail on the second team so the first team and its student must be rolled back
-        originalSave = Team.save
-        def failOnSecondTeam(team, *args, **kwargs):
-            if team.name == 'Team 11':
-                raise ValueError('Simulated failure')
-            return originalSave(team, *args, **kwargs)
-
-        with patch.object(Team, 'save', failOnSecondTeam):
+        # Fail after the teams are inserted so the teams must be rolled back
+        with patch.object(Student.objects, 'bulk_create', side_effect=ValueError('Simulated failure')):
             with self.assertRaises(ValueError):
                 self.importTeams(content)
 
         self.assertEqual(teamCount, Team.objects.count())
         self.assertEqual(studentCount, Student.objects.count())
+
+    def testInvoiceTotalsUpdated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.importTeams(buildCSV(
+                HEADER,
+                'Team 10,Division 3,,HW 1,HW 1,Alice,Smith,7,Female',
+                'Team 11,Division 3,,HW 1,HW 1,Bob,Smith,7,Male',
+            ))
+
+        invoice = Invoice.objects.get(event=self.event, school=self.school1_state1)
+        self.assertEqual(invoice.invoiceAmountInclGST(), Team.objects.filter(event=self.event, school=self.school1_state1).count() * 50)
+
+    def testInvoiceCreatedForIndependentMentor(self):
+        self.loginIndependentMentor5()
+
+        self.importTeams(buildCSV(HEADER_NO_CAMPUS, VALID_ROW_NO_CAMPUS))
+
+        invoice = Invoice.objects.get(event=self.event, invoiceToUser=self.user_state1_independent_mentor5, school=None)
+        self.assertEqual(invoice.invoiceAmountInclGST(), 50)
+
+    def testInvoiceRecalculatedOnce(self):
+        content = buildCSV(
+            HEADER,
+            'Team 10,Division 3,,HW 1,HW 1,Alice,Smith,7,Female',
+            'Team 11,Division 3,,HW 1,HW 1,Bob,Smith,7,Male',
+        )
+
+        with patch.object(Invoice, 'calculateAndSaveAllTotals', autospec=True, side_effect=Invoice.calculateAndSaveAllTotals) as mockCalculate:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.importTeams(content)
+
+        self.assertEqual(mockCalculate.call_count, 1)
+        self.assertTrue(Team.objects.filter(event=self.event, name='Team 11').exists())
+
+    def testRegistrationCountersUpdated(self):
+        counts = EventRegistrationCounts(self.event)
+
+        self.importTeams(buildCSV(
+            HEADER,
+            'Team 10,Division 3,,HW 1,HW 1,Alice,Smith,7,Female',
+            'Team 11,Division 3,,HW 1,HW 1,Bob,Smith,7,Male',
+        ))
+
+        self.assertEqual(EventRegistrationCounts(self.event).total, counts.total + 2)
+
+class TestImportCSVNumQueries(ImportCSVBase, TestCase):
+    def importedTeams(self, numberTeams):
+        rows = [f'Bulk Team {i},Division {3 + i % 2},,HW 1,HW 1,Alice,Smith,7,Female' for i in range(numberTeams)]
+        importedTeams, fileErrors = csvImport.parseAndValidateCSV(self.event, self.user_state1_school1_mentor1, buildCSV(HEADER, *rows))
+
+        self.assertEqual(fileErrors, [])
+        self.assertFalse(csvImport.hasErrors(importedTeams))
+
+        return importedTeams
+
+    def testImport500Teams(self):
+        importedTeams = self.importedTeams(500)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                csvImport.createImportedTeams(importedTeams)
+
+        # Each team save takes a fixed number of queries, students are inserted together and each invoice is recalculated once
+        self.assertLessEqual(len(queries), 500 * 7)
+
+        self.assertEqual(Team.objects.filter(event=self.event, name__startswith='Bulk Team').count(), 500)
+        self.assertEqual(Student.objects.filter(team__event=self.event, team__name__startswith='Bulk Team').count(), 500)
+
+        invoice = Invoice.objects.get(event=self.event, school=self.school1_state1)
+        self.assertEqual(invoice.invoiceAmountInclGST(), Team.objects.filter(event=self.event, school=self.school1_state1).count() * 50)
+
+class TestImportCSVValidationNumQueries(ImportCSVBase, TestCase):
+    def parse(self, rows):
+        return csvImport.parseAndValidateCSV(self.event, self.user_state1_school1_mentor1, buildCSV(HEADER, *rows))
+
+    def numQueries(self, rows):
+        with CaptureQueriesContext(connection) as queries:
+            self.parse(rows)
+
+        return len(queries)
+
+    def testNumQueriesConstantForValidRows(self):
+        smallFile = [f'Team {10 + i},Division {3 + i % 2},Campus 1,HW 1,HW 1,Alice,Smith,7,Female' for i in range(5)]
+        largeFile = [f'Team {10 + i},Division {3 + i % 2},Campus 1,HW 1,HW 1,Alice,Smith,7,Female' for i in range(200)]
+
+        self.assertEqual(self.numQueries(smallFile), self.numQueries(largeFile))
+
+    def testNumQueriesConstantForInvalidRows(self):
+        smallFile = ['Team 1,Not A Division,Not A Campus,Not A Platform,HW 1,Alice,Smith,7,Female' for i in range(5)]
+        largeFile = ['Team 1,Not A Division,Not A Campus,Not A Platform,HW 1,Alice,Smith,7,Female' for i in range(200)]
+
+        self.assertEqual(self.numQueries(smallFile), self.numQueries(largeFile))
+
+    def testTeamBuiltFromRow(self):
+        importedTeams, fileErrors = self.parse(['Team 10,division 4,campus 1,hw 1,HW 1,Alice,Smith,7,Female'])
+        team = importedTeams[0].team
+
+        self.assertEqual(team.name, 'Team 10')
+        self.assertEqual(team.event, self.event)
+        self.assertEqual(team.division, self.division4)
+        self.assertEqual(team.campus, self.campus1_school1)
+        self.assertEqual(team.hardwarePlatform, self.hardwarePlatform)
+        self.assertEqual(team.school, self.school1_state1)
+        self.assertEqual(team.mentorUser, self.user_state1_school1_mentor1)
+        self.assertIsNone(team.pk)
+
+    def testBlankRequiredOptions(self):
+        importedTeams, fileErrors = self.parse(['Team 10,,,,,Alice,Smith,7,Female'])
+
+        self.assertEqual(importedTeams[0].divisionErrors, ['Division: This field is required.'])
+        self.assertEqual(importedTeams[0].hardwarePlatformErrors, ['Hardware platform: This field is required.'])
+        self.assertEqual(importedTeams[0].softwarePlatformErrors, ['Software platform: This field is required.'])
+        self.assertEqual(importedTeams[0].campusErrors, [])
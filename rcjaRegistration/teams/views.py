@@ -14,7 +14,7 @@ import datetime
 from .models import Student, Team
 from events.models import Event, AvailableDivision
 
-from events.views import CreateEditBaseEventAttendance, mentorEventAttendanceAccessPermissions, getDivisionsMaxReachedWarnings, getAvailableToCopyTeams, createPermissionForEvent, checkEventLimitsReached
+from events.views import CreateEditBaseEventAttendance, mentorEventAttendanceAccessPermissions, getDivisionsMaxReachedWarnings, getAvailableToCopyTeams, createPermissionForEvent, checkEventLimitsReached, eventLimitsReached, lockedRegistrationLimitErrors
 
 from . import csvImport
 
@@ -144,17 +144,30 @@ class CreateEditTeam(CreateEditBaseEventAttendance):
             if newTeam and sourceTeam:
                 team.copiedFrom = sourceTeam
 
-            # Save team
-            team.save()
+            # Save team and students together so the invoice is recalculated once on commit
+            limitErrors = []
+            with transaction.atomic():
+                # Check limits again while registrations are locked, so concurrent registrations can't exceed them
+                if team.hasChanged('division'):
+                    limitErrors = lockedRegistrationLimitErrors(event, request.user, team.division_id, newTeam)
 
-            # Save student formset
-            if newTeam:
-                # This is needed because it is possible to create teams and add students in one request
-                formset.instance = team
-            formset.save()
+                if not limitErrors:
+                    # Save team
+                    team.save()
+
+                    # Save student formset
+                    if newTeam:
+                        # This is needed because it is possible to create teams and add students in one request
+                        formset.instance = team
+                    formset.save()
+
+            if limitErrors:
+                for error in limitErrors:
+                    form.add_error(None, error)
+                return render(request, 'teams/createEditTeam.html', {'form': form, 'formset':formset, 'event':event, 'team':None if newTeam else team, 'sourceTeam': sourceTeam, 'divisionsMaxReachedWarnings': getDivisionsMaxReachedWarnings(event, request.user)})
 
             # Redirect if add another in response
-            if 'add_text' in request.POST and newTeam and not (event.maxEventRegistrationsForSchoolReached(request.user) or event.maxEventRegistrationsTotalReached()):
+            if 'add_text' in request.POST and newTeam and not eventLimitsReached(event, request.user):
                 return redirect(reverse('teams:create', kwargs = {"eventID":event.id}))
 
             if sourceTeam:
@@ -270,9 +283,17 @@ class ImportTeamsCSV(CreateEditBaseEventAttendance):
         # The csv is re-posted from the preview page so it must be validated again before anything is created
         csvText = request.POST.get('csvText', '')
 
-        importedTeams, fileErrors = csvImport.parseAndValidateCSV(event, request.user, csvText)
+        # All or nothing, so a failure part way through does not leave a partially imported event
+        # Registrations are locked while validating, so the limits are checked against counts that can't change before the teams are created
+        with transaction.atomic():
+            event.lockRegistrations()
+            importedTeams, fileErrors = csvImport.parseAndValidateCSV(event, request.user, csvText)
 
-        if fileErrors or not importedTeams or csvImport.hasErrors(importedTeams):
+            valid = importedTeams and not fileErrors and not csvImport.hasErrors(importedTeams)
+            if valid:
+                csvImport.createImportedTeams(importedTeams)
+
+        if not valid:
             return render(request, 'teams/importTeamsCSV.html', self.context(
                 request,
                 event,
@@ -282,16 +303,4 @@ class ImportTeamsCSV(CreateEditBaseEventAttendance):
                 showImportButton = False,
             ))
 
-        # All or nothing, so a failure part way through does not leave a partially imported event
-        with transaction.atomic():
-            for importedTeam in importedTeams:
-                team = importedTeam.teamForm.save(commit=False)
-                team.csv_imported = True
-                team.save()
-
-                for studentForm in importedTeam.studentForms:
-                    student = studentForm.save(commit=False)
-                    student.team = team
-                    student.save()
-
         return redirect(reverse('events:details', kwargs={'eventID': event.id}))
@@ -72,10 +72,14 @@ class QuestionResponse(models.Model):
 
     # *****CSV export methods*****
 
-    # List of all csv headers for instance of this model
-    def csvHeaders(self):
+    # Loaded with each response for csvValues
+    csvSelectRelated = ['question']
+
+    # List of all csv headers for responses in queryset, one for each question
+    @classmethod
+    def csvHeadersForQueryset(cls, queryset):
         return [
-            {'header': self.question.shortTitle, 'order': self.question.shortTitle},
+            {'header': shortTitle, 'order': shortTitle} for shortTitle in queryset.order_by().values_list('question__shortTitle', flat=True).distinct()
         ]
 
     # Dictionary of values for each header
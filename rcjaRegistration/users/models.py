@@ -2,7 +2,6 @@ from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
-import django.apps as djangoApps
 from common.models import SaveDeleteMixin
 from django.core.exceptions import PermissionDenied
 from django.core.validators import RegexValidator
@@ -125,51 +124,59 @@ class User(SaveDeleteMixin, AbstractUser):
 
     # *****Save & Delete Methods*****
 
+    # Fields that affect the permissions set by updateUserPermissions
+    trackedFields = ['is_superuser', 'is_staff']
+
+    def preSave(self):
+        self.permissionFieldsChanged = any(self.hasChanged(field) for field in self.trackedFields)
+
     def postSave(self):
         # Update user permissions in case is_superuser set or unset
-        self.updateUserPermissions()
+        # Coordinator changes update permissions from the coordinator save and delete
+        if self.permissionFieldsChanged:
+            self.updateUserPermissions()
 
     # *****Methods*****
 
     def updateUserPermissions(self):
+        from coordination.permissions.registry import permissionLevelRegistry
+
         # Get coordinator objects for this user
-        coordinators = self.coordinator_set.all()
+        coordinators = list(self.coordinator_set.order_by().values_list('state', 'permissionLevel'))
 
         # Staff flag
-        self.is_staff = self.is_superuser or coordinators.exists()
-        self.save(update_fields=['is_staff'], skipPrePostSave=True)
+        # Update filtered on the current value so nothing is written if unchanged
+        self.is_staff = self.is_superuser or bool(coordinators)
+        User.objects.filter(pk=self.pk).exclude(is_staff=self.is_staff).update(is_staff=self.is_staff)
 
         # Permissions
 
         # Get permissions for all models for all states that this user is a coordinator of
-        permissionsToAdd = []
-
-        def addPermissions(permissionsToAdd, model, coordinator, permissionsLookupName):
-            if hasattr(model, permissionsLookupName):
-                permissionsToAdd += map(lambda x: f'{x}_{model._meta.object_name.lower()}', getattr(model, permissionsLookupName)(coordinator.permissionLevel))
+        # Global coordinators get global permissions where a model defines them, otherwise state permissions
+        permissionsToAdd = set()
 
         # Add permissions for each coordinator object
-        for coordinator in coordinators:
-            for model in djangoApps.apps.get_models():
+        for statePK, permissionLevel in coordinators:
+            permissionsToAdd |= permissionLevelRegistry.codenames(permissionLevel, statePK is None)
 
-                # If global coordinator add global permissions if they are defined
-                # Otherwise add state permissions
-                if coordinator.state is None and hasattr(model, 'globalCoordinatorPermissions'):
-                    addPermissions(permissionsToAdd, model, coordinator, 'globalCoordinatorPermissions')
+        # Only add and remove the permissions that differ from the user's current permissions
+        targetPermissionPKs = set(Permission.objects.filter(codename__in=permissionsToAdd).order_by().values_list('pk', flat=True))
+        currentPermissionPKs = set(self.user_permissions.order_by().values_list('pk', flat=True))
 
-                else:
-                    addPermissions(permissionsToAdd, model, coordinator, 'stateCoordinatorPermissions')
+        if currentPermissionPKs - targetPermissionPKs:
+            self.user_permissions.remove(*(currentPermissionPKs - targetPermissionPKs))
 
-        # Add permissions to user
-        permissionObjects = Permission.objects.filter(codename__in=permissionsToAdd)
-        self.user_permissions.clear()
-        self.user_permissions.add(*permissionObjects)
+        if targetPermissionPKs - currentPermissionPKs:
+            self.user_permissions.add(*(targetPermissionPKs - currentPermissionPKs))
 
         # Set state filtering to None if no longer a coordinator of that state
-        if self.currentlySelectedAdminState and not (self.is_superuser or coordinators.filter(state=self.currentlySelectedAdminState).exists()):
+        if self.currentlySelectedAdminState_id and not (self.is_superuser or self.currentlySelectedAdminState_id in [statePK for statePK, permissionLevel in coordinators]):
             self.currentlySelectedAdminState = None
             self.save(update_fields=['currentlySelectedAdminState'], skipPrePostSave=True)
 
+        # Staff flag now matches the database
+        self.snapshotTrackedFields(['is_staff'])
+
     # Reset forcePasswordChange
     def set_password(self, password):
         super().set_password(password)
@@ -186,7 +193,8 @@ class User(SaveDeleteMixin, AbstractUser):
     # *****Get Methods*****
 
     def isGobalCoordinator(self, permissionLevels):
-        return self.coordinator_set.filter(state=None, permissionLevel__in=permissionLevels).exists()
+        from coordination.permissions.utils import coordinatorPermissionTable
+        return not coordinatorPermissionTable(self).globalLevels().isdisjoint(permissionLevels)
 
     def adminViewableStates(self):
         from regions.models import State
@@ -206,10 +214,12 @@ class User(SaveDeleteMixin, AbstractUser):
     def strSchoolNames(self):
         return ", ".join(map(lambda x: str(x.school), self.schooladministrator_set.all()))
     strSchoolNames.short_description = "Schools"
+    strSchoolNames.exportPrefetchRelated = ['schooladministrator_set__school']
 
     def strSchoolPostcodes(self):
         return ", ".join(map(lambda x: str(x.school.postcode) if x.school.postcode else "", self.schooladministrator_set.all()))
     strSchoolPostcodes.short_description = "School postcodes"
+    strSchoolPostcodes.exportPrefetchRelated = ['schooladministrator_set__school']
 
     def fullname_or_email(self):
         return self.get_full_name() or self.email
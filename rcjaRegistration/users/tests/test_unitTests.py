@@ -206,6 +206,65 @@ class TestUpdateUserPermissions(TestCase):
         self.assertFalse(self.user1.user_permissions.filter(codename__contains='invoice').exists())
         self.assertFalse(self.user1.user_permissions.filter(codename__contains='event').exists())
 
+    def testLevelChangeOnlyAddsAndRemovesDifference(self):
+        coordinator = Coordinator.objects.create(user=self.user1, state=self.state1, permissionLevel='viewall', position='Position')
+        viewPermission = self.user1.user_permissions.get(codename='view_school')
+
+        coordinator.permissionLevel = 'schoolmanager'
+        coordinator.save()
+
+        # Unchanged permission row is kept rather than cleared and re-added
+        self.assertTrue(self.user1.user_permissions.through.objects.filter(user=self.user1, permission=viewPermission).exists())
+        self.assertTrue(self.user1.user_permissions.filter(codename='change_school').exists())
+        self.assertFalse(self.user1.user_permissions.filter(codename='view_invoice').exists())
+
+    def testPermissionsMatchAfterSync(self):
+        from coordination.permissions.registry import permissionLevelRegistry
+        Coordinator.objects.create(user=self.user1, state=self.state1, permissionLevel='schoolmanager', position='Position')
+        Coordinator.objects.create(user=self.user1, state=None, permissionLevel='viewall', position='Position')
+
+        expected = permissionLevelRegistry.codenames('schoolmanager', False) | permissionLevelRegistry.codenames('viewall', True)
+        self.assertEqual(set(self.user1.user_permissions.values_list('codename', flat=True)), expected)
+
+    def testNoWritesWhenUnchanged(self):
+        Coordinator.objects.create(user=self.user1, state=self.state1, permissionLevel='full', position='Position')
+
+        # Reads coordinators and permissions, staff update matches no rows, no permission rows written
+        with self.assertNumQueries(4):
+            self.user1.updateUserPermissions()
+
+    def testProfileSaveDoesNotUpdatePermissions(self):
+        Coordinator.objects.create(user=self.user1, state=self.state1, permissionLevel='full', position='Position')
+        user = User.objects.get(pk=self.user1.pk)
+        user.first_name = 'Changed'
+
+        with patch.object(User, 'updateUserPermissions') as mockUpdate:
+            user.save()
+
+        mockUpdate.assert_not_called()
+
+    def testSuperuserChangeUpdatesPermissions(self):
+        user = User.objects.get(pk=self.user1.pk)
+        user.is_superuser = True
+        user.save()
+
+        self.assertTrue(User.objects.get(pk=self.user1.pk).is_staff)
+
+        user = User.objects.get(pk=self.user1.pk)
+        user.is_superuser = False
+        user.save()
+
+        self.assertFalse(User.objects.get(pk=self.user1.pk).is_staff)
+
+    def testPositionChangeDoesNotUpdatePermissions(self):
+        coordinator = Coordinator.objects.create(user=self.user1, state=self.state1, permissionLevel='full', position='Position')
+        coordinator.position = 'New position'
+
+        with patch.object(User, 'updateUserPermissions') as mockUpdate:
+            coordinator.save()
+
+        mockUpdate.assert_not_called()
+
 class TestUserForm(TestCase):
     validPayload = {
         'first_name': 'First',
@@ -5,13 +5,14 @@ from django.http import HttpResponse, HttpResponseForbidden
 from django.urls import reverse
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
 
 from .forms import WorkshopAttendeeForm
 
 from .models import WorkshopAttendee
 from events.models import Event
 
-from events.views import CreateEditBaseEventAttendance, getDivisionsMaxReachedWarnings
+from events.views import CreateEditBaseEventAttendance, getDivisionsMaxReachedWarnings, eventLimitsReached, lockedRegistrationLimitErrors
 
 import datetime
 
@@ -51,11 +52,23 @@ class CreateEditWorkshopAttendee(CreateEditBaseEventAttendance):
             # Create attendee object but don't save so can set foreign keys
             attendee = form.save(commit=False)
 
-            # Save attendee
-            attendee.save()
+            limitErrors = []
+            with transaction.atomic():
+                # Check limits again while registrations are locked, so concurrent registrations can't exceed them
+                if attendee.hasChanged('division'):
+                    limitErrors = lockedRegistrationLimitErrors(event, request.user, attendee.division_id, newAttendee)
+
+                if not limitErrors:
+                    # Save attendee
+                    attendee.save()
+
+            if limitErrors:
+                for error in limitErrors:
+                    form.add_error(None, error)
+                return render(request, 'workshops/createEditAttendee.html', {'form': form, 'event':event, 'attendee':None if newAttendee else attendee, 'divisionsMaxReachedWarnings': getDivisionsMaxReachedWarnings(event, request.user)})
 
             # Redirect if add another in response
-            if 'add_text' in request.POST and newAttendee and not (event.maxEventRegistrationsForSchoolReached(request.user) or event.maxEventRegistrationsTotalReached()):
+            if 'add_text' in request.POST and newAttendee and not eventLimitsReached(event, request.user):
                 return redirect(reverse('workshops:create', kwargs = {"eventID":event.id}))
 
             return redirect(reverse('events:details', kwargs = {'eventID':event.id}))